@@ -4,35 +4,123 @@ Django admin interface customization for Recipe Website.
 
 Customizes the Django admin interface with inline editors and 
 filtered displays for better content management.
+
+Large tables (recipes, notes, users, ingredients) use LargeTableAdmin:
+unfiltered changelists show the database's row estimate instead of
+running COUNT(*), related names are joined into the list query, and
+foreign keys to big tables use autocomplete or raw id widgets. The
+check_admin_queries command keeps each page within a query budget.
+
+The admin also hosts the request profiles page (see profiling.py).
 """
 
-from django.contrib import admin
-from .models import Category, PreparationStep, Recipe, Note, RecipeIngredient, User, SocialMedia, Icons, Place
+import os
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection, models
+from django.forms.models import BaseInlineFormSet
+from django.http import FileResponse, Http404
+from django.utils.functional import cached_property
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from .models import Category, DeletionJob, Ingredient, OutgoingEmail, PreparationStep, Recipe, Note, RecipeIngredient, User, SocialMedia, Icons, Place
+from . import moderation, nutrition, profiling, search
+from .similar import update_recipe_on_commit
+from .thumbnails import thumbnail_url
+
+
+# ============ CONFIGURATION ============
+EXACT_COUNT_LIMIT = 10000  # Below this estimate, changelists count exactly
+COMPACT_TEXT = {models.TextField: {'widget': forms.Textarea(attrs={'rows': 2, 'cols': 80})}}
+
+
+# ============ PAGINATION ============
+
+def estimated_count(model):
+    """Return the database's row estimate for a model's table, or None if unknown."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses the table estimate for unfiltered, large querysets."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for tables too big to COUNT on every changelist page."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 # ============ INLINE EDITORS ============
 
-class NoteInLine(admin.StackedInline):
+class NoteInLine(admin.TabularInline):
     """Inline editor for recipe notes."""
     model = Note
     extra = 1
+    formfield_overrides = COMPACT_TEXT
 
 
-class IngredientInLine(admin.StackedInline):
+class IngredientInLine(admin.TabularInline):
     """Inline editor for recipe ingredients."""
     model = RecipeIngredient
+    fields = ['sequence', 'text']
     extra = 1
+    formfield_overrides = COMPACT_TEXT
 
 
-class PreparationStepInLine(admin.StackedInline):
+class PreparationStepInLine(admin.TabularInline):
     """Inline editor for recipe preparation steps."""
     model = PreparationStep
+    fields = ['sequence', 'text']
     extra = 1
+    formfield_overrides = COMPACT_TEXT
     
 
-class SocialMediaInLine(admin.StackedInline):
-    """Inline editor for user social media profiles."""
+class SocialMediaFormSet(BaseInlineFormSet):
+    """Formset whose rows share one list of icon choices, read once,
+    instead of querying Icons for every row."""
+
+    @cached_property
+    def icon_choices(self):
+        return list(self.form.base_fields['icon'].choices)
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        field = form.fields['icon']
+        field.choices = self.icon_choices
+        # The admin wraps the select to add the "+" link; set the inner one too
+        getattr(field.widget, 'widget', field.widget).choices = self.icon_choices
+
+
+class SocialMediaInLine(admin.TabularInline):
+    """Inline editor for user social media profiles (icons is a short
+    list, shown as a plain select)."""
     model = SocialMedia
+    formset = SocialMediaFormSet
     extra = 1
 
 
@@ -52,20 +140,94 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ["name"]
 
 
-class RecipeAdmin(admin.ModelAdmin):
-    """Admin interface for recipes with inline editors.
+class RecipeAdmin(LargeTableAdmin):
+    """Admin interface for recipes with inline editors and a moderation queue.
     
     Displays:
         name: Recipe name
+        category, creator: Related names, joined in the list query
+        is_approved, is_rejected: Moderation state
     
     Inline Editors:
         Notes, Ingredients, Preparation Steps
+    
+    Moderation:
+        moderation/: Keyset-paginated queue of pending recipes with
+        thumbnails (made on save, the image itself if missing);
+        approve/reject actions run one UPDATE (see moderation.py)
     """
-    list_display = ["name"]
+    list_display = ["name", "category", "creator", "is_approved", "is_rejected", "date_created"]
+    list_filter = ["is_approved", "is_rejected", "category"]
+    list_select_related = ["category", "creator"]
+    search_fields = ["name"]
+    autocomplete_fields = ["creator"]
+    raw_id_fields = ["favorited_by"]
+    actions = ["approve_recipes", "reject_recipes"]
     inlines = [NoteInLine, IngredientInLine, PreparationStepInLine]
+    change_list_template = "admin/recipewebsite/recipe/change_list.html"
+
+    def get_urls(self):
+        return [
+            path(
+                "moderation/",
+                self.admin_site.admin_view(self.moderation_view),
+                name="recipewebsite_recipe_moderation",
+            ),
+            *super().get_urls(),
+        ]
+
+    def moderation_view(self, request):
+        """List pending recipes oldest first and approve or reject a selection.
+        
+        GET ?after=<id> shows the page after that recipe id; POST applies
+        action ('approve' or 'reject') to the selected ids and reloads the page.
+        """
+        if not self.has_change_permission(request):
+            return redirect("admin:index")
+        try:
+            after = int(request.GET.get("after", 0))
+        except ValueError:
+            after = 0
+        if request.method == "POST":
+            selected = [int(pk) for pk in request.POST.getlist("selected") if pk.isdigit()]
+            if request.POST.get("action") == "approve":
+                count = moderation.approve(selected)
+                self.message_user(request, f"{count} receita(s) aprovada(s).", messages.SUCCESS)
+            elif request.POST.get("action") == "reject":
+                count = moderation.reject(selected)
+                self.message_user(request, f"{count} receita(s) rejeitada(s).", messages.WARNING)
+            return redirect(f"{reverse('admin:recipewebsite_recipe_moderation')}?after={after}")
+
+        recipes, next_after = moderation.pending_page(after)
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Fila de moderação",
+            "rows": [(recipe, thumbnail_url(recipe.img)) for recipe in recipes],
+            "after": after,
+            "next_after": next_after,
+        }
+        return TemplateResponse(request, "admin/recipewebsite/recipe/moderation.html", context)
+
+    @admin.action(description="Aprovar receitas selecionadas")
+    def approve_recipes(self, request, queryset):
+        count = moderation.approve(queryset.values_list("pk", flat=True))
+        self.message_user(request, f"{count} receita(s) aprovada(s).", messages.SUCCESS)
+
+    @admin.action(description="Rejeitar receitas selecionadas")
+    def reject_recipes(self, request, queryset):
+        count = moderation.reject(queryset.values_list("pk", flat=True))
+        self.message_user(request, f"{count} receita(s) rejeitada(s).", messages.WARNING)
+
+    def save_related(self, request, form, formsets, change):
+        """Re-index similar recipes, search and nutrition once the inline ingredients are saved."""
+        super().save_related(request, form, formsets, change)
+        update_recipe_on_commit(form.instance.pk)
+        search.update_recipe_on_commit(form.instance.pk)
+        nutrition.update_recipe_on_commit(form.instance.pk)
     
 
-class NoteAdmin(admin.ModelAdmin):
+class NoteAdmin(LargeTableAdmin):
     """Admin interface for recipe notes.
     
     Displays:
@@ -73,6 +235,8 @@ class NoteAdmin(admin.ModelAdmin):
         get_recipe: Recipe the note belongs to
     """
     list_display = ["content", "get_recipe"]
+    list_select_related = ["recipe"]
+    raw_id_fields = ["recipe"]
     
     @admin.display(description="Recipe")
     def get_recipe(self, obj):
@@ -80,7 +244,7 @@ class NoteAdmin(admin.ModelAdmin):
         return obj.recipe.name
     
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     """Admin interface for users with inline social media editor.
     
     Displays:
@@ -92,8 +256,74 @@ class UserAdmin(admin.ModelAdmin):
         Social Media profiles
     """
     list_display = ['username', 'email', 'is_staff']
+    search_fields = ['username', 'email']
+    autocomplete_fields = ['city']
     inlines = [SocialMediaInLine]
 
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'user_permissions':
+            # Permission labels include their content type
+            kwargs['queryset'] = db_field.remote_field.model.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+
+class IngredientAdmin(LargeTableAdmin):
+    """Admin interface for canonical ingredients.
+    
+    Displays:
+        name: Display name
+        key: Canonical lookup key
+    """
+    list_display = ["name", "key"]
+    search_fields = ["key"]
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    """Read-only progress of background user and recipe deletions.
+    
+    Displays:
+        kind, label: What is being deleted
+        status: Pending, running, done or failed
+        progress: Percent of rows deleted
+    """
+    list_display = ["label", "kind", "status", "progress", "done", "total", "requested_by", "updated_at"]
+    list_filter = ["status", "kind"]
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Progresso")
+    def progress(self, obj):
+        return f"{obj.progress}%"
+
+
+class OutgoingEmailAdmin(LargeTableAdmin):
+    """Read-only view of the email outbox.
+    
+    Displays:
+        subject, to: Message
+        status, attempts, next_attempt_at: Delivery progress
+        last_error: Why the last attempt failed
+    """
+    list_display = ["subject", "to", "status", "attempts", "next_attempt_at", "sent_at", "last_error"]
+    list_filter = ["status"]
+    readonly_fields = [field.name for field in OutgoingEmail._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class IconsAdmin(admin.ModelAdmin):
+    """Admin interface for social media icons.
+    
+    Displays:
+        name: Icon name
+        html_class: Font Awesome class
+    """
+    list_display = ["name", "html_class"]
+    search_fields = ["name"]
+
 
 class PlaceAdmin(admin.ModelAdmin):
     """Admin interface for places/cities.
@@ -102,14 +332,72 @@ class PlaceAdmin(admin.ModelAdmin):
         city: City name
     """
     list_display = ["city"]
+    search_fields = ["city"]
     model = Place
 
 
+# ============ PROFILES ============
+
+def profile_list(request):
+    """List recent request profiles and give staff their profiling token."""
+    context = {
+        **admin.site.each_context(request),
+        "title": "Perfis de requisições",
+        "profiles": [
+            summary for summary in map(profiling.load_summary, profiling.profile_ids()) if summary
+        ],
+        "token": profiling.make_token(request.user),
+        "query_param": profiling.QUERY_PARAM,
+        "max_age_minutes": profiling.TOKEN_MAX_AGE // 60,
+    }
+    return TemplateResponse(request, "admin/profiles/list.html", context)
+
+
+def profile_detail(request, profile_id):
+    """Show the top functions of one profile.
+    
+    GET ?sort=tottime sorts by own time instead of cumulative time;
+    ?filter=<text> keeps functions whose path or name contains it.
+    """
+    summary = profiling.load_summary(profile_id)
+    if summary is None:
+        raise Http404
+    sort = "tottime" if request.GET.get("sort") == "tottime" else "cumulative"
+    pattern = request.GET.get("filter", "").strip()
+    context = {
+        **admin.site.each_context(request),
+        "title": f"{summary['method']} {summary['path']}",
+        "summary": summary,
+        "sort": sort,
+        "filter": pattern,
+        "stats": profiling.stats_text(profile_id, sort, pattern or None),
+    }
+    return TemplateResponse(request, "admin/profiles/detail.html", context)
+
+
+def profile_download(request, profile_id):
+    """Download the pstats file of a profile."""
+    path = profiling.profile_path(profile_id, ".prof")
+    if path is None or not os.path.exists(path):
+        raise Http404
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{profile_id}.prof")
+
+
+profile_urls = [
+    path("admin/profiles/", admin.site.admin_view(profile_list), name="admin_profiles"),
+    path("admin/profiles/<str:profile_id>/", admin.site.admin_view(profile_detail), name="admin_profile"),
+    path("admin/profiles/<str:profile_id>/download/", admin.site.admin_view(profile_download), name="admin_profile_download"),
+]
+
+
 # ============ REGISTRATION ============
 
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Note, NoteAdmin)
 admin.site.register(User, UserAdmin)
-admin.site.register(Icons)
+admin.site.register(Icons, IconsAdmin)
+admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Place, PlaceAdmin)
+admin.site.register(DeletionJob, DeletionJobAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
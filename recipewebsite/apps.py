@@ -0,0 +1,16 @@
+"""apps.py
+
+Application configuration for Recipe Website.
+"""
+
+from django.apps import AppConfig
+
+
+class RecipewebsiteConfig(AppConfig):
+    """App config that registers system checks and signal handlers and
+    loads the search autocomplete snapshot on startup."""
+    name = 'recipewebsite'
+
+    def ready(self):
+        from . import autocomplete, checks, signals  # noqa: F401
+        autocomplete.load_snapshot()
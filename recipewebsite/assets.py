@@ -0,0 +1,135 @@
+"""assets.py
+
+Production static asset pipeline for Recipe Website.
+
+The build runs once per deploy (see the build_assets management command):
+    1. collectstatic copies assets to STATIC_ROOT with hashed filenames
+       and writes the staticfiles.json manifest
+    2. compress compiles SCSS offline into STATIC_ROOT/CACHE
+    3. precompress() writes .gz/.br siblings next to every text asset
+
+At request time templates only look up the manifests; no Sass is compiled.
+"""
+
+import gzip
+import json
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.utils import get_app_template_dirs
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+# ============ CONFIGURATION ============
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.xml', '.ico')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+(\.gz|\.br)?$')
+STATIC_TAG = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+FAR_FUTURE = 'public, max-age=31536000, immutable'
+
+
+# ============ PRECOMPRESSION ============
+
+def precompress(root):
+    """Write .gz and .br siblings for text assets under root.
+
+    Siblings are only kept when they are smaller than the original and are
+    skipped when already up to date, so the step is cheap to re-run.
+
+    Args:
+        root (str): Directory to walk (usually STATIC_ROOT)
+
+    Returns:
+        int: Number of compressed files written
+    """
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            mtime = os.path.getmtime(path)
+            data = None
+            encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+            for suffix, encode in encoders:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = encode(data)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+    return written
+
+
+# ============ MANIFEST CHECK ============
+
+def template_dirs():
+    """Return every directory templates are loaded from."""
+    dirs = []
+    for engine in settings.TEMPLATES:
+        dirs.extend(str(d) for d in engine.get('DIRS', []))
+    dirs.extend(str(d) for d in get_app_template_dirs('templates'))
+    return dirs
+
+
+def template_static_references():
+    """Collect asset paths referenced with {% static %} in templates.
+
+    Returns:
+        dict: Asset path -> list of templates referencing it
+    """
+    references = {}
+    for directory in template_dirs():
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if not filename.endswith('.html'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                with open(path, encoding='utf-8') as f:
+                    for asset in STATIC_TAG.findall(f.read()):
+                        references.setdefault(asset, []).append(os.path.relpath(path, directory))
+    return references
+
+
+def missing_assets():
+    """Find template asset references that are not in the build manifests.
+
+    Returns:
+        list: Human readable problems, empty when the build is complete
+    """
+    manifest_path = os.path.join(settings.STATIC_ROOT, staticfiles_storage.manifest_name)
+    if not os.path.exists(manifest_path):
+        return [f"Static manifest not found at {manifest_path}, run build_assets"]
+    with open(manifest_path, encoding='utf-8') as f:
+        paths = json.load(f).get('paths', {})
+    problems = [
+        f"{asset} (referenced in {', '.join(sorted(set(templates)))}) is missing from the manifest"
+        for asset, templates in sorted(template_static_references().items())
+        if asset not in paths
+    ]
+    compress_manifest = os.path.join(
+        settings.COMPRESS_ROOT, settings.COMPRESS_OUTPUT_DIR, settings.COMPRESS_OFFLINE_MANIFEST
+    )
+    if settings.COMPRESS_OFFLINE and not os.path.exists(compress_manifest):
+        problems.append(f"Offline compression manifest not found at {compress_manifest}, run build_assets")
+    return problems
+
+
+# ============ CACHING ============
+
+def is_hashed(path):
+    """Return True for content-hashed filenames that never change."""
+    return bool(HASHED_NAME.search(path))
+
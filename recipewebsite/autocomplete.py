@@ -0,0 +1,292 @@
+"""autocomplete.py
+
+Typeahead suggestions for the search box.
+
+Suggestions are approved recipe names and common ingredient terms, each
+weighted by popularity. They live in memory in a PrefixIndex: a sorted
+array of accent-folded keys searched with binary search, plus a segment
+tree holding the heaviest key of every range, so the best entries of any
+prefix are found in order without scanning its keys. Recipe names are
+also keyed by each word, so "choc" finds "Bolo de chocolate".
+
+The index is loaded at startup from a compact snapshot file written by
+`python manage.py build_autocomplete`; until there is one, no
+suggestions are served (the index is never built on a request). Recipes
+are added or removed as they are approved, unapproved or deleted (see
+signals.py). Those live updates only reach the current process;
+rebuilding the snapshot periodically brings every worker up to date.
+"""
+
+import bisect
+import gzip
+import heapq
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .models import Recipe, RecipeEvent, RecipeIngredient
+from .scores import EVENT_WEIGHTS
+from .text import normalize, terms
+
+# ============ CONFIGURATION ============
+MAX_ENTRIES = 50000     # Bounds memory: only the most popular entries are kept
+MIN_TERM_RECIPES = 2    # Ingredient terms must appear in this many recipes
+MIN_PREFIX = 2          # Shorter queries get no suggestions
+SUGGESTIONS = 8
+SNAPSHOT_VERSION = 1
+
+
+def entry_keys(label):
+    """Return the folded keys an entry is found under: the label and each later word."""
+    key = normalize(label)
+    keys = [key]
+    for match in re.finditer(r' (?=\w)', key):
+        keys.append(key[match.end():])
+    return keys
+
+
+# ============ INDEX ============
+
+class PrefixIndex:
+    """In-memory prefix index over weighted suggestions.
+
+    Entries are (label, weight, recipe_id) tuples; recipe_id is None for
+    ingredient terms. Entries added after construction go to a small
+    sorted overlay searched alongside the main keys.
+    """
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self.recipes = {}
+        self.removed = set()
+        pairs = []
+        for entry in entries:
+            ref = self._append(entry)
+            pairs.extend((key, ref) for key in entry_keys(entry[0]))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.refs = [ref for _, ref in pairs]
+        self.weights = [self.entries[ref][1] for ref in self.refs]
+        # tree[size + i] is key position i; every parent holds its heavier child
+        size = len(self.keys)
+        self.tree = [0] * size + list(range(size))
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = self._heavier(self.tree[2 * node], self.tree[2 * node + 1])
+        self.added = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries) - len(self.removed)
+
+    def _append(self, entry):
+        self.entries.append(entry)
+        ref = len(self.entries) - 1
+        if entry[2] is not None:
+            self.recipes[entry[2]] = ref
+        return ref
+
+    def _heavier(self, a, b):
+        if a is None or (b is not None and self.weights[b] > self.weights[a]):
+            return b
+        return a
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def _heaviest(self, lo, hi):
+        """Return the position of the heaviest key in keys[lo:hi]."""
+        best = None
+        lo += len(self.keys)
+        hi += len(self.keys)
+        while lo < hi:
+            if lo & 1:
+                best = self._heavier(best, self.tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self._heavier(best, self.tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def _ranked(self, prefix, limit):
+        """Return the refs of the best live entries under a prefix.
+
+        Takes the heaviest key of the prefix's range, then of the two
+        ranges on either side of it, and so on, until `limit` live
+        entries are found.
+        """
+        found = []
+        ranges = []
+
+        def push(lo, hi):
+            if lo < hi:
+                position = self._heaviest(lo, hi)
+                heapq.heappush(ranges, (-self.weights[position], position, lo, hi))
+
+        push(*self._range(prefix))
+        while ranges and len(found) < limit:
+            _, position, lo, hi = heapq.heappop(ranges)
+            ref = self.refs[position]
+            if ref not in self.removed and ref not in found:
+                found.append(ref)
+            push(lo, position)
+            push(position + 1, hi)
+
+        lo = bisect.bisect_left(self.added, (prefix,))
+        hi = bisect.bisect_left(self.added, (prefix + '\uffff',), lo)
+        extra = {ref for _, ref in self.added[lo:hi] if ref not in self.removed}
+        if extra:
+            found = heapq.nlargest(limit, set(found) | extra, key=lambda r: self.entries[r][1])
+        return found
+
+    def search(self, query, limit=SUGGESTIONS):
+        """Return the most popular entries matching a query prefix.
+
+        Args:
+            query (str): Text typed so far
+            limit (int): Maximum number of entries
+
+        Returns:
+            list: (label, weight, recipe_id) tuples, most popular first
+        """
+        prefix = normalize(query)
+        if len(prefix) < MIN_PREFIX:
+            return []
+        with self.lock:
+            return [self.entries[r] for r in self._ranked(prefix, limit)]
+
+    def add(self, entry):
+        """Insert or replace an entry (recipes are replaced by recipe_id)."""
+        with self.lock:
+            if entry[2] in self.recipes:
+                self.removed.add(self.recipes[entry[2]])
+            ref = self._append(entry)
+            for key in entry_keys(entry[0]):
+                bisect.insort(self.added, (key, ref))
+
+    def remove_recipe(self, recipe_id):
+        """Hide a recipe's entry."""
+        with self.lock:
+            ref = self.recipes.pop(recipe_id, None)
+            if ref is not None:
+                self.removed.add(ref)
+
+    def snapshot(self):
+        """Return the live entries, most popular first."""
+        live = [e for r, e in enumerate(self.entries) if r not in self.removed]
+        return sorted(live, key=lambda e: -e[1])
+
+
+# ============ BUILD & SNAPSHOT ============
+
+def recipe_weight(views, favorites, ratings):
+    """Popularity of a recipe, weighting interactions like the trending score."""
+    return 1 + (
+        views * EVENT_WEIGHTS[RecipeEvent.VIEW]
+        + favorites * EVENT_WEIGHTS[RecipeEvent.FAVORITE]
+        + ratings * EVENT_WEIGHTS[RecipeEvent.REVIEW]
+    )
+
+
+def recipe_entry(recipe):
+    """Return the index entry of a Recipe."""
+    return (recipe.name, recipe_weight(recipe.view_count, recipe.favorite_count, recipe.rating_count), recipe.pk)
+
+
+def build_entries():
+    """Collect suggestions from approved recipes and their ingredients.
+
+    Returns:
+        list: Up to MAX_ENTRIES (label, weight, recipe_id) tuples, most popular first
+    """
+    approved = Recipe.objects.filter(is_approved=True)
+    entries = [
+        (name, recipe_weight(views, favorites, ratings), pk)
+        for pk, name, views, favorites, ratings in approved.values_list(
+            'pk', 'name', 'view_count', 'favorite_count', 'rating_count'
+        ).iterator()
+    ]
+
+    # Count each term once per recipe; display its most common spelling
+    recipe_terms = defaultdict(set)
+    spellings = defaultdict(Counter)
+    texts = RecipeIngredient.objects.filter(recipe__is_approved=True).values_list('recipe_id', 'text')
+    for recipe_id, text in texts.iterator():
+        for folded, word in terms(text):
+            recipe_terms[recipe_id].add(folded)
+            spellings[folded][word] += 1
+    counts = Counter(term for found in recipe_terms.values() for term in found)
+    entries.extend(
+        (spellings[term].most_common(1)[0][0], count, None)
+        for term, count in counts.items() if count >= MIN_TERM_RECIPES
+    )
+    entries.sort(key=lambda e: -e[1])
+    return entries[:MAX_ENTRIES]
+
+
+def write_snapshot(entries, path=None):
+    """Write entries to the gzip-compressed JSON snapshot file."""
+    path = path or settings.AUTOCOMPLETE_SNAPSHOT
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'entries': entries}, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path=None):
+    """Read entries from the snapshot file, or None if it is missing or outdated."""
+    path = path or settings.AUTOCOMPLETE_SNAPSHOT
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != SNAPSHOT_VERSION:
+        return None
+    return [tuple(entry) for entry in data['entries']]
+
+
+# ============ PROCESS-WIDE INDEX ============
+
+_index = None
+
+
+def load_snapshot():
+    """Load the index from the snapshot file, if there is one (called at startup)."""
+    global _index
+    entries = read_snapshot()
+    if entries is not None:
+        _index = PrefixIndex(entries)
+    return _index
+
+
+def get_index():
+    """Return the process-wide index, or None until a snapshot is loaded."""
+    return _index
+
+
+def suggest(query, limit=SUGGESTIONS):
+    """Return the best (label, weight, recipe_id) suggestions for a query
+    (none while no snapshot is loaded)."""
+    index = get_index()
+    return index.search(query, limit) if index is not None else []
+
+
+def recipe_approved(recipe):
+    """Add a newly approved recipe to a loaded index."""
+    if _index is not None:
+        _index.add(recipe_entry(recipe))
+
+
+def recipe_withdrawn(recipe_id):
+    """Remove an unapproved or deleted recipe from a loaded index."""
+    if _index is not None:
+        _index.remove_recipe(recipe_id)
@@ -0,0 +1,92 @@
+"""categories.py
+
+Cached category navigation with approved recipe counts.
+
+The summary is built with one grouped aggregate and kept in the cache as
+a list of categories plus one counter per category. Counters are adjusted
+with atomic cache increments when a recipe is approved, deleted or moved
+between categories (see signals.py), so the header never runs a COUNT.
+
+That needs a cache shared by all workers (REDIS_URL). With the
+per-process default cache an increment would only reach the worker that
+handled the write, so there the summary expires after LOCAL_TTL instead
+and a change just drops this worker's copy.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Category
+
+# ============ CONFIGURATION ============
+NAMES_KEY = 'categories:names'
+COUNT_KEY = 'categories:count:{}'
+LOCAL_TTL = 60   # Seconds other workers may show stale counts without a shared cache
+
+
+def summary_timeout():
+    """Cache timeout of the summary: none when counters are shared."""
+    return None if settings.REDIS_URL else LOCAL_TTL
+
+
+def build_summary():
+    """Compute the summary from the database and store it in the cache.
+
+    Returns:
+        list: Dicts with id, name and recipe_count, ordered by name
+    """
+    summary = list(
+        Category.objects
+        .annotate(recipe_count=Count('recipe', filter=Q(recipe__is_approved=True)))
+        .order_by('name')
+        .values('id', 'name', 'recipe_count')
+    )
+    timeout = summary_timeout()
+    cache.set_many({COUNT_KEY.format(c['id']): c['recipe_count'] for c in summary}, timeout=timeout)
+    cache.set(NAMES_KEY, [(c['id'], c['name']) for c in summary], timeout=timeout)
+    return summary
+
+
+def category_summary():
+    """Return every category with its approved recipe count.
+
+    Returns:
+        list: Dicts with id, name and recipe_count, ordered by name
+    """
+    names = cache.get(NAMES_KEY)
+    if names is None:
+        return build_summary()
+    counts = cache.get_many([COUNT_KEY.format(pk) for pk, _ in names])
+    if len(counts) != len(names):
+        return build_summary()
+    return [
+        {'id': pk, 'name': name, 'recipe_count': counts[COUNT_KEY.format(pk)]}
+        for pk, name in names
+    ]
+
+
+def adjust_count(category_id, delta):
+    """Add delta to a category's cached recipe count."""
+    if not settings.REDIS_URL:
+        invalidate()
+        return
+    try:
+        cache.incr(COUNT_KEY.format(category_id), delta)
+    except ValueError:
+        # Not cached yet: the next read rebuilds it from the database
+        cache.delete(NAMES_KEY)
+
+
+def adjust_count_on_commit(category_id, delta):
+    """Schedule adjust_count() for when the current transaction commits.
+
+    A rolled back save must not move the counters.
+    """
+    transaction.on_commit(lambda: adjust_count(category_id, delta))
+
+
+def invalidate():
+    """Drop the cached summary, e.g. after bulk updates or category edits."""
+    cache.delete(NAMES_KEY)
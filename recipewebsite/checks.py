@@ -0,0 +1,19 @@
+"""checks.py
+
+Django system checks for Recipe Website.
+
+Run with `python manage.py check --deploy` after build_assets.
+"""
+
+from django.core.checks import Error, Tags, register
+
+from .assets import missing_assets
+
+
+@register(Tags.staticfiles, deploy=True)
+def check_static_manifest(app_configs, **kwargs):
+    """Fail when a template references an asset missing from the manifest."""
+    return [
+        Error(problem, hint="Run `python manage.py build_assets`", id='recipewebsite.E001')
+        for problem in missing_assets()
+    ]
@@ -5,14 +5,15 @@ Django context processors for Recipe Website.
 Context processors add variables to all template contexts.
 """
 
-from .models import Category
+from .categories import category_summary
 
 
 def categories_processor(request):
     """Add all categories to template context.
     
-    Makes all recipe categories available to all templates
-    via the 'all_categories' variable.
+    Makes all recipe categories, with their approved recipe counts,
+    available to all templates via the 'all_categories' variable.
+    The summary comes from the cache (see categories.py).
     
     Args:
         request: HTTP request
@@ -20,7 +21,6 @@ def categories_processor(request):
     Returns:
         dict: Context dictionary with 'all_categories' key
     """
-    categories = Category.objects.all()
     return {
-        'all_categories': categories
+        'all_categories': category_summary()
     }
\ No newline at end of file
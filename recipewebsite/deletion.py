@@ -0,0 +1,274 @@
+"""deletion.py
+
+Background deletion of users and recipes.
+
+Deleting a user with years of reviews and favorites in one cascade holds
+one long transaction over several tables. Instead, schedule() hides the
+object right away (inactive user, unapproved recipe) and queues a
+DeletionJob; the job then deletes dependent rows in chunks of CHUNK_SIZE,
+each chunk in its own short transaction, and the object itself last.
+Every step only selects rows that still exist, so an interrupted job
+simply starts again.
+
+Jobs run in a daemon thread of the web process that scheduled them
+(DELETION_WORKER='thread') or in `manage.py process_deletions`
+(DELETION_WORKER='command').
+
+Image files are not removed by database cascades, so the post_delete
+signals call remove_files_on_commit() for users and recipes.
+"""
+
+import contextvars
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    DeletionJob, Note, Notification, PreparationStep, Recipe, RecipeBand,
+    RecipeIngredient, Review, SocialMedia, User,
+)
+from .scores import refresh_favorites, refresh_rating
+from .thumbnails import thumbnail_name
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+CHUNK_SIZE = 500
+STALE_AFTER = timedelta(minutes=10)  # A running job not updated for this long is retried
+
+Favorite = Recipe.favorited_by.through
+
+# Set while a job deletes reviews, whose aggregates it refreshes per chunk
+_deleting = contextvars.ContextVar('deleting', default=False)
+
+
+def in_progress():
+    """Return True while a deletion job is deleting rows in this context."""
+    return _deleting.get()
+
+
+# ============ FILES ============
+
+def remove_files_on_commit(instance, *field_names):
+    """Delete the files of an instance's file fields, and their thumbnails,
+    once the transaction commits.
+
+    Field defaults (shared placeholder images) are never removed.
+    """
+    files = [
+        (file.storage, file.name)
+        for file in (getattr(instance, name) for name in field_names)
+        if file and file.name != file.field.default
+    ]
+    if files:
+        transaction.on_commit(lambda: _remove_files(files))
+
+
+def _remove_files(files):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+            storage.delete(thumbnail_name(name))
+        except OSError:
+            logger.warning("Could not remove %s", name, exc_info=True)
+
+
+# ============ SCHEDULING ============
+
+def schedule(obj, requested_by=None):
+    """Hide a user or recipe now and queue its deletion.
+
+    Args:
+        obj (User | Recipe): Object to delete
+        requested_by (User): Who asked for it
+
+    Returns:
+        DeletionJob: The queued (or already queued) job
+    """
+    kind = DeletionJob.USER if isinstance(obj, User) else DeletionJob.RECIPE
+    with transaction.atomic():
+        job = DeletionJob.objects.filter(
+            kind=kind, object_id=obj.pk, status__in=[DeletionJob.PENDING, DeletionJob.RUNNING]
+        ).first()
+        if job is None:
+            if kind == DeletionJob.USER:
+                # Inactive users cannot log in and lose their sessions
+                User.objects.filter(pk=obj.pk).update(is_active=False)
+            elif obj.is_approved:
+                # Through save() so signals withdraw it from counts and search
+                obj.is_approved = False
+                obj.save(update_fields=['is_approved'])
+            job = DeletionJob.objects.create(
+                kind=kind, object_id=obj.pk, label=str(obj)[:255], requested_by=requested_by,
+            )
+    if settings.DELETION_WORKER == 'thread':
+        transaction.on_commit(start_worker)
+    return job
+
+
+# ============ STEPS ============
+
+def _delete_rows(model):
+    def action(rows):
+        model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return action
+
+
+def _delete_reviews(refresh):
+    def action(rows):
+        Review.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        if refresh:
+            for recipe_id in {recipe_id for _, recipe_id in rows}:
+                refresh_rating(recipe_id)
+    return action
+
+
+def _delete_favorites(refresh):
+    def action(rows):
+        Favorite.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        if refresh:
+            refresh_favorites(list({recipe_id for _, recipe_id in rows}))
+    return action
+
+
+def _orphan_recipes(rows):
+    Recipe.objects.filter(pk__in=[pk for pk, in rows]).update(creator=None)
+
+
+def steps(job):
+    """Return the chunked steps of a job.
+
+    Returns:
+        list: (queryset, values_list fields, action(rows)) in order; each
+        action removes its rows from the queryset
+    """
+    if job.kind == DeletionJob.USER:
+        user_id = job.object_id
+        return [
+            # Recipes outlive their creator (creator is SET_NULL)
+            (Recipe.objects.filter(creator_id=user_id), ('pk',), _orphan_recipes),
+            (Review.objects.filter(user_id=user_id), ('pk', 'recipe_id'), _delete_reviews(refresh=True)),
+            (Favorite.objects.filter(user_id=user_id), ('pk', 'recipe_id'), _delete_favorites(refresh=True)),
+            (SocialMedia.objects.filter(user_id=user_id), ('pk',), _delete_rows(SocialMedia)),
+            (Notification.objects.filter(recipient_id=user_id), ('pk',), _delete_rows(Notification)),
+        ]
+    recipe_id = job.object_id
+    return [
+        (RecipeIngredient.objects.filter(recipe_id=recipe_id), ('pk',), _delete_rows(RecipeIngredient)),
+        (PreparationStep.objects.filter(recipe_id=recipe_id), ('pk',), _delete_rows(PreparationStep)),
+        (Note.objects.filter(recipe_id=recipe_id), ('pk',), _delete_rows(Note)),
+        (Review.objects.filter(recipe_id=recipe_id), ('pk', 'recipe_id'), _delete_reviews(refresh=False)),
+        (Favorite.objects.filter(recipe_id=recipe_id), ('pk', 'recipe_id'), _delete_favorites(refresh=False)),
+        (RecipeBand.objects.filter(recipe_id=recipe_id), ('pk',), _delete_rows(RecipeBand)),
+    ]
+
+
+# ============ WORKER ============
+
+def run_job(job, chunk_size=CHUNK_SIZE):
+    """Delete everything a job covers, one short transaction per chunk.
+
+    Args:
+        job (DeletionJob): A claimed job
+        chunk_size (int): Rows per transaction
+    """
+    model = User if job.kind == DeletionJob.USER else Recipe
+    job_steps = steps(job)
+    job.total = job.done + sum(queryset.count() for queryset, _, _ in job_steps) + 1
+    job.save(update_fields=['total', 'updated_at'])
+    token = _deleting.set(True)
+    try:
+        for queryset, fields, action in job_steps:
+            while True:
+                with transaction.atomic():
+                    rows = list(queryset.order_by('pk').values_list(*fields)[:chunk_size])
+                    if not rows:
+                        break
+                    action(rows)
+                    DeletionJob.objects.filter(pk=job.pk).update(
+                        done=F('done') + len(rows), updated_at=timezone.now(),
+                    )
+        with transaction.atomic():
+            # Whatever is left cascades in one small transaction
+            obj = model.objects.filter(pk=job.object_id).first()
+            if obj is not None:
+                obj.delete()
+            DeletionJob.objects.filter(pk=job.pk).update(
+                done=F('done') + 1, status=DeletionJob.DONE, updated_at=timezone.now(),
+            )
+    finally:
+        _deleting.reset(token)
+    job.refresh_from_db()
+
+
+def claim_next():
+    """Mark the oldest pending (or stale running) job as running and return it, or None."""
+    stale = timezone.now() - STALE_AFTER
+    with transaction.atomic():
+        job = (
+            DeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(status=DeletionJob.PENDING)
+            .order_by('created_at')
+            .first()
+        ) or (
+            DeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(status=DeletionJob.RUNNING, updated_at__lt=stale)
+            .order_by('created_at')
+            .first()
+        )
+        if job is not None:
+            job.status = DeletionJob.RUNNING
+            job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def run_pending(chunk_size=CHUNK_SIZE):
+    """Run queued jobs until none is left.
+
+    Returns:
+        list: The jobs that were run, with their final status
+    """
+    jobs = []
+    while (job := claim_next()) is not None:
+        try:
+            run_job(job, chunk_size)
+        except Exception as e:
+            logger.exception("Deletion job %s failed", job.pk)
+            DeletionJob.objects.filter(pk=job.pk).update(
+                status=DeletionJob.FAILED, error=str(e), updated_at=timezone.now(),
+            )
+            job.refresh_from_db()
+        jobs.append(job)
+    return jobs
+
+
+_worker_lock = threading.Lock()
+_wanted = threading.Event()
+
+
+def start_worker():
+    """Run pending jobs in a daemon thread, unless one is already running
+    here (it then makes one more pass before stopping)."""
+    _wanted.set()
+    if not _worker_lock.acquire(blocking=False):
+        return
+    threading.Thread(target=_work, name='deletion-worker', daemon=True).start()
+
+
+def _work():
+    # A job queued while a pass ends can miss its last claim_next();
+    # start_worker() flagged it, so pass again after releasing the lock
+    while True:
+        _wanted.clear()
+        try:
+            run_pending()
+        finally:
+            connection.close()
+            _worker_lock.release()
+        if not _wanted.is_set() or not _worker_lock.acquire(blocking=False):
+            return
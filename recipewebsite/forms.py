@@ -49,7 +49,7 @@ class CreateRecipeForm(ModelForm):
 
     class Meta:
         model = Recipe
-        fields = ['name', 'img', 'sliderImg', 'difficulty', 'duration', 'description', 'category']
+        fields = ['name', 'img', 'sliderImg', 'difficulty', 'duration', 'servings', 'description', 'category']
 
     def clean_img(self):
         """Validate main image file size."""
@@ -191,11 +191,12 @@ class CustomUserChangeForm(UserChangeForm):
         last_name (CharField): User's last name
         bio (TextField): User biography
         phone (CharField): Contact phone number
+        digest_frequency (ChoiceField): How often notifications are emailed
     """
     
     class Meta:
         model = User
-        fields = ['email', 'username', 'first_name', 'last_name', 'bio', 'phone']
+        fields = ['email', 'username', 'first_name', 'last_name', 'bio', 'phone', 'digest_frequency']
         
     def __init__(self, *args, **kwargs):
         """Initialize form and add Bootstrap classes to all fields."""
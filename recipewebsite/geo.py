@@ -0,0 +1,161 @@
+"""geo.py
+
+Geohash index over Place coordinates for "recipes from creators near me".
+
+Each Place stores its latitude and longitude as numbers plus a geohash:
+a base-32 string where every extra character narrows the cell, so all
+points inside a cell share its prefix and a cell is one range scan on
+the indexed geohash column. A radius query picks the finest precision
+whose cells are still at least as large as the radius, reads the cell of
+the center and its 8 neighbours (which together cover the whole circle)
+and keeps the candidates whose haversine distance is within the radius.
+
+This module has no model imports (Place.save() uses it); queries take
+the Place queryset to search.
+"""
+
+import math
+
+from django.db.models import Q
+
+# ============ CONFIGURATION ============
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9             # Stored geohash length (cells of about 5 m)
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+MAX_RADIUS_KM = 2000      # k-nearest searches stop widening here
+
+
+# ============ GEOHASH ============
+
+def parse_location(location):
+    """Parse a PlainLocationField value ("lat,lng") into floats.
+
+    Returns:
+        tuple: (latitude, longitude), or (None, None) if missing or invalid
+    """
+    try:
+        lat, lng = (float(part) for part in (location or '').split(','))
+    except ValueError:
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None, None
+    return lat, lng
+
+
+def encode(lat, lng, precision=PRECISION):
+    """Return the geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of cells of a precision."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points, in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def covering_cells(lat, lng, radius_km):
+    """Return geohash prefixes whose cells together cover a circle.
+
+    Returns:
+        list: Cell prefixes ([''] means the whole world)
+    """
+    # Longitude degrees shrink towards the poles
+    lng_km = KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6)
+    precision = 0
+    for p in range(1, PRECISION + 1):
+        dlat, dlng = cell_size(p)
+        if dlat * KM_PER_DEGREE < radius_km or dlng * lng_km < radius_km:
+            break
+        precision = p
+    if precision == 0:
+        return ['']
+    dlat, dlng = cell_size(precision)
+    cells = set()
+    for i in (-1, 0, 1):
+        cell_lat = lat + i * dlat
+        if not -90 <= cell_lat <= 90:
+            continue
+        for j in (-1, 0, 1):
+            cell_lng = (lng + j * dlng + 180) % 360 - 180
+            cells.add(encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+# ============ QUERIES ============
+
+def cell_filter(cells):
+    """Q matching places in any of the cells, as index range scans."""
+    query = Q()
+    for cell in cells:
+        # '~' sorts after every base-32 character
+        query |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+    return query
+
+
+def places_within(places, lat, lng, radius_km):
+    """Return places within radius_km of a point, nearest first.
+
+    Args:
+        places (QuerySet): Places to search, e.g. Place.objects
+        lat, lng (float): Center
+        radius_km (float): Radius
+
+    Returns:
+        list: (distance in km, place id) pairs
+    """
+    candidates = (
+        places.filter(cell_filter(covering_cells(lat, lng, radius_km)))
+        .exclude(geohash='')
+        .values_list('pk', 'latitude', 'longitude')
+    )
+    found = [
+        (haversine(lat, lng, place_lat, place_lng), pk)
+        for pk, place_lat, place_lng in candidates
+    ]
+    return sorted(hit for hit in found if hit[0] <= radius_km)
+
+
+def nearest_places(places, lat, lng, k, radius_km=25):
+    """Return the k places nearest to a point, nearest first.
+
+    Searches a radius that doubles until it holds k places (or reaches
+    MAX_RADIUS_KM); every place within that radius was considered, so the
+    first k are exact.
+
+    Returns:
+        list: Up to k (distance in km, place id) pairs
+    """
+    while True:
+        found = places_within(places, lat, lng, radius_km)
+        if len(found) >= k or radius_km >= MAX_RADIUS_KM:
+            return found[:k]
+        radius_km = min(radius_km * 2, MAX_RADIUS_KM)
@@ -0,0 +1,129 @@
+"""ingredients.py
+
+Parser for free-text recipe ingredients.
+
+Splits lines like "2 xícaras de farinha de trigo" into a quantity (2.0),
+a canonical unit ('xicara') and a canonical ingredient key
+('farinha de trigo'), which links RecipeIngredient rows to the shared
+Ingredient table so ingredient filters are index lookups instead of
+substring scans.
+
+The parser is a pure function of the text, so the backfill command can
+run it in worker processes.
+"""
+
+import re
+import unicodedata
+from fractions import Fraction
+from typing import NamedTuple, Optional
+
+from .text import fold
+
+# ============ CONFIGURATION ============
+
+# Folded unit spellings -> canonical unit
+UNITS = {
+    'xicara': 'xicara', 'xicaras': 'xicara', 'xic': 'xicara',
+    'colher de sopa': 'colher de sopa', 'colheres de sopa': 'colher de sopa',
+    'colher (sopa)': 'colher de sopa', 'colheres (sopa)': 'colher de sopa',
+    'colher de cha': 'colher de cha', 'colheres de cha': 'colher de cha',
+    'colher (cha)': 'colher de cha', 'colheres (cha)': 'colher de cha',
+    'colher de sobremesa': 'colher de sobremesa', 'colheres de sobremesa': 'colher de sobremesa',
+    'colher': 'colher', 'colheres': 'colher',
+    'copo': 'copo', 'copos': 'copo',
+    'lata': 'lata', 'latas': 'lata',
+    'caixa': 'caixa', 'caixas': 'caixa', 'caixinha': 'caixa', 'caixinhas': 'caixa',
+    'pacote': 'pacote', 'pacotes': 'pacote',
+    'pitada': 'pitada', 'pitadas': 'pitada',
+    'dente': 'dente', 'dentes': 'dente',
+    'fatia': 'fatia', 'fatias': 'fatia',
+    'unidade': 'unidade', 'unidades': 'unidade',
+    'maco': 'maco', 'macos': 'maco',
+    'ramo': 'ramo', 'ramos': 'ramo',
+    'folha': 'folha', 'folhas': 'folha',
+    'g': 'g', 'gr': 'g', 'grama': 'g', 'gramas': 'g',
+    'kg': 'kg', 'quilo': 'kg', 'quilos': 'kg',
+    'mg': 'mg',
+    'ml': 'ml', 'mililitro': 'ml', 'mililitros': 'ml',
+    'l': 'l', 'litro': 'l', 'litros': 'l',
+}
+# Longest spellings first so "colher de sopa" wins over "colher"
+UNIT_PATTERN = re.compile(
+    r'^(%s)(?=\s|$|\d)' % '|'.join(re.escape(u) for u in sorted(UNITS, key=len, reverse=True))
+)
+
+VULGAR_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+QUANTITY = re.compile(r'^(\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)\s*(?:a\s+\d+(?:[.,]\d+)?\s*)?')
+WORDS_AS_NUMBERS = {'um': 1, 'uma': 1, 'dois': 2, 'duas': 2, 'tres': 3, 'meio': 0.5, 'meia': 0.5}
+
+# Trailing notes that do not change the ingredient
+NOTES = re.compile(r'\s*(\(.*?\)|,.*|\ba gosto\b.*|\bpara\b.*|\bquanto baste\b.*)$')
+LEADING_OF = re.compile(r'^(de|do|da|dos|das)\s+')
+NAME_MAX_LENGTH = 100
+
+
+class ParsedIngredient(NamedTuple):
+    """Structured form of an ingredient line."""
+    quantity: Optional[float]
+    unit: str
+    name: str   # Display name, lowercase with accents
+    key: str    # Canonical key: folded and singular
+
+
+def parse_quantity(text):
+    """Return (quantity, rest of text); quantity is None if absent."""
+    for char, fraction in VULGAR_FRACTIONS.items():
+        text = text.replace(char, f' {fraction}')
+    text = text.strip()
+    match = QUANTITY.match(text)
+    if match:
+        try:
+            total = sum(Fraction(part.replace(',', '.')) for part in match.group(1).split())
+        except (ZeroDivisionError, ValueError):
+            # "1/0 de sal": not a quantity, keep the line as typed
+            return None, text
+        return float(total), text[match.end():]
+    first, _, rest = text.partition(' ')
+    if fold(first) in WORDS_AS_NUMBERS:
+        return float(WORDS_AS_NUMBERS[fold(first)]), rest
+    return None, text
+
+
+def singular(word):
+    """Best-effort Portuguese singular of a folded word."""
+    if len(word) <= 3:
+        return word
+    for plural, single in (('oes', 'ao'), ('aes', 'ao'), ('ns', 'm'), ('res', 'r'), ('zes', 'z')):
+        if word.endswith(plural):
+            return word[:-len(plural)] + single
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def canonical_key(name):
+    """Fold a display name and make each word singular ("Ovos caipiras" -> "ovo caipira")."""
+    return ' '.join(singular(word) for word in fold(name).split())[:NAME_MAX_LENGTH]
+
+
+def parse_ingredient(text):
+    """Split an ingredient line into quantity, unit and ingredient.
+
+    Args:
+        text (str): Free text, e.g. "1 1/2 xícara (chá) de açúcar refinado"
+
+    Returns:
+        ParsedIngredient: e.g. (1.5, 'xicara', 'açúcar refinado', 'acucar refinado');
+        name and key are empty if nothing is left after the quantity and unit
+    """
+    quantity, rest = parse_quantity(' '.join(unicodedata.normalize('NFC', text).lower().split()))
+    unit = ''
+    match = UNIT_PATTERN.match(fold(rest))
+    if match:
+        unit = UNITS[match.group(1)]
+        # Folding keeps one character per letter, so offsets carry over
+        rest = rest[match.end():].strip()
+        rest = re.sub(r'^\((cha|chá|sopa)\)\s*', '', rest)
+    rest = LEADING_OF.sub('', rest.strip())
+    name = NOTES.sub('', rest).strip(' .;-')[:NAME_MAX_LENGTH]
+    return ParsedIngredient(quantity, unit, name, canonical_key(name))
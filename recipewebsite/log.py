@@ -0,0 +1,160 @@
+"""log.py
+
+Logging plumbing configured by LOGGING in settings.py.
+
+Request threads only put records on an in-memory queue (QueueLogHandler);
+a listener thread formats them as one JSON object per line and writes
+them to stderr, so slow or blocked output never holds up a request.
+Messages use %-style arguments, and extra={...} values are serialized
+by the listener, so nothing is formatted for records that are dropped.
+
+Every record carries the request id set by RequestIDMiddleware (taken
+from an X-Request-ID header or generated, and echoed in the response),
+or '-' outside requests. DEBUG records are sampled (LOG_DEBUG_SAMPLE_RATE)
+so debug logging can be turned on for hot paths in production.
+
+This module must not import models: it is loaded while logging is
+configured, before the apps.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# ============ CONFIGURATION ============
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')   # Accepted client supplied ids
+QUEUE_SIZE = 10000      # Records waiting for the listener; more are dropped
+# Attributes every LogRecord has; anything else came from extra={...}
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+_request_id = contextvars.ContextVar('request_id', default='-')
+
+
+# ============ REQUEST ID ============
+
+def get_request_id():
+    """Return the id of the request being handled, or '-'."""
+    return _request_id.get()
+
+
+class RequestIDMiddleware:
+    """Tag the request (and its log records) with a request id."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = _request_id.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+# ============ FILTERS ============
+
+class RequestIDFilter(logging.Filter):
+    """Attach the current request id to records (on the request thread).
+
+    django.request logs errors after the middleware returned, but passes
+    the request along.
+    """
+
+    def filter(self, record):
+        request = getattr(record, 'request', None)
+        record.request_id = getattr(request, 'request_id', None) or _request_id.get()
+        return True
+
+
+class DebugSampleFilter(logging.Filter):
+    """Keep only a random fraction of DEBUG records.
+
+    Args:
+        rate (float): Fraction of DEBUG records kept, 0 to 1
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+# ============ FORMATTING ============
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS:
+                entry[key] = plain(value)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def plain(value):
+    """Turn form errors (ErrorDict, ErrorList, or lists of them) into plain data."""
+    if hasattr(value, 'get_json_data'):
+        return value.get_json_data()
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+# ============ HANDLER ============
+
+class QueueLogHandler(QueueHandler):
+    """Queue records for a listener thread that writes them to stderr as JSON.
+
+    Each handler starts its own listener, stopped (after flushing the
+    queue) when the process exits. Records that arrive while the queue
+    is full are dropped instead of blocking the request.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        super().__init__(queue.Queue(queue_size))
+        output = logging.StreamHandler()
+        output.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, output, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Interpolate %-args now, as they may change after the call returns;
+        # tracebacks and extra={...} values are formatted by the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
@@ -0,0 +1,246 @@
+"""mail.py
+
+Outbox email backend and its delivery worker.
+
+With EMAIL_BACKEND = 'recipewebsite.mail.OutboxBackend', sending an
+email (password reset, send_mail(), ...) only inserts OutgoingEmail rows,
+so requests never wait on an SMTP handshake. Delivery then drains the
+outbox in batches through OUTBOX_DELIVERY_BACKEND (SMTP in production,
+console or locmem for development), keeping one connection open for the
+whole run. A failed message is retried with exponential backoff and
+given up after MAX_ATTEMPTS.
+
+Messages are claimed by moving them to 'sending' with a lease, in a short
+transaction; sending happens outside it. If a worker dies mid-batch,
+its messages become due again when the lease expires.
+
+Delivery runs in a daemon thread of the process that queued the mail
+(OUTBOX_WORKER='thread') or in `manage.py send_outbox`
+(OUTBOX_WORKER='command').
+"""
+
+import base64
+import email
+import logging
+import threading
+from datetime import timedelta
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(minutes=1)   # Doubles after every failed attempt
+BACKOFF_MAX = timedelta(hours=6)
+LEASE = timedelta(minutes=5)          # Claimed messages are retried after this if not sent
+
+
+# ============ SERIALIZATION ============
+
+def to_row(message):
+    """Return an unsaved OutgoingEmail for an EmailMessage."""
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            attachments.append({'mime': base64.b64encode(attachment.as_bytes()).decode()})
+        else:
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                content = content.encode()
+            attachments.append({
+                'filename': filename,
+                'content': base64.b64encode(content).decode(),
+                'mimetype': mimetype,
+            })
+    return OutgoingEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+        attachments=attachments,
+    )
+
+
+def to_message(row):
+    """Rebuild the EmailMessage of an OutgoingEmail."""
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        alternatives=[tuple(alternative) for alternative in row.alternatives],
+    )
+    for attachment in row.attachments:
+        if 'mime' in attachment:
+            message.attach(email.message_from_bytes(base64.b64decode(attachment['mime'])))
+        else:
+            message.attach(attachment['filename'], base64.b64decode(attachment['content']), attachment['mimetype'])
+    return message
+
+
+# ============ BACKEND ============
+
+class OutboxBackend(BaseEmailBackend):
+    """Email backend that queues messages in the outbox table."""
+
+    def send_messages(self, email_messages):
+        rows = [to_row(message) for message in email_messages if message.recipients()]
+        if not rows:
+            return 0
+        OutgoingEmail.objects.bulk_create(rows)
+        if settings.OUTBOX_WORKER == 'thread':
+            transaction.on_commit(start_worker)
+        return len(rows)
+
+
+# ============ DELIVERY ============
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Lease up to batch_size due messages to this worker.
+
+    Returns:
+        list: Claimed OutgoingEmail rows
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutgoingEmail.PENDING, OutgoingEmail.SENDING], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+            status=OutgoingEmail.SENDING, next_attempt_at=now + LEASE,
+        )
+    return rows
+
+
+def backoff(attempts):
+    """Delay before the next attempt after `attempts` failures."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def record_failure(row, error):
+    """Schedule a retry of a message with backoff, or give up after MAX_ATTEMPTS."""
+    attempts = row.attempts + 1
+    logger.warning("Email %s failed (attempt %s): %s", row.pk, attempts, error)
+    OutgoingEmail.objects.filter(pk=row.pk).update(
+        status=OutgoingEmail.FAILED if attempts >= MAX_ATTEMPTS else OutgoingEmail.PENDING,
+        attempts=attempts,
+        next_attempt_at=timezone.now() + backoff(attempts),
+        last_error=str(error)[:1000],
+    )
+
+
+def deliver(rows, delivery):
+    """Send claimed rows over an open delivery connection and record the results.
+
+    A failed message is scheduled for a retry and the connection reopened,
+    since the server may have dropped it. If it cannot be reopened, the
+    rest of the batch is scheduled for a retry too.
+
+    Returns:
+        tuple: (sent, failed, connected) where connected is False if the
+            server became unreachable
+    """
+    sent = []
+    failed = 0
+    connected = True
+    for i, row in enumerate(rows):
+        try:
+            delivery.send_messages([to_message(row)])
+        except Exception as e:
+            failed += 1
+            record_failure(row, e)
+            try:
+                delivery.close()
+                delivery.open()
+            except Exception as e:
+                for rest in rows[i + 1:]:
+                    record_failure(rest, e)
+                failed += len(rows) - i - 1
+                connected = False
+                break
+        else:
+            sent.append(row.pk)
+    OutgoingEmail.objects.filter(pk__in=sent).update(
+        status=OutgoingEmail.SENT, sent_at=timezone.now(), last_error='',
+    )
+    return len(sent), failed, connected
+
+
+def send_pending(batch_size=BATCH_SIZE):
+    """Deliver every due message, reusing one connection for the whole run.
+
+    Returns:
+        tuple: (sent, failed) counts
+    """
+    delivery = get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+    total_sent = total_failed = 0
+    opened = False
+    try:
+        while rows := claim_batch(batch_size):
+            if not opened:
+                try:
+                    delivery.open()
+                except Exception as e:
+                    # Server unreachable: retry the claimed messages later
+                    for row in rows:
+                        record_failure(row, e)
+                    return total_sent, total_failed + len(rows)
+                opened = True
+            sent, failed, connected = deliver(rows, delivery)
+            total_sent += sent
+            total_failed += failed
+            if not connected:
+                break
+    finally:
+        if opened:
+            delivery.close()
+    return total_sent, total_failed
+
+
+_worker_lock = threading.Lock()
+_wanted = threading.Event()
+
+
+def start_worker():
+    """Drain the outbox in a daemon thread, unless one is already running
+    here (it then makes one more pass before stopping)."""
+    _wanted.set()
+    if not _worker_lock.acquire(blocking=False):
+        return
+    threading.Thread(target=_work, name='outbox-worker', daemon=True).start()
+
+
+def _work():
+    # A message queued while a pass ends can miss its last claim_batch();
+    # start_worker() flagged it, so pass again after releasing the lock
+    while True:
+        _wanted.clear()
+        try:
+            send_pending()
+        except Exception:
+            logger.exception("Outbox delivery failed")
+        finally:
+            connection.close()
+            _worker_lock.release()
+        if not _wanted.is_set() or not _worker_lock.acquire(blocking=False):
+            return
@@ -0,0 +1,77 @@
+"""backfill_ingredients.py
+
+Management command that parses existing RecipeIngredient rows and links
+them to canonical Ingredient rows.
+
+Text is parsed in a process pool using every core; the parent process
+alone talks to the database, reading rows by primary key range and
+writing results in bulk. New rows are parsed on save, so this only needs
+to run once (or again after parser changes, with --all).
+
+Usage:
+    python manage.py backfill_ingredients
+    python manage.py backfill_ingredients --all --workers 4 --chunk-size 5000
+"""
+
+import os
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from recipewebsite.ingredients import parse_ingredient
+from recipewebsite.models import Ingredient, RecipeIngredient
+
+
+def _parse(item):
+    pk, text = item
+    return pk, parse_ingredient(text)
+
+
+class Command(BaseCommand):
+    help = "Parse ingredient lines into quantity, unit and canonical Ingredient"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per database batch")
+        parser.add_argument('--all', action='store_true', help="Re-parse rows that are already linked")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        rows = RecipeIngredient.objects.order_by('pk')
+        if not options['all']:
+            rows = rows.filter(ingredient__isnull=True)
+        last_pk = 0
+        total = 0
+        # Workers are forked without database connections
+        connections.close_all()
+        with Pool(options['workers']) as pool:
+            while True:
+                chunk = list(rows.filter(pk__gt=last_pk).values_list('pk', 'text')[:chunk_size])
+                if not chunk:
+                    break
+                last_pk = chunk[-1][0]
+                parsed = pool.map(_parse, chunk, chunksize=256)
+                self.store(parsed)
+                total += len(parsed)
+                self.stdout.write(f"Parsed {total} rows")
+        self.stdout.write(self.style.SUCCESS(f"Ingredients backfilled ({total} rows, "
+                                             f"{Ingredient.objects.count()} ingredients)"))
+
+    def store(self, parsed):
+        """Create missing Ingredients and update the parsed rows."""
+        names = {p.key: p.name for _, p in parsed if p.key}
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                [Ingredient(key=key, name=name) for key, name in names.items()],
+                ignore_conflicts=True,
+            )
+            ids = dict(Ingredient.objects.filter(key__in=names).values_list('key', 'pk'))
+            RecipeIngredient.objects.bulk_update(
+                [
+                    RecipeIngredient(pk=pk, quantity=p.quantity, unit=p.unit, ingredient_id=ids.get(p.key))
+                    for pk, p in parsed
+                ],
+                ['quantity', 'unit', 'ingredient'],
+                batch_size=500,
+            )
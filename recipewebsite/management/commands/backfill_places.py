@@ -0,0 +1,47 @@
+"""backfill_places.py
+
+Management command that parses Place.location into latitude, longitude
+and geohash for existing places.
+
+Places saved afterwards are parsed on save, so this only needs to run
+once (or again after geohash changes, with --all).
+
+Usage:
+    python manage.py backfill_places
+    python manage.py backfill_places --all --chunk-size 5000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipewebsite.models import Place
+
+# ============ CONFIGURATION ============
+FIELDS = ['latitude', 'longitude', 'geohash']
+
+
+class Command(BaseCommand):
+    help = "Parse place locations into indexed coordinates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Places per transaction")
+        parser.add_argument('--all', action='store_true', help="Re-parse places that already have a geohash")
+
+    def handle(self, *args, **options):
+        places = Place.objects.order_by('pk').only('pk', 'location')
+        if not options['all']:
+            places = places.filter(geohash='')
+        last_pk = 0
+        total = located = 0
+        while True:
+            chunk = list(places.filter(pk__gt=last_pk)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            for place in chunk:
+                place.set_coordinates()
+            with transaction.atomic():
+                Place.objects.bulk_update(chunk, FIELDS, batch_size=500)
+            total += len(chunk)
+            located += sum(1 for place in chunk if place.geohash)
+        self.stdout.write(self.style.SUCCESS(f"Places backfilled ({located} of {total} with coordinates)"))
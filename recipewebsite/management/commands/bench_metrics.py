@@ -0,0 +1,71 @@
+"""bench_metrics.py
+
+Management command that measures the cost of recording metrics.
+
+Times counter increments, histogram observations and a request through
+MetricsMiddleware (against the same request without it), plus one flush
+of the recorded series. Recording happens on every request, so it
+should stay in the microsecond range. Results go to a temporary store,
+not the one /metrics reads.
+
+Usage:
+    python manage.py bench_metrics
+    python manage.py bench_metrics --iterations 200000
+"""
+
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from recipewebsite import metrics
+
+# ============ CONFIGURATION ============
+BENCH_COUNTER = metrics.Counter('bench_metrics_total', "bench_metrics command runs", ('case',))
+BENCH_HISTOGRAM = metrics.Histogram('bench_metrics_seconds', "bench_metrics command timings", ('case',))
+
+
+class Command(BaseCommand):
+    help = "Measure the per-call overhead of recording metrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000, help="Calls per case")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root:
+            metrics._store = metrics.SQLiteStore(os.path.join(root, 'metrics.sqlite3'))
+            try:
+                self.bench(options['iterations'])
+            finally:
+                metrics._store = None
+                metrics._pending.clear()
+
+    def bench(self, n):
+        request = RequestFactory().get('/bench/')
+
+        def view(request):
+            return HttpResponse()
+
+        middleware = metrics.MetricsMiddleware(view)
+        cases = [
+            ('counter inc', lambda: BENCH_COUNTER.inc('bench')),
+            ('histogram observe', lambda: BENCH_HISTOGRAM.observe(0.042, 'bench')),
+            ('request, no middleware', lambda: view(request)),
+            ('request, MetricsMiddleware', lambda: middleware(request)),
+        ]
+        timings = {}
+        for label, call in cases:
+            start = time.perf_counter()
+            for _ in range(n):
+                call()
+            timings[label] = (time.perf_counter() - start) / n
+            self.stdout.write(f"{label:<28} {timings[label] * 1e6:8.2f} µs/call")
+        overhead = timings['request, MetricsMiddleware'] - timings['request, no middleware']
+        self.stdout.write(self.style.SUCCESS(f"Middleware overhead: {overhead * 1e6:.2f} µs/request"))
+
+        start = time.perf_counter()
+        metrics.flush()
+        self.stdout.write(f"Flush to the shared store: {(time.perf_counter() - start) * 1000:.2f} ms")
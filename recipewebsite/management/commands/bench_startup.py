@@ -0,0 +1,84 @@
+"""bench_startup.py
+
+Management command that measures how long a fresh process takes to serve
+its first request.
+
+Each run starts a new Python process with the same settings and times
+Django setup (settings, apps, models and the URLconf) and then the first
+and second GET of the index page through the full middleware stack, once
+cold and once after warm_up() (see recipewebsite/warmup.py). Medians of
+all runs are reported. With REDIS_URL set the cache outlives the runs,
+so clear it first for a cold figure.
+
+Usage:
+    python manage.py bench_startup
+    python manage.py bench_startup --runs 10 --path /category/1/
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# ============ CONFIGURATION ============
+# Runs in the child process; prints its timings as JSON on the last line
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+from django.conf import settings
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+timings = {'setup': time.perf_counter() - start}
+modules = set(sys.modules)
+if sys.argv[1] == 'warm':
+    from recipewebsite.warmup import warm_up
+    start = time.perf_counter()
+    warm_up()
+    timings['warm_up'] = time.perf_counter() - start
+from django.test import Client
+client = Client(SERVER_NAME=sys.argv[3])
+for label in ('first request', 'second request'):
+    start = time.perf_counter()
+    status = client.get(sys.argv[2]).status_code
+    timings[label] = time.perf_counter() - start
+timings['heavy modules'] = sorted({'PIL', 'numpy'} & modules)
+print(json.dumps({'status': status, 'timings': timings}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure process startup and first-request latency, cold and warmed up"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Processes started per mode")
+        parser.add_argument('--path', default='/index/', help="Page requested")
+
+    def handle(self, *args, **options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in '.*'), 'localhost')
+        for mode in ('cold', 'warm'):
+            results = [self.run_child(mode, options['path'], host) for _ in range(options['runs'])]
+            self.stdout.write(f"{mode} ({options['runs']} runs, median)")
+            for label in results[0]:
+                if label == 'heavy modules':
+                    continue
+                median = statistics.median(result[label] for result in results)
+                self.stdout.write(f"  {label:<16} {median * 1000:8.1f} ms")
+            self.stdout.write(f"  PIL/numpy loaded by setup: {', '.join(results[0]['heavy modules']) or 'no'}")
+
+    def run_child(self, mode, path, host):
+        """Start one process and return its timings."""
+        process = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, mode, path, host],
+            capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"Benchmark process failed:\n{process.stderr}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        if result['status'] != 200:
+            raise CommandError(f"{path} answered {result['status']}")
+        return result['timings']
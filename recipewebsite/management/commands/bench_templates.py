@@ -0,0 +1,127 @@
+"""bench_templates.py
+
+Management command that renders the ported templates with both engines.
+
+Each template in recipewebsite/jinja2/ is rendered by the Django and the
+Jinja2 backend on the same context and anonymous request, the way the
+views build them from the current database (the first approved recipes,
+categories and reviews), plus a copy of a recipe without a difficulty
+(the column is nullable) in the index and recipe pages. Context
+processors run as in a real request.
+Besides the time per render, it reports whether both outputs are the
+same once whitespace is collapsed (and CSRF tokens, masked differently
+on every render, are blanked), to catch ports drifting apart.
+
+Usage:
+    python manage.py bench_templates
+    python manage.py bench_templates --iterations 500 --template index.html
+"""
+
+import copy
+import re
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+
+from recipewebsite import nutrition
+from recipewebsite.categories import category_summary
+from recipewebsite.forms import ReviewForm
+from recipewebsite.models import Note, PreparationStep, Recipe, RecipeIngredient
+from recipewebsite.scores import highlight_ids
+from recipewebsite.similar import similar_recipes
+from recipewebsite.views import CALORIE_LIMITS, PAGE_SIZE, SECTION_SIZE, review_list
+
+# ============ CONFIGURATION ============
+TEMPLATES = (
+    'recipe-card.html', 'pagination.html', 'index.html',
+    'category.html', 'search-recipe.html', 'recipe.html',
+)
+CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+def normalized(html):
+    """Collapse whitespace and blank CSRF tokens, for comparing outputs."""
+    return ' '.join(CSRF_TOKEN.sub('name="csrfmiddlewaretoken"', html).split())
+
+
+def listing_contexts():
+    """Return a context per listing template, like the views build them."""
+    approved = Recipe.objects.filter(is_approved=True).select_related('category', 'creator').order_by('-id')
+    recipes = Paginator(approved, PAGE_SIZE).page(1)
+    list(recipes)
+    if not recipes:
+        raise CommandError("No approved recipes to render")
+    trending_ids, top_rated_ids = highlight_ids(SECTION_SIZE)
+    highlights = approved.in_bulk(trending_ids + top_rated_ids)
+    categories = category_summary()
+    no_difficulty = copy.copy(recipes[0])
+    no_difficulty.difficulty = None
+    listing = {'recipes': recipes, 'sort': 'recent', 'max_kcal': None, 'calorie_limits': CALORIE_LIMITS}
+    return {
+        'recipe-card.html': {'recipe': recipes[0]},
+        'pagination.html': {'recipes': recipes, 'sort': 'recent', 'q': 'bolo'},
+        'index.html': {
+            **listing,
+            'trending': [no_difficulty] + [highlights[pk] for pk in trending_ids if pk in highlights],
+            'top_rated': [highlights[pk] for pk in top_rated_ids if pk in highlights],
+        },
+        'category.html': {**listing, 'category': categories[0], 'categories': categories},
+        'search-recipe.html': {'searched': 'bolo', 'q': 'bolo', 'recipes': recipes},
+        # Not rendered itself: the recipe page is built for it (see recipe_context)
+        'no_difficulty': no_difficulty,
+    }
+
+
+def recipe_context(request, recipe):
+    """Return the recipe page context, like views.recipe builds it."""
+    ingredients = list(RecipeIngredient.objects.filter(recipe=recipe))
+    reviews = review_list(request=request, recipe=recipe)
+    list(reviews)
+    return {
+        'reviews': reviews,
+        'recipe': recipe,
+        'notes': list(Note.objects.filter(recipe_id=recipe.pk)),
+        'steps': list(PreparationStep.objects.filter(recipe_id=recipe.pk).order_by('sequence')),
+        'ingredients': ingredients,
+        'review_form': ReviewForm(),
+        'similar_recipes': list(similar_recipes(recipe)),
+        'scaling': nutrition.scaling_payload(recipe, ingredients),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare Django and Jinja2 render times of the ported templates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Renders per template and engine")
+        parser.add_argument('--template', choices=TEMPLATES, help="Only this template")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/index/')
+        request.user = AnonymousUser()
+        contexts = listing_contexts()
+        contexts['recipe.html'] = recipe_context(request, contexts.pop('no_difficulty'))
+        names = [options['template']] if options['template'] else TEMPLATES
+        n = options['iterations']
+
+        self.stdout.write(f"{'template':<20} {'django':>10} {'jinja2':>10} {'speedup':>8}  output")
+        for name in names:
+            context = contexts[name]
+            timings, outputs = {}, {}
+            for engine in ('django', 'jinja2'):
+                template = engines[engine].get_template(name)
+                # The first render loads lazy attributes; leave it out
+                outputs[engine] = template.render(dict(context), request)
+                start = time.perf_counter()
+                for _ in range(n):
+                    template.render(dict(context), request)
+                timings[engine] = (time.perf_counter() - start) / n
+            same = normalized(outputs['django']) == normalized(outputs['jinja2'])
+            self.stdout.write(
+                f"{name:<20} {timings['django'] * 1000:8.2f}ms {timings['jinja2'] * 1000:8.2f}ms "
+                f"{timings['django'] / timings['jinja2']:7.1f}x  {'same' if same else self.style.WARNING('differs')}"
+            )
@@ -0,0 +1,68 @@
+"""build_autocomplete.py
+
+Management command that rebuilds the search autocomplete snapshot.
+
+Run it after deploys and periodically (e.g. hourly from cron) so every
+worker picks up popularity changes and recipes approved in other
+processes on its next start. With --bench it also measures lookup
+latency on prefixes taken from the index itself.
+
+Usage:
+    python manage.py build_autocomplete
+    python manage.py build_autocomplete --bench 20000
+"""
+
+import os
+import random
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipewebsite.autocomplete import PrefixIndex, build_entries, write_snapshot
+from recipewebsite.text import normalize
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search autocomplete snapshot from approved recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bench', type=int, default=0, metavar='N', help="Time N lookups after building")
+
+    def handle(self, *args, **options):
+        entries = build_entries()
+        write_snapshot(entries)
+        size = os.path.getsize(settings.AUTOCOMPLETE_SNAPSHOT)
+        self.stdout.write(f"Wrote {len(entries)} entries to {settings.AUTOCOMPLETE_SNAPSHOT} ({size // 1024} KB)")
+
+        if options['bench'] and entries:
+            start = time.perf_counter()
+            index = PrefixIndex(entries)
+            self.stdout.write(f"Index built in {(time.perf_counter() - start) * 1000:.0f} ms, "
+                              f"{len(index.keys)} keys, ~{self.footprint(index) // 1024} KB")
+            self.bench(index, options['bench'])
+
+    def bench(self, index, count):
+        """Time lookups of random 2 to 8 character prefixes of indexed keys."""
+        rng = random.Random(0)
+        queries = []
+        for _ in range(count):
+            key = normalize(rng.choice(index.keys))
+            queries.append(key[:rng.randint(2, min(8, max(2, len(key))))])
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        for label, q in (('p50', 0.5), ('p99', 0.99), ('max', 1.0)):
+            value = timings[min(len(timings) - 1, int(q * len(timings)))] * 1000
+            self.stdout.write(f"  {label} {value:.3f} ms")
+
+    def footprint(self, index):
+        """Rough memory used by the index's lists and strings."""
+        size = sum(sys.getsizeof(values) for values in (index.keys, index.refs, index.weights, index.tree, index.entries))
+        size += sum(sys.getsizeof(key) for key in index.keys)
+        size += sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) for entry in index.entries)
+        return size
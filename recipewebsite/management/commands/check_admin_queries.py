@@ -0,0 +1,87 @@
+"""check_admin_queries.py
+
+Management command that checks the admin stays within a query budget.
+
+Renders, as a superuser, the changelist, add page and first change page
+of every model registered in the admin, plus the moderation queue, and
+counts the SQL queries of each. Fails (non-zero exit) if any page goes
+over its budget, so it can be run against a real database after admin
+changes. Pages are only read; the login session is removed at the end.
+The same budgets are checked by recipewebsite/tests.py on a test
+database, together with checks that pages don't run more queries when
+there are more rows.
+
+Usage:
+    python manage.py check_admin_queries
+    python manage.py check_admin_queries --user admin@example.com --verbose
+"""
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from recipewebsite.models import User
+
+# ============ CONFIGURATION ============
+BUDGETS = {
+    'changelist': 12,
+    'add': 15,
+    'change': 25,
+    'moderation': 12,
+}
+
+
+class Command(BaseCommand):
+    help = "Fail if any admin page runs more SQL queries than its budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email of the superuser to render pages as (default: the first one)")
+        parser.add_argument('--verbose', action='store_true', help="Print the queries of pages over budget")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_superuser=True, is_active=True)
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError("No active superuser to render the admin as")
+
+        client = Client()
+        client.force_login(user)
+        failures = []
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for page, url in self.pages(user):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                count = len(queries)
+                budget = BUDGETS[page]
+                ok = response.status_code == 200 and count <= budget
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f"{count:3d}/{budget:<3d} {response.status_code} {url}"))
+                if not ok:
+                    failures.append(url)
+                    if options['verbose']:
+                        for query in queries.captured_queries:
+                            self.stdout.write(f"      {query['sql'][:200]}")
+        client.logout()
+
+        if failures:
+            raise CommandError(f"{len(failures)} admin page(s) over budget or failing")
+        self.stdout.write(self.style.SUCCESS("All admin pages within budget"))
+
+    def pages(self, user):
+        """Yield (budget name, url) for every admin page to check."""
+        request = RequestFactory().get('/')
+        request.user = user
+        for model, model_admin in admin.site._registry.items():
+            info = (model._meta.app_label, model._meta.model_name)
+            yield 'changelist', reverse('admin:%s_%s_changelist' % info)
+            if model_admin.has_add_permission(request):
+                yield 'add', reverse('admin:%s_%s_add' % info)
+            first = model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+            if first is not None:
+                yield 'change', reverse('admin:%s_%s_change' % info, args=[first])
+        yield 'moderation', reverse('admin:recipewebsite_recipe_moderation')
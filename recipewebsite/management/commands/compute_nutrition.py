@@ -0,0 +1,70 @@
+"""compute_nutrition.py
+
+Management command that computes nutrition facts for the whole catalog.
+
+With --nutrients it first loads per-100 g nutrient values into the
+Ingredient table from a CSV file (columns: key, name, kcal, protein,
+carbs, fat, unit_weight); without a path it loads the table shipped in
+recipewebsite/data/nutrients.csv. Recipes edited on the site are updated
+individually; run this after loading nutrients or backfilling ingredients.
+
+Usage:
+    python manage.py compute_nutrition
+    python manage.py compute_nutrition --nutrients
+    python manage.py compute_nutrition --nutrients path/to/table.csv
+"""
+
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipewebsite.models import Ingredient
+from recipewebsite.nutrition import BATCH_SIZE, NUTRIENTS, update_recipes
+
+# ============ CONFIGURATION ============
+DEFAULT_TABLE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'nutrients.csv')
+TABLE_FIELDS = [*NUTRIENTS, 'unit_weight']
+
+
+class Command(BaseCommand):
+    help = "Compute per-serving nutrition facts for every recipe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--nutrients', nargs='?', const=DEFAULT_TABLE, metavar='CSV',
+            help="Load ingredient nutrients from a CSV file first (default: the bundled table)",
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Recipes per database batch")
+
+    def handle(self, *args, **options):
+        if options['nutrients']:
+            loaded = self.load_table(os.path.normpath(options['nutrients']))
+            self.stdout.write(f"Loaded nutrients for {loaded} ingredients")
+        start = time.perf_counter()
+        count = update_recipes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Nutrition computed for {count} recipes in {time.perf_counter() - start:.2f}s"
+        ))
+
+    def load_table(self, path):
+        """Create or update Ingredient rows from the CSV table."""
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = {row['key']: row for row in csv.DictReader(f)}
+
+        def number(value):
+            return float(value) if value not in (None, '') else None
+
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                [Ingredient(key=key, name=row['name']) for key, row in rows.items()],
+                ignore_conflicts=True,
+            )
+            ingredients = list(Ingredient.objects.filter(key__in=rows))
+            for ingredient in ingredients:
+                for field in TABLE_FIELDS:
+                    setattr(ingredient, field, number(rows[ingredient.key][field]))
+            Ingredient.objects.bulk_update(ingredients, TABLE_FIELDS, batch_size=500)
+        return len(ingredients)
@@ -0,0 +1,33 @@
+"""compute_scores.py
+
+Management command that folds new recipe events into trending scores.
+
+Run it periodically (e.g. every 5 minutes from cron); each run only reads
+events recorded since the previous one.
+
+Usage:
+    python manage.py compute_scores
+    python manage.py compute_scores --rebuild-aggregates
+"""
+
+from django.core.management.base import BaseCommand
+
+from recipewebsite.scores import BATCH_SIZE, compute_trending, rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = "Update trending scores from recipe events recorded since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Events per transaction")
+        parser.add_argument(
+            '--rebuild-aggregates', action='store_true',
+            help="Also recount ratings and favorites of every recipe",
+        )
+
+    def handle(self, *args, **options):
+        processed = compute_trending(options['batch_size'])
+        self.stdout.write(f"Processed {processed} events")
+        if options['rebuild_aggregates']:
+            rebuild_aggregates()
+            self.stdout.write("Rebuilt rating and favorite aggregates")
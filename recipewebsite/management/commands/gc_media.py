@@ -0,0 +1,146 @@
+"""gc_media.py
+
+Management command that deletes media files no database row refers to.
+
+Images of deleted or edited recipes, replaced avatars, failed uploads
+and their thumbnails are left in MEDIA_ROOT. The referenced file names
+are streamed from the database into a temporary SQLite table (an on-disk
+sorted set), and the media directories are walked with os.scandir; both
+sides are processed in batches, so memory stays flat however many files
+there are.
+
+Only files older than the grace period are deleted, so uploads whose row
+is not committed yet are safe. Deletes run in a thread pool.
+
+Usage:
+    python manage.py gc_media --dry-run
+    python manage.py gc_media --grace-hours 24 --workers 8
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from recipewebsite.models import Recipe, User
+from recipewebsite.thumbnails import THUMBNAIL_DIR, thumbnail_name
+
+# ============ CONFIGURATION ============
+FILE_FIELDS = [
+    (Recipe, ('img', 'sliderImg')),
+    (User, ('avatar',)),
+]
+DIRECTORIES = ('recipes', 'profile_images', THUMBNAIL_DIR)
+BATCH_SIZE = 900  # Below SQLite's bound parameter limit
+
+
+def walk(path):
+    """Yield os.DirEntry objects of the files under path, depth first."""
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from walk(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    except FileNotFoundError:
+        return
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Delete unreferenced files from the media directories"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+        parser.add_argument('--grace-hours', type=float, default=24, help="Keep files modified more recently")
+        parser.add_argument('--workers', type=int, default=8, help="Parallel deletes")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        cutoff = time.time() - options['grace_hours'] * 3600
+        with tempfile.TemporaryDirectory() as tmp:
+            refs = sqlite3.connect(os.path.join(tmp, 'refs.sqlite3'))
+            referenced = self.load_references(refs)
+            self.stdout.write(f"{referenced} referenced files")
+
+            scanned = orphans = 0
+            reclaimed = 0
+            with ThreadPoolExecutor(options['workers']) as pool:
+                for directory in DIRECTORIES:
+                    for batch in batched(walk(os.path.join(settings.MEDIA_ROOT, directory)), BATCH_SIZE):
+                        scanned += len(batch)
+                        names = {self.media_name(entry.path): entry for entry in batch}
+                        known = {
+                            row[0] for row in refs.execute(
+                                f"SELECT name FROM refs WHERE name IN ({','.join('?' * len(names))})",
+                                list(names),
+                            )
+                        }
+                        stale = []
+                        for name, entry in names.items():
+                            if name in known:
+                                continue
+                            stat = entry.stat(follow_symlinks=False)
+                            if stat.st_mtime < cutoff:
+                                stale.append(entry.path)
+                                reclaimed += stat.st_size
+                        orphans += len(stale)
+                        if options['dry_run']:
+                            for path in stale:
+                                self.stdout.write(f"Would delete {self.media_name(path)}")
+                        else:
+                            list(pool.map(self.remove, stale))
+            refs.close()
+
+        verb = "Would reclaim" if options['dry_run'] else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} files, {orphans} unreferenced. {verb} {filesizeformat(reclaimed)} "
+            f"in {time.perf_counter() - start:.2f}s"
+        ))
+
+    def load_references(self, refs):
+        """Stream referenced file names, and the names of their thumbnails,
+        into the refs table and return their count."""
+        refs.execute("CREATE TABLE refs (name TEXT PRIMARY KEY) WITHOUT ROWID")
+        for model, fields in FILE_FIELDS:
+            rows = model.objects.order_by().values_list(*fields).iterator(chunk_size=BATCH_SIZE)
+            for batch in batched(rows, BATCH_SIZE):
+                refs.executemany(
+                    "INSERT OR IGNORE INTO refs VALUES (?)",
+                    [(ref,) for row in batch for name in row if name for ref in (name, thumbnail_name(name))],
+                )
+            # Defaults are shared by every row that never got its own file
+            defaults = [model._meta.get_field(field).default for field in fields]
+            refs.executemany(
+                "INSERT OR IGNORE INTO refs VALUES (?)",
+                [(ref,) for name in defaults for ref in (name, thumbnail_name(name))],
+            )
+        refs.commit()
+        return refs.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+
+    def media_name(self, path):
+        """Return the name a FileField stores for a path under MEDIA_ROOT."""
+        return os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
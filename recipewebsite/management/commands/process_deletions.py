@@ -0,0 +1,37 @@
+"""process_deletions.py
+
+Management command that runs queued user and recipe deletions.
+
+Needed when DELETION_WORKER='command' (e.g. every minute from cron, or
+as a long-running service with --loop); with the default 'thread' worker
+it also picks up jobs interrupted by a restart.
+
+Usage:
+    python manage.py process_deletions
+    python manage.py process_deletions --loop --interval 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipewebsite.deletion import CHUNK_SIZE, run_pending
+from recipewebsite.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = "Run queued background deletions of users and recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new jobs")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            for job in run_pending(options['chunk_size']):
+                style = self.style.SUCCESS if job.status == DeletionJob.DONE else self.style.ERROR
+                self.stdout.write(style(f"{job} ({job.done}/{job.total} rows)"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+"""ratelimit_stats.py
+
+Management command that reports throttled requests per rate limit scope.
+
+Usage:
+    python manage.py ratelimit_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from recipewebsite.ratelimit import throttled_totals
+
+
+class Command(BaseCommand):
+    help = "Show how many requests each rate limit scope has throttled"
+
+    def handle(self, *args, **options):
+        totals = throttled_totals()
+        if not totals:
+            self.stdout.write("No throttled requests recorded")
+            return
+        for scope, count in sorted(totals.items()):
+            self.stdout.write(f"{scope}: {count}")
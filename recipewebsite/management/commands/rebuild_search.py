@@ -0,0 +1,67 @@
+"""rebuild_search.py
+
+Management command that recomputes Recipe.search_text for every recipe
+and rebuilds the trigram vocabulary from approved recipes.
+
+Needed once after deploying search and after bulk edits that bypass the
+views and admin (e.g. raw imports); running it periodically also drops
+terms of recipes that were since removed. Missing terms are added first
+and stale ones deleted at the end, so spelling correction keeps working
+while it runs (terms added by recipes approved meanwhile are kept).
+Cached search results are dropped when it finishes.
+
+Usage:
+    python manage.py rebuild_search
+    python manage.py rebuild_search --chunk-size 2000
+"""
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from recipewebsite.models import Recipe, RecipeIngredient, SearchTerm, SearchTrigram
+from recipewebsite.search import index_terms, invalidate, search_text
+from recipewebsite.text import tokenize
+
+
+class Command(BaseCommand):
+    help = "Recompute recipe search text and the trigram vocabulary"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Recipes per database batch")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_term = SearchTerm.objects.aggregate(last=Max('pk'))['last'] or 0
+        rows = list(Recipe.objects.order_by('pk').values_list('pk', 'name', 'is_approved'))
+        vocabulary = set()
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            texts = defaultdict(list)
+            ingredients = RecipeIngredient.objects.filter(recipe_id__in=[pk for pk, _, _ in chunk])
+            for recipe_id, text in ingredients.order_by('recipe_id', 'sequence').values_list('recipe_id', 'text'):
+                texts[recipe_id].append(text)
+            recipes = []
+            for pk, name, is_approved in chunk:
+                recipe = Recipe(pk=pk, search_text=search_text(name, texts[pk]))
+                if is_approved:
+                    vocabulary.update(tokenize(recipe.search_text))
+                recipes.append(recipe)
+            with transaction.atomic():
+                Recipe.objects.bulk_update(recipes, ['search_text'])
+
+        terms = sorted(vocabulary)
+        for start in range(0, len(terms), chunk_size):
+            index_terms(terms[start:start + chunk_size])
+        stale = [
+            pk for pk, term in SearchTerm.objects.filter(pk__lte=last_term).values_list('pk', 'term').iterator()
+            if term not in vocabulary
+        ]
+        for start in range(0, len(stale), chunk_size):
+            with transaction.atomic():
+                SearchTrigram.objects.filter(term_id__in=stale[start:start + chunk_size]).delete()
+                SearchTerm.objects.filter(pk__in=stale[start:start + chunk_size]).delete()
+        invalidate()
+        self.stdout.write(f"Indexed {len(rows)} recipes, {len(terms)} terms ({len(stale)} stale removed)")
@@ -0,0 +1,62 @@
+"""rebuild_similar.py
+
+Management command that rebuilds the "similar recipes" LSH index.
+
+Signatures are computed in a process pool using every core; the parent
+process alone talks to the database, reading recipes and writing results
+in chunks. Each chunk replaces its recipes' rows in one transaction, so
+similar recipes keep being served from the old rows while the rebuild
+runs (and if it stops halfway); rows of recipes that are no longer
+approved are removed at the end.
+
+Usage:
+    python manage.py rebuild_similar
+    python manage.py rebuild_similar --workers 4 --chunk-size 2000
+"""
+
+import os
+from collections import defaultdict
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from recipewebsite.models import Recipe, RecipeBand, RecipeIngredient, RecipeSignature
+from recipewebsite.similar import signature_for, store
+
+
+def _compute(item):
+    recipe_id, category_id, texts = item
+    return signature_for(recipe_id, category_id, texts)
+
+
+class Command(BaseCommand):
+    help = "Rebuild MinHash signatures and LSH buckets for all approved recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Recipes per database batch")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        ids = list(Recipe.objects.filter(is_approved=True).order_by('pk').values_list('pk', 'category_id'))
+        # Workers are forked without database connections
+        connections.close_all()
+        total = 0
+        with Pool(options['workers']) as pool:
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                texts = defaultdict(list)
+                rows = RecipeIngredient.objects.filter(recipe_id__in=[pk for pk, _ in chunk])
+                for recipe_id, text in rows.values_list('recipe_id', 'text'):
+                    texts[recipe_id].append(text)
+                items = [(pk, category_id, texts[pk]) for pk, category_id in chunk]
+                store(pool.map(_compute, items, chunksize=64))
+                total += len(items)
+                self.stdout.write(f"Indexed {total}/{len(ids)} recipes")
+
+        approved = Recipe.objects.filter(is_approved=True).values('pk')
+        with transaction.atomic():
+            RecipeSignature.objects.exclude(recipe_id__in=approved).delete()
+            RecipeBand.objects.exclude(recipe_id__in=approved).delete()
+        self.stdout.write(self.style.SUCCESS(f"Similar recipes index rebuilt ({total} recipes)"))
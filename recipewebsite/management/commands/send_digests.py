@@ -0,0 +1,28 @@
+"""send_digests.py
+
+Management command that emails notification digests to creators.
+
+Run it from cron once per frequency: hourly for users who chose hourly
+digests and once a day for daily ones. Digests are queued in the email
+outbox (see send_outbox).
+
+Usage:
+    python manage.py send_digests hourly
+    python manage.py send_digests daily
+"""
+
+from django.core.management.base import BaseCommand
+
+from recipewebsite.models import User
+from recipewebsite.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = "Email digests of new reviews and favorites to creators"
+
+    def add_arguments(self, parser):
+        parser.add_argument('frequency', choices=[User.DIGEST_HOURLY, User.DIGEST_DAILY])
+
+    def handle(self, *args, **options):
+        sent = send_digests(options['frequency'])
+        self.stdout.write(self.style.SUCCESS(f"Queued {sent} {options['frequency']} digests"))
@@ -0,0 +1,37 @@
+"""send_outbox.py
+
+Management command that delivers queued email from the outbox.
+
+Needed when OUTBOX_WORKER='command' (e.g. as a service with --loop);
+with the default 'thread' worker it also retries messages whose backoff
+has expired.
+
+Usage:
+    python manage.py send_outbox
+    python manage.py send_outbox --loop --interval 10 --batch-size 200
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipewebsite.mail import BATCH_SIZE, send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound email"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Messages claimed at a time")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new messages")
+        parser.add_argument('--interval', type=float, default=10, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            if sent or failed or not options['loop']:
+                style = self.style.ERROR if failed else self.style.SUCCESS
+                self.stdout.write(style(f"Sent {sent} emails, {failed} failed"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+"""warmup.py
+
+Management command that runs the warm-up steps and reports their timings.
+
+Web workers warm themselves up when they load the WSGI application
+(WARMUP_ON_BOOT); this command shows how long that takes, and primes
+shared caches (Redis) right after a deploy or a cache flush.
+
+Usage:
+    python manage.py warmup
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipewebsite.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Compile templates, prime caches and render first pages"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        timings = warm_up()
+        for name, seconds, result in timings:
+            style = self.style.ERROR if result is None else str
+            self.stdout.write(style(f"{name:<12} {seconds * 1000:8.1f} ms  {'failed' if result is None else result}"))
+        self.stdout.write(self.style.SUCCESS(f"Warm-up took {(time.perf_counter() - start) * 1000:.0f} ms"))
+        if any(result is None for _, _, result in timings):
+            raise CommandError("Some warm-up steps failed (see the log)")
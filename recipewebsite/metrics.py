@@ -0,0 +1,374 @@
+"""metrics.py
+
+In-process metrics, aggregated across worker processes and served at
+/metrics in the Prometheus text format.
+
+Recording only adds to a dict in memory under a lock (about a
+microsecond per value; see `manage.py bench_metrics`). A daemon thread
+in each process flushes the accumulated deltas every
+METRICS_FLUSH_INTERVAL seconds into a SQLite file shared by all
+processes on the host (one UPSERT transaction per flush), so totals add
+up across gunicorn workers and survive workers being restarted. A scrape flushes its own process
+first and reads the totals from the file.
+
+Metrics:
+    http_request_duration_seconds: Latency histogram per view (URL name)
+    http_responses_total: Responses per view and status code
+    db_queries_total, db_query_duration_seconds_total: SQL per view
+    cache_requests_total: Cache reads by result (hit or miss), for the
+        hit ratio
+    image_processing_duration_seconds: Avatar/recipe resizing and
+        thumbnail creation
+Queue depths and rate limit totals are read when /metrics is scraped
+(see views.metrics_view).
+"""
+
+import atexit
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.core.cache.backends.redis import RedisCache as BaseRedisCache
+from django.db import connection
+
+from .profiling import QueryTimer
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+IMAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# family name -> (type, help, bucket bounds as 'le' strings or None)
+_families = {}
+# (family, suffix, labels, le) -> amount added since the last flush
+_pending = defaultdict(float)
+_lock = threading.Lock()
+_flusher = None
+
+
+def escape(value):
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_text(names, values):
+    """Render label pairs, e.g. view="index",status="200"."""
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+# ============ METRIC TYPES ============
+
+class Counter:
+    """Monotonic total, optionally per label values.
+
+    Args:
+        name (str): Metric name
+        help (str): Description
+        labels (tuple): Label names
+    """
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.labels = labels
+        self._keys = {}
+        _families[name] = ('counter', help, None)
+
+    def inc(self, *values, amount=1):
+        key = self._keys.get(values)
+        if key is None:
+            key = self._keys[values] = (self.name, '', label_text(self.labels, values), '')
+        with _lock:
+            _pending[key] += amount
+        if _flusher is None:
+            start_flusher()
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets.
+
+    Args:
+        name (str): Metric name
+        help (str): Description
+        labels (tuple): Label names
+        buckets (tuple): Increasing upper bounds; +Inf is added
+    """
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self._les = [repr(float(bound)) for bound in buckets] + ['+Inf']
+        self._keys = {}
+        _families[name] = ('histogram', help, self._les)
+
+    def observe(self, value, *values):
+        keys = self._keys.get(values)
+        if keys is None:
+            labels = label_text(self.labels, values)
+            keys = self._keys[values] = (
+                [(self.name, '_bucket', labels, le) for le in self._les],
+                (self.name, '_sum', labels, ''),
+                (self.name, '_count', labels, ''),
+            )
+        buckets, sum_key, count_key = keys
+        # Buckets are stored non-cumulative and summed up when rendered
+        bucket = buckets[bisect.bisect_left(self.buckets, value)]
+        with _lock:
+            _pending[bucket] += 1
+            _pending[sum_key] += value
+            _pending[count_key] += 1
+        if _flusher is None:
+            start_flusher()
+
+    def time(self, *values):
+        """Context manager / decorator observing the duration of a block."""
+        return _Timer(self, values)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, values):
+        self.histogram = histogram
+        self.values = values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.values)
+        return False
+
+
+# ============ METRICS ============
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', "Time to produce a response", ('view',))
+RESPONSES = Counter(
+    'http_responses_total', "Responses by view and status code", ('view', 'status'))
+DB_QUERIES = Counter(
+    'db_queries_total', "SQL queries run by requests", ('view',))
+DB_SECONDS = Counter(
+    'db_query_duration_seconds_total', "Time requests spent in SQL queries", ('view',))
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', "Cache reads by result", ('result',))
+IMAGE_SECONDS = Histogram(
+    'image_processing_duration_seconds', "Image resizing and thumbnail time", ('operation',),
+    buckets=IMAGE_BUCKETS)
+
+
+# ============ STORE ============
+
+class SQLiteStore:
+    """Metric totals in a SQLite file shared by the processes of a host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS samples ('
+                'family TEXT NOT NULL, suffix TEXT NOT NULL, labels TEXT NOT NULL, le TEXT NOT NULL, '
+                'value REAL NOT NULL, PRIMARY KEY (family, suffix, labels, le))'
+            )
+            self._local.conn = conn
+        return conn
+
+    def add(self, deltas):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO samples (family, suffix, labels, le, value) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(family, suffix, labels, le) DO UPDATE SET value = value + excluded.value',
+                [(*key, value) for key, value in deltas],
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def samples(self):
+        return self.conn.execute('SELECT family, suffix, labels, le, value FROM samples').fetchall()
+
+
+_store = None
+
+
+def get_store():
+    """Return the shared store (METRICS_SQLITE_PATH setting)."""
+    global _store
+    if _store is None:
+        _store = SQLiteStore(settings.METRICS_SQLITE_PATH)
+    return _store
+
+
+# ============ FLUSHING ============
+
+def flush():
+    """Add this process's pending deltas to the shared store."""
+    with _lock:
+        if not _pending:
+            return
+        deltas = list(_pending.items())
+        _pending.clear()
+    try:
+        get_store().add(deltas)
+    except Exception:
+        logger.warning("Could not flush metrics", exc_info=True)
+        # Keep them for the next flush
+        with _lock:
+            for key, value in deltas:
+                _pending[key] += value
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        flush()
+
+
+def start_flusher():
+    """Start this process's flush thread (once)."""
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_forever, name='metrics-flusher', daemon=True)
+    _flusher.start()
+
+
+def _after_fork():
+    # The child starts empty: the parent flushes what it recorded itself
+    global _lock, _flusher
+    _lock = threading.Lock()
+    _pending.clear()
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(flush)
+
+
+# ============ EXPOSITION ============
+
+def render(extra=()):
+    """Render every metric in the Prometheus text format.
+
+    Args:
+        extra (list): (name, type, help, [(labels dict, value)]) families
+            computed at scrape time, such as queue depths
+
+    Returns:
+        str: Exposition text
+    """
+    flush()
+    rows = defaultdict(list)
+    for family, suffix, labels, le, value in get_store().samples():
+        rows[family].append((suffix, labels, le, value))
+
+    lines = []
+    for name, (kind, help, les) in sorted(_families.items()):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for _, labels, _, value in sorted(rows[name]):
+                lines.append(f'{name}{{{labels}}} {value:g}' if labels else f'{name} {value:g}')
+            continue
+        series = defaultdict(lambda: {'buckets': {}, '_sum': 0.0, '_count': 0.0})
+        for suffix, labels, le, value in rows[name]:
+            if suffix == '_bucket':
+                series[labels]['buckets'][le] = value
+            else:
+                series[labels][suffix] = value
+        for labels, data in sorted(series.items()):
+            prefix = labels + ',' if labels else ''
+            cumulative = 0.0
+            for le in les:
+                cumulative += data['buckets'].get(le, 0.0)
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative:g}')
+            braces = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}_sum{braces} {data["_sum"]!r}')
+            lines.append(f'{name}_count{braces} {data["_count"]:g}')
+
+    for name, kind, help, samples in extra:
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            text = label_text(labels.keys(), labels.values())
+            lines.append(f'{name}{{{text}}} {value:g}' if text else f'{name} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+# ============ MIDDLEWARE ============
+
+class MetricsMiddleware:
+    """Record latency, status and SQL of every request, labelled by view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, view)
+        RESPONSES.inc(view, response.status_code)
+        if queries.count:
+            DB_QUERIES.inc(view, amount=queries.count)
+            DB_SECONDS.inc(view, amount=queries.seconds)
+        return response
+
+
+# ============ CACHE BACKENDS ============
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Count cache hits and misses of get()."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            CACHE_REQUESTS.inc('miss')
+            return default
+        CACHE_REQUESTS.inc('hit')
+        return value
+
+
+class LocMemCache(CacheMetricsMixin, BaseLocMemCache):
+    """LocMemCache counting hits and misses (its get_many() calls get())."""
+
+
+class RedisCache(CacheMetricsMixin, BaseRedisCache):
+    """RedisCache counting hits and misses."""
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        if len(values):
+            CACHE_REQUESTS.inc('hit', amount=len(values))
+        if len(keys) > len(values):
+            CACHE_REQUESTS.inc('miss', amount=len(keys) - len(values))
+        return values
@@ -13,12 +13,20 @@ Models:
     PreparationStep: Steps to prepare a recipe
     Note: User notes on recipes
     SocialMedia: Social media profiles for users
+    Review: User reviews and ratings for recipes
+    RecipeSignature: MinHash signature of a recipe's ingredients
+    RecipeBand: LSH band buckets for similar recipe lookups
+    RecipeEvent: Append-only log of views, favorites and reviews
+    Checkpoint: Progress markers for incremental batch jobs
+    DeletionJob: Queued background deletion of a user or recipe
+    OutgoingEmail: Durable outbox of email waiting to be delivered
+    Notification: Append-only log of reviews and favorites for creators
+    SearchTerm: Vocabulary of approved recipe names and ingredients
+    SearchTrigram: Trigram index over SearchTerm for typo-tolerant search
 """
 
 import logging
-from PIL import Image
 from django.db import models
-from django.db.models import Avg
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.forms import ValidationError
@@ -26,10 +34,15 @@ from location_field.models.plain import PlainLocationField
 import re
 
 from recipewebsite import settings
+from recipewebsite.geo import encode, parse_location
+from recipewebsite.metrics import IMAGE_SECONDS
+from recipewebsite.ingredients import parse_ingredient
+from recipewebsite.thumbnails import ensure_thumbnail
 
 logger = logging.getLogger(__name__)
 
 
+@IMAGE_SECONDS.time('resize')
 def resize_and_crop_image(image_path, target_size):
     """Crop and resize images to target dimensions.
     
@@ -46,6 +59,9 @@ def resize_and_crop_image(image_path, target_size):
     Logs:
         logger.error: If image processing fails
     """
+    # Imported here so that loading the models does not load PIL
+    from PIL import Image
+
     try:
         img = Image.open(image_path)
         if img.size != target_size:
@@ -59,7 +75,7 @@ def resize_and_crop_image(image_path, target_size):
             img = img.resize(target_size, Image.Resampling.LANCZOS)
             img.save(image_path, quality=95)
     except Exception as e:
-        logger.error(f"Error resizing image at {image_path}: {str(e)}")
+        logger.error("Error resizing image at %s: %s", image_path, e)
 
 class Place(models.Model):
     """Geographical location/city.
@@ -67,9 +83,27 @@ class Place(models.Model):
     Attributes:
         city (str): City name
         location: Geographic coordinates (PlainLocationField)
+        latitude, longitude (float): location parsed into numbers
+        geohash (str): Indexed geohash of the coordinates; see recipewebsite/geo.py
+    
+    Methods:
+        save(): Parses location into latitude, longitude and geohash
     """
     city = models.CharField(max_length=255)
     location = PlainLocationField(based_fields=['city'], zoom=7)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
+
+    def set_coordinates(self):
+        """Fill latitude, longitude and geohash from location."""
+        self.latitude, self.longitude = parse_location(self.location)
+        self.geohash = encode(self.latitude, self.longitude) if self.latitude is not None else ''
+
+    def save(self, *args, **kwargs):
+        """Save place with coordinates parsed from location."""
+        self.set_coordinates()
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.city
@@ -89,6 +123,10 @@ class User(AbstractUser):
         avatar (ImageField): Profile picture auto-resized to 512x512
         city (ForeignKey): Reference to Place model
         phone (str): Phone number
+        digest_frequency (str): How often notifications are emailed
+            ('hourly', 'daily' or 'never')
+        unread_notifications (int): Notifications since the user last
+            opened them, shown as the header badge
     
     Methods:
         save(): Auto-resizes avatar to 512x512 on save
@@ -118,6 +156,20 @@ class User(AbstractUser):
     avatar = models.ImageField(default='default.png', upload_to='profile_images')
     city = models.ForeignKey(Place, null=True, on_delete=models.RESTRICT, blank=True, default=None)
     phone = models.CharField(max_length=255, null=True, default=None, blank=True)
+    DIGEST_HOURLY = 'hourly'
+    DIGEST_DAILY = 'daily'
+    DIGEST_NEVER = 'never'
+    DIGEST_CHOICES = [
+        (DIGEST_HOURLY, 'A cada hora'),
+        (DIGEST_DAILY, 'Uma vez por dia'),
+        (DIGEST_NEVER, 'Nunca'),
+    ]
+    digest_frequency = models.CharField(
+        max_length=10,
+        choices=DIGEST_CHOICES,
+        default=DIGEST_DAILY,
+        verbose_name='Resumo de notificações por email')
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'password']
@@ -145,6 +197,38 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class Ingredient(models.Model):
+    """Canonical ingredient shared by recipe ingredient lines.
+    
+    Created on demand when RecipeIngredient text is parsed; see
+    recipewebsite/ingredients.py. Nutrients are loaded with
+    `manage.py compute_nutrition --nutrients` and feed recipewebsite/nutrition.py.
+    
+    Attributes:
+        name (str): Display name (e.g. 'farinha de trigo')
+        key (str): Folded, singular lookup key (e.g. 'ovo' for 'Ovos')
+        kcal, protein, carbs, fat (float): Per 100 g, empty if unknown
+        unit_weight (float): Grams per piece, for lines like "3 ovos"
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+    kcal = models.FloatField(null=True, blank=True)
+    protein = models.FloatField(null=True, blank=True)
+    carbs = models.FloatField(null=True, blank=True)
+    fat = models.FloatField(null=True, blank=True)
+    unit_weight = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def for_parsed(cls, parsed):
+        """Return the Ingredient of a ParsedIngredient, creating it if needed."""
+        if not parsed.key:
+            return None
+        ingredient, _ = cls.objects.get_or_create(key=parsed.key, defaults={'name': parsed.name})
+        return ingredient
+
 class Icons(models.Model):
     """Font Awesome icons for recipes and social media.
     
@@ -162,7 +246,8 @@ class Recipe(models.Model):
     """Main recipe model with approval workflow.
     
     Stores complete recipe information including images, difficulty, duration,
-    and approval status. Images are automatically resized on save.
+    and approval status. Images are automatically resized on save, and the
+    main image's thumbnail is created then.
     
     Attributes:
         name (str): Recipe name
@@ -177,13 +262,34 @@ class Recipe(models.Model):
         creator (ForeignKey): Recipe author (User)
         is_highlight (bool): Featured recipe flag
         is_approved (bool): Admin approval status
+        is_rejected (bool): Turned down by a moderator; left out of the queue
+        rating_count (int): Number of reviews
+        rating_sum (int): Sum of review ratings
+        rating_average (float): Mean review rating (0 without reviews)
+        rating_score (float): Bayesian average used for "top rated" ranking
+        rating_histogram (list): Review counts for 1 to 5 stars
+        favorite_count (int): Number of users who favorited the recipe
+        view_count (int): Page views counted by the scoring job
+        trending_score (float): Time-decayed popularity, in log space
+        search_text (str): Normalized name and ingredients, matched by search
+        servings (int): Number of servings the ingredients make
+        kcal_per_serving, protein_per_serving, carbs_per_serving,
+        fat_per_serving (float): Nutrition facts, empty if not computable
+        nutrition_coverage (float): Share of measured ingredient lines with known nutrients
+    
+    Aggregates are kept current by signals (ratings, favorites) and by the
+    compute_scores job (views, trending); see recipewebsite/scores.py.
+    search_text is refreshed after edits; see recipewebsite/search.py.
+    Nutrition facts are computed in bulk; see recipewebsite/nutrition.py.
     
     Meta:
         ordering: By date_updated then date_created (newest first)
         indexes: For performance optimization on common queries
     
+    Image files are removed after deletes commit; see recipewebsite/deletion.py.
+    
     Methods:
-        save(): Auto-resizes images to target dimensions before saving
+        save(): Auto-resizes images to target dimensions and creates the thumbnail
     """
     name = models.CharField(max_length=255)
     img = models.ImageField(upload_to="recipes",null=True,default='default.jpg',)
@@ -205,11 +311,31 @@ class Recipe(models.Model):
     creator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
     is_highlight = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
+    is_rejected = models.BooleanField(default=False)
     favorited_by = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         related_name='favorite_recipes',
         blank=True
     )
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
+    rating_score = models.FloatField(default=0, editable=False)
+    rating_histogram = models.JSONField(default=list, editable=False)
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
+    search_text = models.TextField(default='', editable=False)
+    servings = models.PositiveSmallIntegerField(
+        default=4,
+        validators=[MinValueValidator(1)],
+        help_text="Rendimento em porções"
+    )
+    kcal_per_serving = models.FloatField(null=True, editable=False)
+    protein_per_serving = models.FloatField(null=True, editable=False)
+    carbs_per_serving = models.FloatField(null=True, editable=False)
+    fat_per_serving = models.FloatField(null=True, editable=False)
+    nutrition_coverage = models.FloatField(default=0, editable=False)
 
     class Meta:
         # Ordenar por mais recente primeiro
@@ -218,28 +344,49 @@ class Recipe(models.Model):
         indexes = [
             models.Index(fields=['-date_updated']),
             models.Index(fields=['creator', 'is_approved']),
+            models.Index(fields=['is_approved', '-trending_score']),
+            models.Index(fields=['is_approved', '-rating_score']),
+            models.Index(fields=['is_approved', 'kcal_per_serving']),
+            # Moderation queue, walked oldest first by primary key
+            models.Index(fields=['is_approved', 'is_rejected', 'id']),
         ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded approval state so saves can tell what changed."""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_state = (loaded.get('is_approved'), loaded.get('category_id'))
+        return instance
+
     def get_review_average_rating(self):
-        avg = Review.objects.filter(recipe=self).aggregate(Avg('rating'))['rating__avg']
-        print(self.name , ' rating ', avg)
+        avg = self.rating_average
+        logger.debug("Recipe %s rating %s", self.pk, avg)
         return avg or 0
+
+    @property
+    def rounded_rating(self):
+        """Average rating rounded to whole stars, for templates."""
+        return round(self.rating_average)
+
+    @property
+    def rating_distribution(self):
+        """Rows of (stars, count, percent) from 5 down to 1 star, for templates."""
+        histogram = self.rating_histogram or [0] * 5
+        return [
+            (stars, histogram[stars - 1], round(100 * histogram[stars - 1] / self.rating_count) if self.rating_count else 0)
+            for stars in range(5, 0, -1)
+        ]
     
     def save(self, *args, **kwargs):
-        """Save recipe and auto-resize images to target dimensions."""
+        """Save recipe, auto-resize images to target dimensions and create
+        the main image's thumbnail."""
         super().save(*args, **kwargs)
         if self.sliderImg:
             resize_and_crop_image(self.sliderImg.path, (1920, 1080))
         if self.img:
             resize_and_crop_image(self.img.path, (1920, 1080))
-    
-    def delete(self):
-        """"Delete recipe and remove associated images from storage."""
-        if self.img:
-            self.img.delete()
-        if self.sliderImg:
-            self.sliderImg.delete()
-        super().delete()
+            ensure_thumbnail(self.img)
     
     def __str__(self):
         return self.name
@@ -251,20 +398,44 @@ class RecipeIngredient(models.Model):
         text (str): Ingredient description/measurement
         sequence (int): Order of ingredients (minimum 1)
         recipe (ForeignKey): Parent recipe
+        quantity (float): Parsed amount, if the text has one
+        unit (str): Parsed canonical unit (e.g. 'xicara', 'g')
+        ingredient (ForeignKey): Parsed canonical Ingredient
     
     Meta:
         ordering: By sequence (1, 2, 3, ...)
+        indexes: (ingredient, recipe) for "recipes with this ingredient"
+    
+    Methods:
+        save(): Parses text into quantity, unit and ingredient
     """
     text = models.TextField()
     sequence = models.IntegerField(validators=[MinValueValidator(1)])
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    quantity = models.FloatField(null=True, blank=True, editable=False)
+    unit = models.CharField(max_length=32, blank=True, editable=False)
+    ingredient = models.ForeignKey(
+        Ingredient, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='recipe_ingredients', editable=False
+    )
     
     class Meta:
         ordering = ['sequence']
+        indexes = [
+            models.Index(fields=['ingredient', 'recipe']),
+        ]
     
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        """Parse the text and link the canonical ingredient before saving."""
+        parsed = parse_ingredient(self.text)
+        self.quantity = parsed.quantity
+        self.unit = parsed.unit
+        self.ingredient = Ingredient.for_parsed(parsed)
+        super().save(*args, **kwargs)
+
 
 class PreparationStep(models.Model):
     """Step-by-step preparation instructions for a recipe.
@@ -336,6 +507,243 @@ class Review(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Serves the paginated, newest first review list of a recipe
+        indexes = [
+            models.Index(fields=['recipe', '-created_at']),
+        ]
     
     def __str__(self):
-        return f"Review by {self.user.email} for {self.recipe.name}"
\ No newline at end of file
+        return f"Review by {self.user.email} for {self.recipe.name}"
+
+
+class RecipeSignature(models.Model):
+    """MinHash signature of an approved recipe's ingredients and category.
+    
+    Maintained by recipewebsite.similar; see RecipeBand for the index.
+    
+    Attributes:
+        recipe (OneToOneField): Signed recipe
+        minhash (bytes): Packed unsigned 64-bit MinHash values
+    """
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+
+class RecipeBand(models.Model):
+    """LSH bucket of one band of a recipe signature.
+    
+    Recipes sharing any bucket are candidates for "similar recipes".
+    
+    Attributes:
+        recipe (ForeignKey): Indexed recipe
+        bucket (int): Hash of the band number and its MinHash rows
+    """
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='bands')
+    bucket = models.BigIntegerField(db_index=True)
+
+
+class RecipeEvent(models.Model):
+    """Append-only log of interactions that feed popularity scores.
+    
+    Rows are only inserted; the compute_scores job reads those newer than
+    its checkpoint.
+    
+    Attributes:
+        recipe (ForeignKey): Recipe the event is about
+        kind (str): 'view', 'favorite' or 'review'
+        created_at (DateTime): When it happened
+    """
+    VIEW = 'view'
+    FAVORITE = 'favorite'
+    REVIEW = 'review'
+    KIND_CHOICES = [(VIEW, 'View'), (FAVORITE, 'Favorite'), (REVIEW, 'Review')]
+
+    # No cascade: deleting a recipe must not scan its event history
+    recipe = models.ForeignKey(Recipe, on_delete=models.DO_NOTHING, db_constraint=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class Checkpoint(models.Model):
+    """Progress marker of an incremental batch job.
+    
+    Attributes:
+        name (str): Job name
+        value (int): Last processed id
+        updated_at (DateTime): Last time the job advanced
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class DeletionJob(models.Model):
+    """Background deletion of a user or recipe, run in small transactions.
+    
+    Created by recipewebsite.deletion.schedule(); processed by a worker
+    thread or by the process_deletions command.
+    
+    Attributes:
+        kind (str): 'user' or 'recipe'
+        object_id (int): Primary key of the object being deleted
+        label (str): Name shown while the job runs
+        status (str): 'pending', 'running', 'done' or 'failed'
+        total (int): Rows to delete, counted when the job starts
+        done (int): Rows deleted so far
+        error (str): Last error message, if the job failed
+        requested_by (ForeignKey): User who asked for the deletion
+    """
+    USER = 'user'
+    RECIPE = 'recipe'
+    KIND_CHOICES = [(USER, 'Usuário'), (RECIPE, 'Receita')]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pendente'), (RUNNING, 'Em andamento'), (DONE, 'Concluída'), (FAILED, 'Falhou')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    label = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Workers pick the oldest pending job
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    @property
+    def progress(self):
+        """Percent of rows deleted, for the admin."""
+        return round(100 * self.done / self.total) if self.total else (100 if self.status == self.DONE else 0)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.label or self.object_id}: {self.get_status_display()}"
+
+
+class OutgoingEmail(models.Model):
+    """Email message queued by the outbox backend; see recipewebsite/mail.py.
+    
+    Attributes:
+        subject, body, from_email (str): Message content
+        to, cc, bcc, reply_to (list): Addresses
+        headers (dict): Extra headers
+        alternatives (list): (content, mimetype) pairs, e.g. the HTML version
+        attachments (list): Encoded attachments
+        status (str): 'pending', 'sending', 'sent' or 'failed'
+        attempts (int): Delivery attempts so far
+        next_attempt_at (DateTime): When a worker may (re)try it
+        last_error (str): Error of the last failed attempt
+        sent_at (DateTime): Delivery time
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pendente'), (SENDING, 'Enviando'), (SENT, 'Enviado'), (FAILED, 'Falhou')]
+
+    subject = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    alternatives = models.JSONField(default=list)
+    attachments = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Workers read due messages in order
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
+
+
+class Notification(models.Model):
+    """Append-only log of reviews and favorites on a creator's recipes.
+    
+    Rows are only inserted; the send_digests job emails those newer than
+    its checkpoint, grouped per recipient.
+    
+    Attributes:
+        recipient (ForeignKey): Creator of the recipe
+        actor (ForeignKey): User who reviewed or favorited it
+        recipe (ForeignKey): Recipe the notification is about
+        kind (str): 'review' or 'favorite'
+        created_at (DateTime): When it happened
+    """
+    REVIEW = 'review'
+    FAVORITE = 'favorite'
+    KIND_CHOICES = [(REVIEW, 'Review'), (FAVORITE, 'Favorite')]
+
+    # No cascade: deleting a user or recipe must not scan the log
+    recipient = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    recipe = models.ForeignKey(Recipe, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Serves the newest first notification list of a user
+        indexes = [
+            models.Index(fields=['recipient', '-id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} on {self.recipe_id} for {self.recipient_id}"
+
+
+class SearchTerm(models.Model):
+    """Normalized word found in approved recipe names or ingredients.
+    
+    Maintained by recipewebsite.search; misspelled query words are matched
+    against it through SearchTrigram.
+    
+    Attributes:
+        term (str): Accent-folded lowercase word
+    """
+    term = models.CharField(max_length=64, unique=True)
+
+    def __str__(self):
+        return self.term
+
+
+class SearchTrigram(models.Model):
+    """One trigram of a SearchTerm.
+    
+    The (trigram, term) constraint doubles as the index used to count
+    shared trigrams per term without reading the terms table.
+    
+    Attributes:
+        trigram (str): Three characters of the padded term
+        term (ForeignKey): Term containing the trigram
+    """
+    trigram = models.CharField(max_length=3)
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='trigrams')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trigram', 'term'], name='unique_search_trigram'),
+        ]
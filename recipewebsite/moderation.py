@@ -0,0 +1,122 @@
+"""moderation.py
+
+Moderation queue for recipes waiting for approval.
+
+The queue is every recipe that is neither approved nor rejected, walked
+oldest first with keyset pagination on the (is_approved, is_rejected, id)
+index: a page is "the next N ids after the last one seen", so no page
+needs an OFFSET or a COUNT.
+
+Approving or rejecting a selection is one UPDATE. Because update() sends
+no signals, approve() then does explicitly what signals.recipe_saved does
+for a single save, once for the whole batch: category counts, creator
+stats, search results and vocabulary, and search suggestions. Similar
+recipe signatures and thumbnails of the approved recipes are warmed up
+in a background thread.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from . import autocomplete, categories, search, similar
+from .models import Recipe
+from .profiles import adjust_stats
+from .thumbnails import ensure_thumbnail
+
+# ============ CONFIGURATION ============
+QUEUE_PAGE_SIZE = 50
+# Fields read for the post-approval bookkeeping
+APPROVAL_FIELDS = (
+    'name', 'category_id', 'creator_id', 'search_text', 'img',
+    'rating_count', 'rating_sum', 'favorite_count', 'view_count',
+)
+
+
+# ============ QUEUE ============
+
+def pending_page(after=0, limit=QUEUE_PAGE_SIZE):
+    """Return one page of the moderation queue.
+
+    Args:
+        after (int): Last recipe id of the previous page (0 for the first page)
+        limit (int): Recipes per page
+
+    Returns:
+        tuple: (list of Recipe, id to pass as after for the next page or None)
+    """
+    recipes = list(
+        Recipe.objects.filter(is_approved=False, is_rejected=False, pk__gt=after)
+        .select_related('category', 'creator')
+        .only('name', 'img', 'date_created', 'category__name', 'creator__username')
+        .order_by('pk')[:limit + 1]
+    )
+    next_after = recipes[limit - 1].pk if len(recipes) > limit else None
+    return recipes[:limit], next_after
+
+
+# ============ ACTIONS ============
+
+def approve(recipe_ids):
+    """Approve pending recipes with one UPDATE and refresh what depends on them.
+
+    Args:
+        recipe_ids (iterable): Recipes to approve; approved ones are skipped
+
+    Returns:
+        int: Number of recipes approved
+    """
+    with transaction.atomic():
+        recipes = list(
+            Recipe.objects.select_for_update()
+            .filter(pk__in=list(recipe_ids), is_approved=False)
+            .only(*APPROVAL_FIELDS)
+        )
+        Recipe.objects.filter(pk__in=[r.pk for r in recipes]).update(is_approved=True, is_rejected=False)
+        transaction.on_commit(lambda: recipes_approved(recipes))
+    return len(recipes)
+
+
+def reject(recipe_ids):
+    """Take pending recipes out of the queue with one UPDATE.
+
+    Returns:
+        int: Number of recipes rejected
+    """
+    return Recipe.objects.filter(pk__in=list(recipe_ids), is_approved=False).update(is_rejected=True)
+
+
+def recipes_approved(recipes):
+    """Batch version of the approval bookkeeping done by signals.recipe_saved."""
+    if not recipes:
+        return
+    categories.invalidate()
+
+    totals = defaultdict(lambda: defaultdict(int))
+    for recipe in recipes:
+        stats = totals[recipe.creator_id]
+        stats['recipes'] += 1
+        stats['ratings'] += recipe.rating_count
+        stats['rating_sum'] += recipe.rating_sum
+        stats['favorites'] += recipe.favorite_count
+    for creator_id, deltas in totals.items():
+        adjust_stats(creator_id, **deltas)
+
+    search.invalidate()
+    search.index_text(' '.join(recipe.search_text for recipe in recipes))
+    for recipe in recipes:
+        autocomplete.recipe_approved(recipe)
+
+    threading.Thread(target=_warm_up, args=(recipes,), name='approval-warmup', daemon=True).start()
+
+
+def _warm_up(recipes):
+    """Index approved recipes for "similar recipes" and create their thumbnails."""
+    try:
+        for recipe in recipes:
+            similar.update_recipe(recipe.pk)
+            similar.similar_recipe_ids(recipe)
+            ensure_thumbnail(recipe.img)
+    finally:
+        connection.close()
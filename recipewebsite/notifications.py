@@ -0,0 +1,166 @@
+"""notifications.py
+
+Notifications for creators when their recipes are reviewed or favorited.
+
+Each review or favorite appends a Notification row for the recipe's
+creator and increments their User.unread_notifications counter, so the
+header badge comes with request.user and never counts the log.
+
+Digests:
+    Nobody gets one email per event. The send_digests job, run hourly and
+    daily, takes the notifications newer than its checkpoint for users
+    with that digest frequency, counts them per recipient, recipe and
+    kind in the database, and queues one summary email per recipient.
+    Queuing (an outbox insert, see mail.py) and the checkpoint advance
+    commit together, so a digest is sent once even if a run is
+    interrupted or two runs overlap. The first run only sets the
+    checkpoint.
+"""
+
+from collections import Counter, defaultdict
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Checkpoint, Notification, Recipe, User
+
+# ============ CONFIGURATION ============
+LIST_SIZE = 30          # Notifications shown on the notifications page
+RECIPIENT_CHUNK = 500   # Recipients whose digests are built per query
+CHECKPOINT = 'digest:{}'
+KIND_LABELS = {
+    Notification.REVIEW: ('avaliação', 'avaliações'),
+    Notification.FAVORITE: ('favorito', 'favoritos'),
+}
+
+
+# ============ EVENTS ============
+
+def notify(kind, actor_id, recipe_ids):
+    """Notify the creators of recipes that a user reviewed or favorited them.
+
+    Creators are not notified about their own actions.
+
+    Args:
+        kind (str): Notification.REVIEW or Notification.FAVORITE
+        actor_id (int): User who acted
+        recipe_ids (list): Recipes acted on
+    """
+    creators = (
+        Recipe.objects.filter(pk__in=recipe_ids, creator__isnull=False)
+        .exclude(creator_id=actor_id)
+        .values_list('pk', 'creator_id')
+    )
+    rows = [
+        Notification(recipient_id=creator_id, actor_id=actor_id, recipe_id=recipe_id, kind=kind)
+        for recipe_id, creator_id in creators
+    ]
+    if not rows:
+        return
+    Notification.objects.bulk_create(rows)
+    for recipient_id, count in Counter(row.recipient_id for row in rows).items():
+        User.objects.filter(pk=recipient_id).update(unread_notifications=F('unread_notifications') + count)
+
+
+def recent(user, limit=LIST_SIZE):
+    """Return a user's newest notifications with their actor and recipe."""
+    return list(
+        Notification.objects.filter(recipient=user)
+        .select_related('actor', 'recipe')
+        .only('kind', 'created_at', 'actor__username', 'recipe__name')
+        .order_by('-id')[:limit]
+    )
+
+
+def mark_read(user):
+    """Clear a user's unread badge."""
+    if user.unread_notifications:
+        User.objects.filter(pk=user.pk).update(unread_notifications=0)
+        user.unread_notifications = 0
+
+
+# ============ DIGESTS ============
+
+def digest_message(user, counts, recipes):
+    """Build the digest email of one recipient.
+
+    Args:
+        user (User): Recipient
+        counts (dict): {recipe_id: {kind: count}}
+        recipes (dict): {recipe_id: Recipe} with names
+
+    Returns:
+        EmailMessage: The digest, or None if all its recipes are gone
+    """
+    lines = []
+    total = 0
+    for recipe_id, kinds in counts.items():
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            continue
+        parts = []
+        for kind, (singular, plural) in KIND_LABELS.items():
+            if kinds.get(kind):
+                parts.append(f"{kinds[kind]} {singular if kinds[kind] == 1 else plural}")
+                total += kinds[kind]
+        lines.append(f"- {recipe.name}: {', '.join(parts)}")
+    if not lines:
+        return None
+    body = (
+        f"Olá, {user.username}!\n\n"
+        "Suas receitas receberam novidades:\n\n"
+        + "\n".join(lines)
+        + "\n\nVocê pode mudar a frequência deste resumo na edição do seu perfil.\n"
+    )
+    subject = f"Suas receitas tiveram {total} {'novidade' if total == 1 else 'novidades'}"
+    return EmailMessage(subject=subject, body=body, to=[user.email])
+
+
+def send_digests(frequency):
+    """Queue digests of new notifications for active users with a digest frequency
+    and an email address.
+
+    Args:
+        frequency (str): User.DIGEST_HOURLY or User.DIGEST_DAILY
+
+    Returns:
+        int: Number of digests sent
+    """
+    sent = 0
+    with transaction.atomic():
+        checkpoint, created = Checkpoint.objects.select_for_update().get_or_create(name=CHECKPOINT.format(frequency))
+        last = Notification.objects.order_by('-pk').values_list('pk', flat=True).first()
+        if created and last:
+            # First run: start from now instead of emailing the whole history
+            checkpoint.value = last
+            checkpoint.save(update_fields=['value', 'updated_at'])
+            return 0
+        if last is None or last <= checkpoint.value:
+            return 0
+        # Inactive users (e.g. pending deletion) and users without an address get none
+        events = Notification.objects.filter(
+            pk__gt=checkpoint.value, pk__lte=last, recipient__digest_frequency=frequency,
+            recipient__is_active=True,
+        ).exclude(recipient__email='')
+        recipient_ids = sorted(events.values_list('recipient_id', flat=True).distinct().order_by())
+        connection = get_connection()
+        for start in range(0, len(recipient_ids), RECIPIENT_CHUNK):
+            chunk = recipient_ids[start:start + RECIPIENT_CHUNK]
+            counts = defaultdict(lambda: defaultdict(dict))
+            rows = (
+                events.filter(recipient_id__in=chunk)
+                .values_list('recipient_id', 'recipe_id', 'kind')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            for recipient_id, recipe_id, kind, count in rows:
+                counts[recipient_id][recipe_id][kind] = count
+            users = User.objects.only('username', 'email').in_bulk(chunk)
+            recipe_ids = {recipe_id for recipes in counts.values() for recipe_id in recipes}
+            recipes = Recipe.objects.only('name').in_bulk(recipe_ids)
+            messages = [digest_message(users[pk], counts[pk], recipes) for pk in chunk if pk in users]
+            sent += connection.send_messages([message for message in messages if message]) or 0
+        checkpoint.value = last
+        checkpoint.save(update_fields=['value', 'updated_at'])
+    return sent
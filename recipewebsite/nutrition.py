@@ -0,0 +1,167 @@
+"""nutrition.py
+
+Nutrition facts for recipes, computed in bulk with NumPy.
+
+Every parsed ingredient line (see ingredients.py) becomes one entry of a
+sparse recipe x ingredient matrix of grams. Multiplying it by the
+ingredient x nutrient table (per gram) gives recipe x nutrient totals;
+both steps are array operations over the whole catalog at once, with
+np.bincount summing line contributions per recipe.
+
+Per-serving values are stored on Recipe in indexed columns, so listings
+can filter on them (e.g. "até 500 kcal") without computing anything per
+request. Scaling to other serving counts happens in the browser from
+the payload built by scaling_payload().
+
+NumPy is imported by the functions that use it, so web processes that
+only render recipes do not pay for loading it.
+"""
+
+import math
+
+from django.db import transaction
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# ============ CONFIGURATION ============
+NUTRIENTS = ('kcal', 'protein', 'carbs', 'fat')
+FIELDS = [f'{nutrient}_per_serving' for nutrient in NUTRIENTS]
+MIN_COVERAGE = 0.5      # Below this share of known lines, facts are not stored
+BATCH_SIZE = 5000
+
+# Approximate grams per canonical unit (ml counted as grams)
+UNIT_GRAMS = {
+    'g': 1, 'kg': 1000, 'mg': 0.001, 'ml': 1, 'l': 1000,
+    'xicara': 240, 'copo': 200,
+    'colher de sopa': 15, 'colher de sobremesa': 10, 'colher de cha': 5, 'colher': 15,
+    'lata': 395, 'caixa': 200, 'pacote': 500,
+    'pitada': 0.5, 'dente': 5, 'fatia': 20, 'maco': 100, 'ramo': 10, 'folha': 1,
+}
+PIECE_UNITS = ('', 'unidade')  # Weighed with Ingredient.unit_weight
+UNIT_CODES = {unit: code for code, unit in enumerate([*UNIT_GRAMS, *PIECE_UNITS])}
+UNIT_FACTORS = [*UNIT_GRAMS.values()] + [math.nan] * len(PIECE_UNITS)
+PIECE_CODES = [UNIT_CODES[unit] for unit in PIECE_UNITS]
+
+
+# ============ ENGINE ============
+
+def nutrient_table():
+    """Load ingredients with known nutrients.
+
+    Returns:
+        tuple: ({ingredient id: row}, per-gram nutrients (M x 4), grams per piece (M))
+    """
+    import numpy as np
+
+    rows = list(
+        Ingredient.objects.filter(kcal__isnull=False)
+        .values_list('pk', 'unit_weight', *NUTRIENTS)
+    )
+    index = {row[0]: i for i, row in enumerate(rows)}
+    table = np.array([row[2:] for row in rows], dtype=float).reshape(len(rows), len(NUTRIENTS))
+    unit_weight = np.array([row[1] if row[1] is not None else np.nan for row in rows], dtype=float)
+    return index, np.nan_to_num(table) / 100, unit_weight
+
+
+def compute(recipes, lines, table):
+    """Compute per-serving nutrients for a set of recipes.
+
+    Args:
+        recipes (list): (recipe id, servings) pairs
+        lines (list): (recipe id, ingredient id, quantity, unit) of their ingredient lines
+        table (tuple): Output of nutrient_table()
+
+    Returns:
+        tuple: (per-serving nutrients (N x 4), coverage (N)), rows in the order of recipes
+    """
+    import numpy as np
+
+    index, per_gram, unit_weight = table
+    position = {pk: i for i, (pk, _) in enumerate(recipes)}
+    servings = np.array([max(s or 1, 1) for _, s in recipes], dtype=float)
+    n = len(recipes)
+
+    measured = [line for line in lines if line[2] is not None]
+    rows = np.array([position[line[0]] for line in measured], dtype=np.intp)
+    cols = np.array([index.get(line[1], -1) for line in measured], dtype=np.intp)
+    quantity = np.array([line[2] for line in measured], dtype=float)
+    units = np.array([UNIT_CODES.get(line[3], -1) for line in measured], dtype=np.intp)
+
+    # Grams of each line: quantity x unit factor, or x the piece weight
+    factor = np.where(units >= 0, np.array(UNIT_FACTORS)[units], np.nan)
+    pieces = np.isin(units, PIECE_CODES) & (cols >= 0)
+    factor[pieces] = unit_weight[cols[pieces]]
+    grams = quantity * factor
+    known = (cols >= 0) & ~np.isnan(grams)
+
+    # Sparse (recipe x ingredient grams) @ (ingredient x nutrient) table
+    contributions = grams[known, None] * per_gram[cols[known]]
+    totals = np.column_stack([
+        np.bincount(rows[known], weights=contributions[:, k], minlength=n)
+        for k in range(len(NUTRIENTS))
+    ]) if n else np.zeros((0, len(NUTRIENTS)))
+    counted = np.bincount(rows, minlength=n)
+    coverage = np.divide(np.bincount(rows[known], minlength=n), counted,
+                         out=np.zeros(n), where=counted > 0)
+    return totals / servings[:, None], coverage
+
+
+def update_recipes(recipe_ids=None, batch_size=BATCH_SIZE):
+    """Recompute and store nutrition facts.
+
+    Args:
+        recipe_ids (list): Recipes to update, or None for the whole catalog
+        batch_size (int): Recipes per database batch
+
+    Returns:
+        int: Number of recipes updated
+    """
+    table = nutrient_table()
+    recipes = Recipe.objects.order_by('pk')
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    pairs = list(recipes.values_list('pk', 'servings'))
+    for start in range(0, len(pairs), batch_size):
+        chunk = pairs[start:start + batch_size]
+        lines = list(
+            RecipeIngredient.objects.filter(recipe_id__in=[pk for pk, _ in chunk])
+            .values_list('recipe_id', 'ingredient_id', 'quantity', 'unit')
+        )
+        values, coverage = compute(chunk, lines, table)
+        updated = []
+        for (pk, _), facts, share in zip(chunk, values.tolist(), coverage.tolist()):
+            recipe = Recipe(pk=pk, nutrition_coverage=share)
+            for field, value in zip(FIELDS, facts):
+                setattr(recipe, field, round(value, 1) if share >= MIN_COVERAGE else None)
+            updated.append(recipe)
+        with transaction.atomic():
+            Recipe.objects.bulk_update(updated, [*FIELDS, 'nutrition_coverage'], batch_size=500)
+    return len(pairs)
+
+
+def update_recipe_on_commit(recipe_id):
+    """Schedule update_recipes() for one recipe when the current transaction commits."""
+    transaction.on_commit(lambda: update_recipes([recipe_id]))
+
+
+# ============ PAGE PAYLOAD ============
+
+def scaling_payload(recipe, ingredients):
+    """Build the compact JSON payload used to scale a recipe in the browser.
+
+    Args:
+        recipe (Recipe): Displayed recipe
+        ingredients (iterable): Its RecipeIngredient rows, in display order
+
+    Returns:
+        dict: servings, per-serving nutrients and the parsed quantity of each
+        line (null means the line is shown as written)
+    """
+    return {
+        'servings': recipe.servings,
+        'nutrients': (
+            {nutrient: getattr(recipe, field) for nutrient, field in zip(NUTRIENTS, FIELDS)}
+            if recipe.kcal_per_serving is not None else None
+        ),
+        'quantities': [line.quantity for line in ingredients],
+    }
@@ -0,0 +1,110 @@
+"""profiles.py
+
+Cached per-creator statistics for profile pages.
+
+Stats cover a user's approved recipes: recipe count, rating count and sum
+(for the average rating) and total favorites. Each value is its own cache
+counter, built with one aggregate over the (creator, is_approved) index
+on a miss and then adjusted with atomic increments as recipes are
+approved, reviewed, favorited or deleted.
+
+Increments need a cache shared by all workers (REDIS_URL). With the
+per-process default cache they would only reach the worker that handled
+the write, so there the stats expire after LOCAL_TTL and a change drops
+the user's stats instead.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Recipe
+
+# ============ CONFIGURATION ============
+STAT_FIELDS = ('recipes', 'ratings', 'rating_sum', 'favorites')
+STAT_KEY = 'user_stats:{}:{}'
+LOCAL_TTL = 60   # Seconds other workers may show stale stats without a shared cache
+
+
+def _keys(user_id):
+    return {field: STAT_KEY.format(user_id, field) for field in STAT_FIELDS}
+
+
+def build_stats(user_id):
+    """Aggregate a user's stats from their approved recipes and cache them.
+
+    Returns:
+        dict: Raw counters keyed by STAT_FIELDS
+    """
+    totals = Recipe.objects.filter(creator_id=user_id, is_approved=True).aggregate(
+        recipes=Count('id'),
+        ratings=Sum('rating_count'),
+        rating_sum=Sum('rating_sum'),
+        favorites=Sum('favorite_count'),
+    )
+    stats = {field: totals[field] or 0 for field in STAT_FIELDS}
+    keys = _keys(user_id)
+    timeout = None if settings.REDIS_URL else LOCAL_TTL
+    cache.set_many({keys[field]: value for field, value in stats.items()}, timeout=timeout)
+    return stats
+
+
+def user_stats(user_id):
+    """Return profile header stats for a user.
+
+    Returns:
+        dict: recipe_count, average_rating, rating_count and favorite_count
+    """
+    keys = _keys(user_id)
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        stats = {field: cached[key] for field, key in keys.items()}
+    else:
+        stats = build_stats(user_id)
+    return {
+        'recipe_count': stats['recipes'],
+        'rating_count': stats['ratings'],
+        'average_rating': stats['rating_sum'] / stats['ratings'] if stats['ratings'] else 0,
+        'favorite_count': stats['favorites'],
+    }
+
+
+def adjust_stats(user_id, **deltas):
+    """Add deltas (recipes, ratings, rating_sum, favorites) to cached stats.
+
+    Drops the user's stats when any counter is missing, or when the cache
+    is not shared, so the next read rebuilds them.
+    """
+    if user_id is None:
+        return
+    keys = _keys(user_id)
+    if not settings.REDIS_URL:
+        cache.delete_many(keys.values())
+        return
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(keys[field], delta)
+        except ValueError:
+            cache.delete_many(keys.values())
+            return
+
+
+def invalidate_stats(user_ids):
+    """Drop the cached stats of several users, e.g. after repairing aggregates."""
+    cache.delete_many([key for user_id in user_ids for key in _keys(user_id).values()])
+
+
+def adjust_for_recipe_on_commit(recipe, sign):
+    """Add (sign=1) or remove (sign=-1) an approved recipe's totals once
+    the current transaction commits (nothing if it rolls back)."""
+    creator_id = recipe.creator_id
+    deltas = {
+        'recipes': sign,
+        'ratings': sign * recipe.rating_count,
+        'rating_sum': sign * recipe.rating_sum,
+        'favorites': sign * recipe.favorite_count,
+    }
+    transaction.on_commit(lambda: adjust_stats(creator_id, **deltas))
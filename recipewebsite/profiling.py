@@ -0,0 +1,203 @@
+"""profiling.py
+
+On-demand profiling of single requests, for staff.
+
+A request carrying a valid profiling token (?_profile=<token> or an
+X-Profile-Token header) from the staff user it was issued to runs under
+cProfile, with every SQL query timed. The stats are written to
+PROFILE_DIR as <id>.prof (pstats; opens in snakeviz, or flameprof for a
+flame graph) next to <id>.json with the request summary, and only the
+newest PROFILE_KEEP profiles are kept. Tokens are signed, tied to the
+user and expire after TOKEN_MAX_AGE; staff get theirs on the admin
+profiles page, which also lists and shows recent profiles.
+
+Requests without a token only pay for checking that they have none.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+from .log import get_request_id
+
+# ============ CONFIGURATION ============
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'recipewebsite.profiling'
+TOKEN_MAX_AGE = 3600            # Seconds a token stays valid
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]+-[A-Za-z0-9._-]+$')
+STATS_LIMIT = 60                # Functions shown on the profile page
+TEMPLATE_RENDER_FILES = (os.path.join('django', 'template', 'base.py'), os.path.join('jinja2', 'environment.py'))
+
+
+# ============ TOKENS ============
+
+def make_token(user):
+    """Return a profiling token for a staff user."""
+    return signing.dumps(user.pk, salt=TOKEN_SALT)
+
+
+def token_user_id(token):
+    """Return the user id a token was issued to, or None if invalid or expired."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+# ============ MIDDLEWARE ============
+
+class ProfilerMiddleware:
+    """Profile requests that carry a valid profiling token.
+
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get(HEADER) or (
+            request.GET.get(QUERY_PARAM) if QUERY_PARAM in request.META.get('QUERY_STRING', '') else None
+        )
+        if not token:
+            return self.get_response(request)
+        user = request.user
+        if not (user.is_active and user.is_staff and token_user_id(token) == user.pk):
+            return self.get_response(request)
+        return profile_request(request, self.get_response)
+
+
+class QueryTimer:
+    """execute_wrapper that counts queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def profile_request(request, get_response):
+    """Run a request under cProfile and save the result."""
+    profiler = cProfile.Profile()
+    queries = QueryTimer()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    elapsed = time.perf_counter() - start
+    save_profile(profiler, {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': request.user.get_username(),
+        'status': response.status_code,
+        'request_id': get_request_id(),
+        'total_ms': round(elapsed * 1000, 1),
+        'sql_count': queries.count,
+        'sql_ms': round(queries.seconds * 1000, 1),
+        'template_ms': round(template_seconds(profiler) * 1000, 1),
+    })
+    return response
+
+
+def template_seconds(profiler):
+    """Cumulative time spent rendering templates (Django or Jinja2)."""
+    stats = pstats.Stats(profiler)
+    return max(
+        (entry[3] for (filename, _, name), entry in stats.stats.items()
+         if name == 'render' and filename.endswith(TEMPLATE_RENDER_FILES)),
+        default=0.0,
+    )
+
+
+# ============ STORAGE ============
+
+def save_profile(profiler, summary):
+    """Write a profile and its summary, then drop the oldest beyond PROFILE_KEEP."""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.time_ns()}-{summary['request_id']}"
+    path = os.path.join(settings.PROFILE_DIR, profile_id)
+    profiler.dump_stats(path + '.prof')
+    summary = {'id': profile_id, 'created_at': timezone.now().isoformat(), **summary}
+    with open(path + '.json', 'w') as f:
+        json.dump(summary, f)
+    for old in profile_ids()[settings.PROFILE_KEEP:]:
+        for extension in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(settings.PROFILE_DIR, old + extension))
+            except FileNotFoundError:
+                pass
+
+
+def profile_ids():
+    """Return stored profile ids, newest first."""
+    try:
+        names = os.listdir(settings.PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    ids = [name[:-len('.json')] for name in names if name.endswith('.json')]
+    return sorted(ids, key=lambda profile_id: int(profile_id.split('-', 1)[0]), reverse=True)
+
+
+def profile_path(profile_id, extension):
+    """Return the path of a stored profile file, or None for a malformed id."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return os.path.join(settings.PROFILE_DIR, profile_id + extension)
+
+
+def load_summary(profile_id):
+    """Return the summary of a stored profile, or None if it is gone."""
+    path = profile_path(profile_id, '.json')
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def stats_text(profile_id, sort='cumulative', pattern=None, limit=STATS_LIMIT):
+    """Render the top functions of a stored profile as text.
+
+    Args:
+        profile_id (str): Stored profile
+        sort (str): 'cumulative' or 'tottime'
+        pattern (str): Optional text the function's path or name must contain (e.g. 'PIL')
+        limit (int): Functions shown
+
+    Returns:
+        str: pstats report, or None if the profile is gone
+    """
+    path = profile_path(profile_id, '.prof')
+    if path is None or not os.path.exists(path):
+        return None
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort)
+    restrictions = [re.escape(pattern), limit] if pattern else [limit]
+    stats.print_stats(*restrictions)
+    return output.getvalue()
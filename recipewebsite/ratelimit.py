@@ -0,0 +1,247 @@
+"""ratelimit.py
+
+Shared-state rate limiting for Recipe Website.
+
+Uses a sliding-window counter: each key keeps one counter per fixed window
+and the previous window's counter is weighted by how much of it still
+overlaps the sliding window. That costs one atomic increment and one read
+per request, with no per-request timestamps stored.
+
+Stores:
+    CacheStore: Atomic add/incr on the default cache (Redis in production)
+    SQLiteStore: Local file stand-in for development and single-host setups
+
+Usage:
+    @ratelimit('recipe_create', rate='20/h', key='user', method='POST')
+    def recipe_create(request):
+        ...
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+THROTTLED_PREFIX = 'rl:throttled:'
+
+
+def parse_rate(rate):
+    """Parse a rate string like '20/h' or '5/10m'.
+
+    Args:
+        rate (str): Number of requests per period
+
+    Returns:
+        tuple: (limit, window in seconds)
+    """
+    count, period = rate.split('/')
+    multiplier = period[:-1] or '1'
+    return int(count), int(multiplier) * PERIODS[period[-1]]
+
+
+# ============ STORES ============
+
+class CacheStore:
+    """Counter store on the default Django cache.
+
+    `cache.add` + `cache.incr` are atomic on Redis and Memcached, so every
+    worker process shares the same counters.
+    """
+
+    def incr(self, key, ttl):
+        cache.add(key, 0, timeout=ttl)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Key expired between add and incr
+            cache.set(key, 1, timeout=ttl)
+            return 1
+
+    def get(self, key):
+        return cache.get(key, 0)
+
+    def totals(self, prefix):
+        # The cache API cannot list keys, so scope names are kept in one entry
+        names = cache.get(prefix + '__names__', [])
+        values = cache.get_many([prefix + name for name in names])
+        return {name: values.get(prefix + name, 0) for name in names}
+
+    def record_total(self, prefix, name):
+        if self.incr(prefix + name, None) == 1:
+            names = cache.get(prefix + '__names__', [])
+            if name not in names:
+                cache.set(prefix + '__names__', names + [name], timeout=None)
+
+
+class SQLiteStore:
+    """Counter store in a local SQLite file.
+
+    Increments run as a single UPSERT inside an immediate transaction, so
+    processes on the same host share counters without a cache server.
+    """
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires REAL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key, ttl):
+        now = time.time()
+        expires = now + ttl if ttl else None
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'INSERT INTO counters (key, value, expires) VALUES (?, 1, ?) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'value = CASE WHEN expires IS NOT NULL AND expires < ? THEN 1 ELSE value + 1 END, '
+                'expires = CASE WHEN expires IS NOT NULL AND expires < ? THEN excluded.expires ELSE expires END '
+                'RETURNING value',
+                (key, expires, now, now),
+            ).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        # Purge expired windows now and then instead of on every hit
+        self._local.hits = getattr(self._local, 'hits', 0) + 1
+        if self._local.hits % self.PURGE_EVERY == 0:
+            conn.execute('DELETE FROM counters WHERE expires < ?', (now,))
+        return row[0]
+
+    def get(self, key):
+        row = self.conn.execute(
+            'SELECT value FROM counters WHERE key = ? AND (expires IS NULL OR expires >= ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def totals(self, prefix):
+        rows = self.conn.execute(
+            'SELECT key, value FROM counters WHERE key LIKE ?', (prefix + '%',)
+        ).fetchall()
+        return {key[len(prefix):]: value for key, value in rows}
+
+    def record_total(self, prefix, name):
+        self.incr(prefix + name, None)
+
+
+_store = None
+
+
+def get_store():
+    """Return the configured store (RATELIMIT_STORE setting)."""
+    global _store
+    if _store is None:
+        if settings.RATELIMIT_STORE == 'sqlite':
+            _store = SQLiteStore(settings.RATELIMIT_SQLITE_PATH)
+        else:
+            _store = CacheStore()
+    return _store
+
+
+# ============ LIMITER ============
+
+def client_ip(request):
+    """Return the client IP address for a request."""
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_key(request, key):
+    """Resolve the rate limit key for a request.
+
+    Args:
+        request: HTTP request
+        key: 'ip', 'user' (falls back to IP for anonymous users) or callable
+
+    Returns:
+        str: Identifier the counter is kept for
+    """
+    if callable(key):
+        return str(key(request))
+    if key == 'user' and request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    return f'ip{client_ip(request)}'
+
+
+def hit(scope, ident, rate):
+    """Count one request and check it against the limit.
+
+    Args:
+        scope (str): Name of the limited action
+        ident (str): Client identifier from get_key()
+        rate (str): Rate string, e.g. '20/h'
+
+    Returns:
+        tuple: (allowed, seconds until the current window ends)
+    """
+    limit, window = parse_rate(rate)
+    store = get_store()
+    now = time.time()
+    current = int(now // window)
+    elapsed = now - current * window
+    count = store.incr(f'rl:{scope}:{ident}:{current}', window * 2)
+    previous = store.get(f'rl:{scope}:{ident}:{current - 1}')
+    estimate = previous * (1 - elapsed / window) + count
+    if estimate <= limit:
+        return True, 0
+    store.record_total(THROTTLED_PREFIX, scope)
+    return False, math.ceil(window - elapsed)
+
+
+def throttled_totals():
+    """Return the number of throttled requests per scope."""
+    return get_store().totals(THROTTLED_PREFIX)
+
+
+def ratelimit(scope, rate, key='ip', method=None):
+    """Decorator that rejects requests over the rate with HTTP 429.
+
+    Args:
+        scope (str): Name of the limited action
+        rate (str): Rate string, e.g. '20/h'
+        key: 'ip', 'user' or callable returning an identifier
+        method (str): Only limit this HTTP method (all methods if None)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and (method is None or request.method == method):
+                ident = get_key(request, key)
+                allowed, retry_after = hit(scope, ident, rate)
+                if not allowed:
+                    logger.warning("Rate limit exceeded: %s by %s", scope, ident)
+                    response = HttpResponse(
+                        'Muitas requisições. Tente novamente mais tarde.', status=429
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,246 @@
+"""scores.py
+
+Popularity and rating aggregates for recipes.
+
+Trending ("Em alta"):
+    Every view, favorite and review is appended to RecipeEvent. The
+    compute_scores job folds events newer than its checkpoint into
+    Recipe.trending_score, the log of sum(weight * exp(λ (t - EPOCH))).
+    Keeping the sum anchored at a fixed epoch means old scores never have
+    to be decayed again: ordering by it equals ordering by the decayed
+    score at any moment, and a run only touches recipes with new events.
+
+Top rated ("Mais bem avaliadas"):
+    Recipe.rating_score is a Bayesian average that pulls recipes with few
+    reviews towards PRIOR_RATING. It is refreshed together with the other
+    rating aggregates (count, sum, average and the 1 to 5 star histogram
+    shown on the recipe page) whenever a review is saved or deleted.
+
+The index page sections show the first ids of both orders, cached for
+HIGHLIGHTS_TTL (see highlight_ids).
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Checkpoint, Recipe, RecipeEvent, Review
+from .profiles import adjust_stats, invalidate_stats
+
+# ============ CONFIGURATION ============
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+EVENT_WEIGHTS = {
+    RecipeEvent.VIEW: 1.0,
+    RecipeEvent.FAVORITE: 5.0,
+    RecipeEvent.REVIEW: 3.0,
+}
+PRIOR_RATING = 3.0   # Rating assumed for recipes without reviews
+PRIOR_VOTES = 5      # How many reviews the prior is worth
+CHECKPOINT = 'trending'
+BATCH_SIZE = 5000
+HIGHLIGHTS_KEY = 'highlights:{}'
+HIGHLIGHTS_TTL = 300   # Seconds the index page sections may lag behind scores
+
+
+def decay_rate():
+    """Return λ (per second) for TRENDING_HALF_LIFE_HOURS."""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def logaddexp(a, b):
+    """Return log(exp(a) + exp(b)) without overflowing."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+# ============ EVENTS ============
+
+def record_event(recipe_id, kind):
+    """Append one interaction to the event log."""
+    RecipeEvent.objects.create(recipe_id=recipe_id, kind=kind)
+
+
+# ============ TRENDING ============
+
+def compute_trending(batch_size=BATCH_SIZE):
+    """Fold events newer than the checkpoint into trending scores.
+
+    Each batch of events and its checkpoint advance are committed together,
+    so an interrupted run resumes where it stopped without double counting.
+
+    Args:
+        batch_size (int): Events read per transaction
+
+    Returns:
+        int: Number of events processed
+    """
+    rate = decay_rate()
+    processed = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = Checkpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+            events = list(
+                RecipeEvent.objects.filter(pk__gt=checkpoint.value)
+                .order_by('pk')
+                .values_list('pk', 'recipe_id', 'kind', 'created_at')[:batch_size]
+            )
+            if not events:
+                return processed
+
+            scores = {}
+            views = defaultdict(int)
+            for _, recipe_id, kind, created_at in events:
+                score = math.log(EVENT_WEIGHTS[kind]) + rate * (created_at - EPOCH).total_seconds()
+                scores[recipe_id] = logaddexp(scores[recipe_id], score) if recipe_id in scores else score
+                if kind == RecipeEvent.VIEW:
+                    views[recipe_id] += 1
+
+            recipes = Recipe.objects.filter(pk__in=scores).only('pk', 'trending_score', 'view_count')
+            changed = []
+            for recipe in recipes:
+                recipe.trending_score = (
+                    logaddexp(recipe.trending_score, scores[recipe.pk])
+                    if recipe.trending_score else scores[recipe.pk]
+                )
+                recipe.view_count += views[recipe.pk]
+                changed.append(recipe)
+            Recipe.objects.bulk_update(changed, ['trending_score', 'view_count'], batch_size=500)
+
+            checkpoint.value = events[-1][0]
+            checkpoint.save(update_fields=['value', 'updated_at'])
+        processed += len(events)
+
+
+def highlight_ids(size):
+    """Return the ids of the top trending and top rated approved recipes.
+
+    Read from the cache; on a miss, two index scans fill it for HIGHLIGHTS_TTL.
+
+    Returns:
+        tuple: (trending ids, top rated ids), best first
+    """
+    key = HIGHLIGHTS_KEY.format(size)
+    ids = cache.get(key)
+    if ids is None:
+        approved = Recipe.objects.filter(is_approved=True)
+        ids = (
+            list(approved.filter(trending_score__gt=0).order_by('-trending_score').values_list('pk', flat=True)[:size]),
+            list(approved.filter(rating_count__gt=0).order_by('-rating_score').values_list('pk', flat=True)[:size]),
+        )
+        cache.set(key, ids, HIGHLIGHTS_TTL)
+    return ids
+
+
+# ============ RATINGS & FAVORITES ============
+
+def rating_histogram(rows):
+    """Turn (rating, count) rows into a list of counts for 1 to 5 stars."""
+    histogram = [0] * 5
+    for rating, count in rows:
+        histogram[rating - 1] = count
+    return histogram
+
+
+def rating_fields(histogram):
+    """Return the stored rating aggregates for a 1 to 5 star histogram."""
+    count = sum(histogram)
+    total = sum(stars * n for stars, n in enumerate(histogram, start=1))
+    return {
+        'rating_count': count,
+        'rating_sum': total,
+        'rating_histogram': histogram,
+        'rating_average': total / count if count else 0,
+        'rating_score': (total + PRIOR_RATING * PRIOR_VOTES) / (count + PRIOR_VOTES) if count else 0,
+    }
+
+
+def refresh_rating(recipe_id):
+    """Recompute a recipe's rating aggregates from its reviews (indexed by recipe).
+
+    The change is also applied to the creator's cached profile stats once
+    the transaction commits. The recipe row stays locked from reading the
+    old totals to writing the new ones, so concurrent reviews of the same
+    recipe apply their differences one after the other, not twice.
+    """
+    with transaction.atomic():
+        old = Recipe.objects.select_for_update().filter(pk=recipe_id).values(
+            'creator_id', 'is_approved', 'rating_count', 'rating_sum'
+        ).first()
+        if old is None:
+            return
+        rows = Review.objects.filter(recipe_id=recipe_id).values_list('rating').annotate(count=Count('id')).order_by()
+        fields = rating_fields(rating_histogram(rows))
+        Recipe.objects.filter(pk=recipe_id).update(**fields)
+        if old['is_approved']:
+            deltas = {
+                'ratings': fields['rating_count'] - old['rating_count'],
+                'rating_sum': fields['rating_sum'] - old['rating_sum'],
+            }
+            transaction.on_commit(lambda: adjust_stats(old['creator_id'], **deltas))
+
+
+def refresh_favorites(recipe_ids):
+    """Recount favorites for the given recipes from the M2M table.
+
+    The change is also applied to the creators' cached profile stats once
+    the transaction commits; the recipe rows are locked while being
+    recounted, as in refresh_rating().
+    """
+    through = Recipe.favorited_by.through
+    with transaction.atomic():
+        old = list(
+            Recipe.objects.select_for_update().filter(pk__in=recipe_ids).order_by('pk')
+            .values_list('pk', 'creator_id', 'is_approved', 'favorite_count')
+        )
+        counts = dict(
+            through.objects.filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id')
+            .annotate(count=Count('id'))
+        )
+        for recipe_id, creator_id, is_approved, favorite_count in old:
+            count = counts.get(recipe_id, 0)
+            Recipe.objects.filter(pk=recipe_id).update(favorite_count=count)
+            if is_approved and count != favorite_count:
+                transaction.on_commit(
+                    lambda creator_id=creator_id, delta=count - favorite_count: adjust_stats(creator_id, favorites=delta)
+                )
+
+
+def rebuild_aggregates(batch_size=1000):
+    """Recompute rating and favorite aggregates of every recipe.
+
+    Repairs drift from bulk deletes that bypass signals (e.g. deleting a
+    user removes their favorites without m2m_changed). The cached profile
+    stats of the recipes' creators are dropped, so they are rebuilt from
+    the repaired totals.
+    """
+    through = Recipe.favorited_by.through
+    ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        ratings = defaultdict(list)
+        rows = (
+            Review.objects.filter(recipe_id__in=chunk)
+            .values_list('recipe_id', 'rating').annotate(count=Count('id')).order_by()
+        )
+        for recipe_id, rating, count in rows:
+            ratings[recipe_id].append((rating, count))
+        favorites = dict(
+            through.objects.filter(recipe_id__in=chunk).values_list('recipe_id').annotate(count=Count('id'))
+        )
+        recipes = []
+        for pk in chunk:
+            recipe = Recipe(pk=pk, favorite_count=favorites.get(pk, 0))
+            for field, value in rating_fields(rating_histogram(ratings.get(pk, []))).items():
+                setattr(recipe, field, value)
+            recipes.append(recipe)
+        fields = ['favorite_count', 'rating_count', 'rating_sum', 'rating_histogram', 'rating_average', 'rating_score']
+        with transaction.atomic():
+            Recipe.objects.bulk_update(recipes, fields)
+        creators = Recipe.objects.filter(pk__in=chunk).values_list('creator_id', flat=True).order_by().distinct()
+        invalidate_stats([creator_id for creator_id in creators if creator_id is not None])
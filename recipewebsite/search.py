@@ -0,0 +1,248 @@
+"""search.py
+
+Recipe search with cached, normalized results.
+
+Queries are normalized (lowercase, accent-folded, collapsed whitespace)
+and matched against Recipe.search_text, the recipe name and ingredients
+folded the same way, so "Maçã", "maca" and " MACA " are one query with
+one result. The ordered list of matching ids is cached per normalized
+query; paging through results slices that list and only loads the
+recipes on the current page.
+
+Cached lists are tagged with a generation number that invalidate() bumps
+whenever the set of searchable recipes changes (approval, deletion or
+edits of approved recipes), which drops every cached result at once.
+That needs a cache shared by all workers (REDIS_URL). With the
+per-process default cache the bump only reaches the worker that handled
+the write, so there results expire after LOCAL_TTL instead.
+
+When a query finds fewer than FEW_RESULTS recipes, its unknown words are
+corrected against the vocabulary of approved recipes (SearchTerm) using
+trigram similarity, so "strogonoff" also finds "estrogonofe". Candidate
+terms come from the (trigram, term) index: only terms sharing enough
+trigrams with the word are read, never the whole vocabulary.
+"""
+
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Recipe, RecipeIngredient, SearchTerm, SearchTrigram
+from .text import normalize, tokenize, trigrams
+
+# ============ CONFIGURATION ============
+RESULTS_TTL = 60 * 5
+LOCAL_TTL = 30          # Seconds other workers may show stale results without a shared cache
+MAX_RESULTS = 1000      # Ids cached per query
+GENERATION_KEY = 'search:generation'
+RESULTS_KEY = 'search:{}:{}'
+FEW_RESULTS = 5         # Below this, misspelled words are corrected
+SIMILARITY_THRESHOLD = 0.3
+MAX_CORRECTIONS = 3     # Similar terms tried per word
+MAX_CANDIDATES = 50     # Terms scored per word
+MIN_FUZZY_LENGTH = 4    # Shorter words are never corrected
+TERM_MAX_LENGTH = 64
+
+
+# ============ INDEXING ============
+
+def search_text(name, texts):
+    """Return the normalized text a recipe is matched against."""
+    return normalize(' '.join([name, *texts]))
+
+
+def update_recipe(recipe_id):
+    """Recompute a recipe's search text after it or its ingredients changed."""
+    name = Recipe.objects.filter(pk=recipe_id).values_list('name', flat=True).first()
+    if name is None:
+        return
+    texts = RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list('text', flat=True)
+    text = search_text(name, texts)
+    Recipe.objects.filter(pk=recipe_id).update(search_text=text)
+    if Recipe.objects.filter(pk=recipe_id, is_approved=True).exists():
+        index_text(text)
+    invalidate()
+
+
+def update_recipe_on_commit(recipe_id):
+    """Schedule update_recipe() for when the current transaction commits."""
+    transaction.on_commit(lambda: update_recipe(recipe_id))
+
+
+# ============ TRIGRAM VOCABULARY ============
+
+def index_terms(words):
+    """Add words to the vocabulary and its trigram index."""
+    words = {w for w in words if len(w) <= TERM_MAX_LENGTH}
+    if not words:
+        return
+    new = words - set(SearchTerm.objects.filter(term__in=words).values_list('term', flat=True))
+    if not new:
+        return
+    with transaction.atomic():
+        SearchTerm.objects.bulk_create([SearchTerm(term=w) for w in new], ignore_conflicts=True)
+        SearchTrigram.objects.bulk_create(
+            [
+                SearchTrigram(trigram=gram, term_id=pk)
+                for pk, term in SearchTerm.objects.filter(term__in=new).values_list('pk', 'term')
+                for gram in trigrams(term)
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def index_text(text):
+    """Add the content words of a recipe's search text to the vocabulary."""
+    index_terms(tokenize(text))
+
+
+def similar_terms(word, threshold=SIMILARITY_THRESHOLD, limit=MAX_CORRECTIONS):
+    """Return vocabulary terms similar to a word.
+
+    Similarity is |shared| / |union| of the trigram sets. A term can only
+    reach the threshold if it shares at least threshold * |trigrams(word)|
+    trigrams, which bounds the candidates read from the index.
+
+    Args:
+        word (str): Folded word
+        threshold (float): Minimum similarity
+        limit (int): Maximum number of terms
+
+    Returns:
+        list: (similarity, term) tuples, most similar first
+    """
+    grams = trigrams(word)
+    rows = (
+        SearchTrigram.objects.filter(trigram__in=grams)
+        .values('term_id', 'term__term')
+        .annotate(shared=Count('term_id'))
+        .filter(shared__gte=math.ceil(threshold * len(grams)))
+        .order_by('-shared')[:MAX_CANDIDATES]
+    )
+    scored = []
+    for row in rows:
+        similarity = row['shared'] / (len(grams) + len(trigrams(row['term__term'])) - row['shared'])
+        if similarity >= threshold:
+            scored.append((similarity, row['term__term']))
+    return sorted(scored, reverse=True)[:limit]
+
+
+def corrections(words):
+    """Return alternatives for each query word: itself plus similar terms.
+
+    Words already in the vocabulary, and short words, are kept as they are.
+    """
+    known = set(SearchTerm.objects.filter(term__in=words).values_list('term', flat=True))
+    return [
+        [word] if word in known or len(word) < MIN_FUZZY_LENGTH
+        else [word] + [term for _, term in similar_terms(word)]
+        for word in words
+    ]
+
+
+# ============ RESULT CACHE ============
+
+def generation():
+    """Return the current result cache generation."""
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Start from the clock so a lost counter never reuses old keys
+        value = int(time.time() * 1000)
+        cache.add(GENERATION_KEY, value, timeout=None)
+        value = cache.get(GENERATION_KEY, value)
+    return value
+
+
+def results_timeout():
+    """Cache timeout of search results: short when invalidate() is not shared."""
+    return RESULTS_TTL if settings.REDIS_URL else LOCAL_TTL
+
+
+def invalidate():
+    """Drop every cached search result."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass  # No generation yet: nothing is cached under it
+
+
+def match_ids(alternatives):
+    """Return ids of approved recipes containing one alternative of every word.
+
+    Args:
+        alternatives (list): One list of accepted spellings per query word
+
+    Returns:
+        list: Up to MAX_RESULTS recipe ids, newest first
+    """
+    recipes = Recipe.objects.filter(is_approved=True)
+    for spellings in alternatives:
+        condition = Q()
+        for spelling in spellings:
+            condition |= Q(search_text__contains=spelling)
+        recipes = recipes.filter(condition)
+    return list(recipes.values_list('pk', flat=True)[:MAX_RESULTS])
+
+
+def search_results(query):
+    """Return the ordered ids of approved recipes matching a query.
+
+    Every word of the normalized query must appear in the recipe's name or
+    ingredients. With few exact hits, recipes matching corrected spellings
+    are appended after them.
+
+    Args:
+        query (str): Normalized query
+
+    Returns:
+        tuple: (up to MAX_RESULTS recipe ids, corrected query or None)
+    """
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    key = RESULTS_KEY.format(generation(), digest)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    words = query.split()
+    ids = match_ids([[word] for word in words])
+    corrected = None
+    if len(ids) < FEW_RESULTS:
+        alternatives = corrections(words)
+        if any(len(spellings) > 1 for spellings in alternatives):
+            found = set(ids)
+            ids += [pk for pk in match_ids(alternatives) if pk not in found][:MAX_RESULTS - len(ids)]
+            corrected = ' '.join(spellings[1] if len(spellings) > 1 else spellings[0] for spellings in alternatives)
+    cache.set(key, (ids, corrected), results_timeout())
+    return ids, corrected
+
+
+def search_page(query, page, per_page):
+    """Return one page of search results.
+
+    Cached ids may be up to LOCAL_TTL old, so recipes that are no longer
+    approved are left out when the page is loaded.
+
+    Args:
+        query (str): Normalized query
+        page: Requested page number
+        per_page (int): Recipes per page
+
+    Returns:
+        tuple: (Page of Recipe objects with category and creator loaded,
+        corrected query or None)
+    """
+    ids, corrected = search_results(query)
+    paginator = Paginator(ids, per_page)
+    try:
+        results = paginator.page(page)
+    except (EmptyPage, PageNotAnInteger):
+        results = paginator.page(1)
+    recipes = Recipe.objects.filter(pk__in=results.object_list, is_approved=True).select_related('category', 'creator').in_bulk()
+    results.object_list = [recipes[pk] for pk in results.object_list if pk in recipes]
+    return results, corrected
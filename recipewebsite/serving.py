@@ -0,0 +1,204 @@
+"""serving.py
+
+In-process file serving for MEDIA_ROOT and STATIC_ROOT.
+
+Meant for small deployments without a front web server doing it:
+- Responses wrap the open file, so WSGI servers with wsgi.file_wrapper
+  (gunicorn, uWSGI) send it with sendfile() instead of copying in Python
+- Single byte ranges (Range / If-Range) are answered with 206
+- ETag / Last-Modified validators answer conditional requests with 304
+- Hashed filenames get far-future immutable cache headers
+- With ACCEL_REDIRECT_PREFIX set, the body is handed off to nginx through
+  X-Accel-Redirect after the checks above
+
+Benchmark against django.views.static.serve with `manage.py bench_serving`.
+"""
+
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+from .assets import FAR_FUTURE, is_hashed
+
+# ============ CONFIGURATION ============
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+BLOCK_SIZE = 64 * 1024  # Chunk size when the server cannot use sendfile()
+
+
+class FileRange:
+    """File object limited to one byte range.
+
+    Keeps fileno() so sendfile() still works: gunicorn starts at the current
+    offset and stops after Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Parse a single-range Range header.
+
+    Multiple ranges are not supported and fall back to the full file, which
+    RFC 9110 allows.
+
+    Args:
+        header (str): Range header value
+        size (int): File size in bytes
+
+    Returns:
+        tuple: (start, length), None to serve the full file, or
+            False when the range cannot be satisfied
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = min(int(last), size)
+        return (size - length, length) if length else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end - start + 1
+
+
+def etag_for(st):
+    """Build a strong ETag from file modification time and size."""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def not_modified(request, etag, mtime):
+    """Return True when the client's cached copy is still current."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, path, document_root, url_prefix, max_age=0):
+    """Serve one file with validators, ranges and cache headers.
+
+    Args:
+        request: HTTP request
+        path (str): File path relative to document_root
+        document_root (str): Directory the file must be inside
+        url_prefix (str): Public URL prefix, used for X-Accel-Redirect
+        max_age (int): Cache lifetime for files without a hashed name
+
+    Returns:
+        HttpResponse: 200, 206, 304 or 416 response
+
+    Raises:
+        Http404: If the file does not exist
+    """
+    fullpath = safe_join(document_root, path)
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404(f'"{path}" does not exist')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404(f'"{path}" does not exist')
+
+    etag = etag_for(st)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': FAR_FUTURE if is_hashed(path) else f'public, max-age={max_age}',
+        'Accept-Ranges': 'bytes',
+    }
+    if not_modified(request, etag, st.st_mtime):
+        response = HttpResponseNotModified()
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            response[header] = headers[header]
+        return response
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    accel_prefix = settings.ACCEL_REDIRECT_PREFIX
+    if accel_prefix:
+        # nginx handles ranges and sendfile itself from the internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{url_prefix.strip('/')}/{path}"
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and (if_range is None or if_range == etag):
+            byte_range = parse_range(range_header, st.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{st.st_size}'
+            return response
+
+        file = open(fullpath, 'rb')
+        if byte_range:
+            start, length = byte_range
+            response = FileResponse(FileRange(file, start, length), content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{st.st_size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(file, content_type=content_type)
+        response.block_size = BLOCK_SIZE
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+# ============ VIEWS ============
+
+def serve_static(request, path):
+    """Serve a collected asset from STATIC_ROOT (routed when SERVE_STATIC is on).
+
+    Picks the precompressed .br/.gz sibling written by build_assets when the
+    client accepts it.
+    """
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    served, content_encoding = path, None
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(safe_join(settings.STATIC_ROOT, path + suffix)):
+            served, content_encoding = path + suffix, encoding
+            break
+    response = serve_file(request, served, settings.STATIC_ROOT, settings.STATIC_URL)
+    response['Vary'] = 'Accept-Encoding'
+    if content_encoding and response.status_code != 304:
+        # Type of the original asset, not of the compressed container
+        response['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response['Content-Encoding'] = content_encoding
+    return response
+
+
+def serve_media(request, path):
+    """Serve an uploaded file from MEDIA_ROOT (routed when SERVE_MEDIA is on)."""
+    return serve_file(
+        request, path, settings.MEDIA_ROOT, settings.MEDIA_URL, max_age=settings.MEDIA_CACHE_MAX_AGE
+    )
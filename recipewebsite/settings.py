@@ -21,13 +21,27 @@ DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 
-# ============ INSTALLED APPS ============
-
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+# ============ CACHE ============
+
+# Shared cache (Redis) when REDIS_URL is set, per-process memory otherwise;
+# both count hits and misses for /metrics
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'recipewebsite.metrics.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'recipewebsite.metrics.LocMemCache',
+        }
+    }
+
+# ============ INSTALLED APPS ============
 
 INSTALLED_APPS = [
     # Django admin and auth
@@ -37,6 +51,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.humanize',
     # Third-party apps
     'compressor',
     'location_field.apps.DefaultConfig',
@@ -47,15 +62,44 @@ INSTALLED_APPS = [
 
 # ============ COMPRESSION ============
 
-COMPRESS_ENABLED = DEBUG  # Habilita compressão apenas em produção
-COMPRESS_OFFLINE = False  # Desabilita compressão offline
+# SCSS is compiled only by `manage.py build_assets` (or `manage.py compress`),
+# templates read the offline manifest and never compile at request time
+COMPRESS_ENABLED = True
+COMPRESS_OFFLINE = True
 COMPRESS_PRECOMPILERS = (
     ('text/x-scss', 'django_libsass.SassCompiler'),
 )
 
+# ============ RATE LIMITING ============
+
+# Counters live in the shared cache when there is one, otherwise in a local
+# SQLite file shared by all worker processes on this host
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
+RATELIMIT_STORE = os.environ.get('RATELIMIT_STORE', 'cache' if REDIS_URL else 'sqlite')
+RATELIMIT_SQLITE_PATH = os.path.join(BASE_DIR, 'var', 'ratelimit.sqlite3')
+
+# ============ POPULARITY ============
+
+# Half-life of views/favorites/reviews in the trending score (compute_scores)
+TRENDING_HALF_LIFE_HOURS = 48
+
+# ============ DELETION ============
+
+# Who runs queued user/recipe deletions: 'thread' (a background thread of the
+# web process that queued them) or 'command' (`manage.py process_deletions`)
+DELETION_WORKER = os.environ.get('DELETION_WORKER', 'thread')
+
+# ============ SEARCH ============
+
+# Typeahead index snapshot, written by `manage.py build_autocomplete` and
+# loaded by every process at startup
+AUTOCOMPLETE_SNAPSHOT = os.path.join(BASE_DIR, 'var', 'autocomplete.json.gz')
+
 # ============ MIDDLEWARE ============
 
 MIDDLEWARE = [
+    'recipewebsite.log.RequestIDMiddleware',
+    'recipewebsite.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,32 +107,107 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'recipewebsite.profiling.ProfilerMiddleware',
 ]
 
-# ============ URL & TEMPLATES ============
+# ============ METRICS ============
 
-ROOT_URLCONF = 'recipewebsite.urls'
+# Served at /metrics (see recipewebsite/metrics.py); totals of all worker
+# processes on this host are kept in METRICS_SQLITE_PATH. Scrapes must
+# send METRICS_TOKEN as a bearer token; without it /metrics is off.
+METRICS_SQLITE_PATH = os.path.join(BASE_DIR, 'var', 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-                'django.template.context_processors.media',
-                'recipewebsite.context_processor.categories_processor'
-            ],
+# ============ PROFILING ============
+
+# Staff can profile a request with a token from the admin (see recipewebsite/profiling.py);
+# only the newest PROFILE_KEEP profiles are kept
+PROFILE_DIR = os.path.join(BASE_DIR, 'var', 'profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+
+# ============ LOGGING ============
+
+# JSON lines on stderr, written by a background thread (see recipewebsite/log.py).
+# With LOG_LEVEL=DEBUG, only LOG_DEBUG_SAMPLE_RATE of debug records are kept.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'recipewebsite.log.RequestIDFilter'},
+        'sample_debug': {'()': 'recipewebsite.log.DebugSampleFilter', 'rate': LOG_DEBUG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'queue': {
+            'class': 'recipewebsite.log.QueueLogHandler',
+            'filters': ['sample_debug', 'request_id'],
         },
     },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'recipewebsite': {'level': LOG_LEVEL},
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# ============ URL & TEMPLATES ============
+
+ROOT_URLCONF = 'recipewebsite.urls'
+
+TEMPLATE_CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'django.template.context_processors.media',
+    'recipewebsite.context_processor.categories_processor'
 ]
 
+# Compiled templates are kept per process by the cached loader (reset by
+# runserver's autoreloader when a template changes); `manage.py warmup`
+# and WARMUP_ON_BOOT compile them all before the first request
+DJANGO_TEMPLATES = {
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'OPTIONS': {
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+
+# Jinja2 ports of the listing and recipe pages (recipewebsite/jinja2/,
+# see recipewebsite/jinja.py)
+JINJA2_TEMPLATES = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'recipewebsite.jinja.environment',
+        'extensions': ['compressor.contrib.jinja2ext.CompressorExtension'],
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+
+# Engine that renders the ported pages: "jinja2" looks templates up in
+# the Jinja2 backend first, so pages without a port still use Django's
+TEMPLATE_ENGINE = os.environ.get('TEMPLATE_ENGINE', 'django')
+TEMPLATES = [DJANGO_TEMPLATES, JINJA2_TEMPLATES]
+if TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES.reverse()
+
 WSGI_APPLICATION = 'recipewebsite.wsgi.application'
 
+# Run recipewebsite.warmup when a worker loads the WSGI application
+WARMUP_ON_BOOT = os.environ.get('WARMUP_ON_BOOT', 'True') == 'True'
+
 
 # ============ DATABASE ============
 
@@ -163,7 +282,30 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-COMPRESS_ROOT = os.path.join(BASE_DIR, 'static')
+# Compiled CSS is written next to the collected files so it is hashed,
+# precompressed and served together with them
+COMPRESS_ROOT = STATIC_ROOT
+
+# Hashed filenames through staticfiles.json (see recipewebsite/assets.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT / MEDIA_ROOT from the app (see recipewebsite/serving.py)
+# when there is no front web server doing it
+SERVE_STATIC = os.environ.get('SERVE_STATIC', 'False') == 'True'
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', 'False') == 'True'
+
+# Uploads are resized in place, so their names are not immutable
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# nginx `internal` location to hand file bodies off to, e.g. '/internal/'
+ACCEL_REDIRECT_PREFIX = os.environ.get('ACCEL_REDIRECT_PREFIX', '')
 
 
 # ============ DEFAULT SETTINGS ============
@@ -186,7 +328,14 @@ LOCATION_FIELD = {
     'map.center': [20, 0],
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# ============ EMAIL ============
+
+# Email is queued in the OutgoingEmail table and delivered in batches
+# through OUTBOX_DELIVERY_BACKEND (see recipewebsite/mail.py), by a
+# background thread ('thread') or by `manage.py send_outbox` ('command')
+EMAIL_BACKEND = 'recipewebsite.mail.OutboxBackend'
+OUTBOX_DELIVERY_BACKEND = os.environ.get('OUTBOX_DELIVERY_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+OUTBOX_WORKER = os.environ.get('OUTBOX_WORKER', 'thread')
 EMAIL_HOST = 'smtp-mail.outlook.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
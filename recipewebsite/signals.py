@@ -0,0 +1,126 @@
+"""signals.py
+
+Signal handlers that keep denormalized recipe data current.
+
+Connected in RecipewebsiteConfig.ready().
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, categories, deletion, notifications, search
+from .models import Category, Notification, Recipe, RecipeEvent, Review, User
+from .profiles import adjust_for_recipe_on_commit
+from .scores import record_event, refresh_favorites, refresh_rating
+
+
+# ============ RECIPES ============
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """Move the recipe between cached category counts, creator stats,
+    search suggestions and search results when it changes.
+
+    Counters are adjusted once the transaction commits (the views save
+    recipes in atomic blocks), so a rollback leaves them untouched."""
+    state = getattr(instance, '_loaded_state', None)
+    new_state = (instance.is_approved, instance.category_id)
+    instance._loaded_state = new_state
+    if created:
+        state = (False, None)
+    elif state is None or None in state:
+        # Not loaded from the database, or loaded with deferred fields
+        categories.invalidate()
+        return
+    if state != new_state:
+        old_approved, old_category = state
+        if old_approved:
+            categories.adjust_count_on_commit(old_category, -1)
+        if instance.is_approved:
+            categories.adjust_count_on_commit(instance.category_id, 1)
+        if old_approved != instance.is_approved:
+            adjust_for_recipe_on_commit(instance, 1 if instance.is_approved else -1)
+            search.invalidate()
+            if instance.is_approved:
+                search.index_text(instance.search_text)
+                autocomplete.recipe_approved(instance)
+            else:
+                autocomplete.recipe_withdrawn(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Remove a deleted approved recipe from its category count, creator stats,
+    search suggestions and search results, and its images once committed."""
+    deletion.remove_files_on_commit(instance, 'img', 'sliderImg')
+    if instance.is_approved:
+        categories.adjust_count_on_commit(instance.category_id, -1)
+        adjust_for_recipe_on_commit(instance, -1)
+        autocomplete.recipe_withdrawn(instance.pk)
+        search.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    """Rebuild the category summary after categories are edited."""
+    categories.invalidate()
+
+
+# ============ USERS ============
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Remove the avatar of a deleted user once committed."""
+    deletion.remove_files_on_commit(instance, 'avatar')
+
+
+# ============ REVIEWS ============
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Refresh rating aggregates, log the review for trending and notify
+    the recipe's creator."""
+    refresh_rating(instance.recipe_id)
+    if created:
+        record_event(instance.recipe_id, RecipeEvent.REVIEW)
+        notifications.notify(Notification.REVIEW, instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    """Refresh rating aggregates, unless the recipe itself is being deleted
+    or a deletion job refreshes them per chunk."""
+    if isinstance(origin, Recipe) or deletion.in_progress():
+        return
+    refresh_rating(instance.recipe_id)
+
+
+# ============ FAVORITES ============
+
+@receiver(m2m_changed, sender=Recipe.favorited_by.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep favorite_count current, log new favorites for trending and
+    notify the recipes' creators.
+
+    Handles both recipe.favorited_by and user.favorite_recipes.
+    """
+    if action == 'pre_clear' and reverse:
+        # pk_set is not sent for clear(), remember the user's recipes now
+        instance._cleared_favorites = list(instance.favorite_recipes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        recipe_ids = instance._cleared_favorites if reverse else [instance.pk]
+    else:
+        recipe_ids = list(pk_set) if reverse else [instance.pk]
+    refresh_favorites(recipe_ids)
+    if action == 'post_add':
+        for recipe_id in recipe_ids:
+            record_event(recipe_id, RecipeEvent.FAVORITE)
+        if reverse:
+            notifications.notify(Notification.FAVORITE, instance.pk, recipe_ids)
+        else:
+            for user_id in pk_set:
+                notifications.notify(Notification.FAVORITE, user_id, recipe_ids)
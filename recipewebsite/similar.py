@@ -0,0 +1,195 @@
+"""similar.py
+
+"Similar recipes" recommendations with MinHash and LSH.
+
+Each approved recipe is reduced to a set of tokens (normalized ingredient
+words plus its category) and summarized by a MinHash signature, whose
+matching positions estimate the Jaccard similarity of two sets. The
+signature is cut into bands; recipes sharing a band bucket are candidates,
+so a lookup reads a handful of indexed rows instead of scanning every
+recipe.
+
+The index (RecipeSignature / RecipeBand) is updated incrementally by
+update_recipe() after a recipe is saved, and rebuilt with
+`python manage.py rebuild_similar`.
+"""
+
+import hashlib
+import random
+from array import array
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Recipe, RecipeBand, RecipeIngredient, RecipeSignature
+from .text import tokenize
+
+# ============ CONFIGURATION ============
+NUM_PERM = 64           # MinHash values per signature
+BANDS = 32              # NUM_PERM = BANDS * ROWS, ~0.18 Jaccard threshold
+ROWS = NUM_PERM // BANDS
+PRIME = (1 << 61) - 1
+SEED = 1192             # Fixed so signatures are stable across processes
+SIMILAR_COUNT = 8
+MAX_CANDIDATES = 500    # Bounds the work for recipes in very crowded buckets
+CACHE_TTL = 60 * 10
+
+_rng = random.Random(SEED)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+
+# ============ SIGNATURES ============
+
+def recipe_tokens(category_id, texts):
+    """Build the token set of a recipe.
+
+    Args:
+        category_id (int): Recipe category
+        texts (iterable): RecipeIngredient texts
+
+    Returns:
+        set: Normalized ingredient words plus a category token
+    """
+    tokens = {f'cat:{category_id}'}
+    for text in texts:
+        tokens.update(tokenize(text))
+    return tokens
+
+
+def minhash(tokens):
+    """Compute the MinHash signature of a token set.
+
+    Returns:
+        array: NUM_PERM unsigned 64-bit values
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'big')
+        for t in tokens
+    ]
+    return array('Q', (min((a * h + b) % PRIME for h in hashes) for a, b in PERMUTATIONS))
+
+
+def band_buckets(signature):
+    """Hash each band of a signature into a signed 64-bit bucket id."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(band.to_bytes(2, 'big') + rows.tobytes(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def signature_for(recipe_id, category_id, texts):
+    """Compute (recipe_id, packed signature, buckets); used by the batch rebuild."""
+    signature = minhash(recipe_tokens(category_id, texts))
+    return recipe_id, signature.tobytes(), band_buckets(signature)
+
+
+def similarity(a, b):
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def unpack(data):
+    """Turn a stored signature back into an array."""
+    signature = array('Q')
+    signature.frombytes(bytes(data))
+    return signature
+
+
+# ============ INDEX MAINTENANCE ============
+
+def store(rows):
+    """Write computed signatures and buckets, replacing existing entries.
+
+    Args:
+        rows (list): Tuples from signature_for()
+    """
+    ids = [recipe_id for recipe_id, _, _ in rows]
+    with transaction.atomic():
+        RecipeSignature.objects.filter(recipe_id__in=ids).delete()
+        RecipeBand.objects.filter(recipe_id__in=ids).delete()
+        RecipeSignature.objects.bulk_create(
+            RecipeSignature(recipe_id=recipe_id, minhash=data) for recipe_id, data, _ in rows
+        )
+        RecipeBand.objects.bulk_create(
+            RecipeBand(recipe_id=recipe_id, bucket=bucket)
+            for recipe_id, _, buckets in rows
+            for bucket in buckets
+        )
+
+
+def update_recipe(recipe_id):
+    """Re-index one recipe after it was saved.
+
+    Approved recipes get a fresh signature; unapproved or deleted recipes
+    are removed from the index.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).values('category_id', 'is_approved').first()
+    if recipe is None or not recipe['is_approved']:
+        with transaction.atomic():
+            RecipeSignature.objects.filter(recipe_id=recipe_id).delete()
+            RecipeBand.objects.filter(recipe_id=recipe_id).delete()
+    else:
+        texts = RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list('text', flat=True)
+        store([signature_for(recipe_id, recipe['category_id'], texts)])
+    cache.delete(f'similar:{recipe_id}')
+
+
+def update_recipe_on_commit(recipe_id):
+    """Schedule update_recipe() for when the current transaction commits."""
+    transaction.on_commit(lambda: update_recipe(recipe_id))
+
+
+# ============ LOOKUP ============
+
+def similar_recipe_ids(recipe):
+    """Return ids of the most similar approved recipes, best first.
+
+    Args:
+        recipe (Recipe): Recipe to find neighbours for
+
+    Returns:
+        list: Up to SIMILAR_COUNT recipe ids
+    """
+    key = f'similar:{recipe.pk}'
+    ids = cache.get(key)
+    if ids is not None:
+        return ids
+
+    stored = RecipeSignature.objects.filter(recipe_id=recipe.pk).values_list('minhash', flat=True).first()
+    if stored is not None:
+        signature = unpack(stored)
+    else:
+        # Not indexed (e.g. pending approval): compute on the fly
+        texts = RecipeIngredient.objects.filter(recipe_id=recipe.pk).values_list('text', flat=True)
+        signature = minhash(recipe_tokens(recipe.category_id, texts))
+
+    # In crowded buckets keep the recipes sharing the most bands (newest first on ties)
+    matches = (
+        RecipeBand.objects
+        .filter(bucket__in=band_buckets(signature))
+        .exclude(recipe_id=recipe.pk)
+        .values('recipe_id')
+        .annotate(collisions=Count('id'))
+        .order_by('-collisions', '-recipe_id')
+        .values_list('recipe_id', flat=True)[:MAX_CANDIDATES]
+    )
+    candidates = RecipeSignature.objects.filter(recipe_id__in=list(matches)).values_list('recipe_id', 'minhash')
+    scored = sorted(
+        ((similarity(signature, unpack(data)), recipe_id) for recipe_id, data in candidates),
+        reverse=True,
+    )
+    ids = [recipe_id for _, recipe_id in scored[:SIMILAR_COUNT]]
+    cache.set(key, ids, CACHE_TTL)
+    return ids
+
+
+def similar_recipes(recipe):
+    """Return the most similar approved recipes as Recipe objects, best first."""
+    ids = similar_recipe_ids(recipe)
+    if not ids:
+        return []
+    recipes = Recipe.objects.filter(pk__in=ids, is_approved=True).select_related('category', 'creator').in_bulk()
+    return [recipes[pk] for pk in ids if pk in recipes]
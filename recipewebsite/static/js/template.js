@@ -38,6 +38,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize animations
     initAnimations();
     
+    // Initialize search suggestions
+    initSearch();
+    
     // Initialize recipe page features
     initRecipePage();
 });
@@ -155,12 +158,24 @@ function previewImage(input, previewId) {
 // ============ SEARCH FUNCTIONALITY ============
 function initSearch() {
     const searchInput = document.querySelector('.search-input');
-    if (searchInput) {
+    if (searchInput && searchInput.dataset.suggestUrl) {
+        const list = document.getElementById(searchInput.getAttribute('list'));
         searchInput.addEventListener('input', debounce(function(e) {
-            const searchTerm = e.target.value.toLowerCase();
-            console.log('Buscando por:', searchTerm);
-            // Adicionar lógica de busca aqui
-        }, 300));
+            const searchTerm = e.target.value.trim();
+            if (searchTerm.length < 2) {
+                list.replaceChildren();
+                return;
+            }
+            fetch(`${searchInput.dataset.suggestUrl}?q=${encodeURIComponent(searchTerm)}`)
+                .then(response => response.json())
+                .then(data => {
+                    list.replaceChildren(...data.suggestions.map(suggestion => {
+                        const option = document.createElement('option');
+                        option.value = suggestion.label;
+                        return option;
+                    }));
+                });
+        }, 150));
     }
 }
 
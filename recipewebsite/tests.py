@@ -0,0 +1,137 @@
+"""tests.py
+
+Tests for Recipe Website.
+
+Run with:
+    python manage.py test recipewebsite
+
+The admin tests render every admin page against several rows of each
+model and count its SQL queries, so a list column, widget or inline that
+queries once per row fails here instead of on the live admin. Images are
+left empty so no file is read or written.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .management.commands.check_admin_queries import BUDGETS, Command as CheckAdminQueries
+from .models import (
+    Category, DeletionJob, Icons, Ingredient, Note, OutgoingEmail, Place, PreparationStep,
+    Recipe, RecipeIngredient, SocialMedia, User,
+)
+
+# ============ CONFIGURATION ============
+ROWS = 3    # Rows created per model (and per inline of each parent)
+
+
+def create_recipes(creator, categories, count, start=0):
+    """Create approved and pending recipes with ingredients, steps and notes."""
+    recipes = []
+    for i in range(start, start + count):
+        recipe = Recipe.objects.create(
+            name=f'Receita {i}', img='', sliderImg='', difficulty=2, duration=30,
+            description='Misture tudo.', category=categories[i % len(categories)],
+            creator=creator, is_approved=i % 2 == 0,
+        )
+        for sequence in range(1, ROWS + 1):
+            RecipeIngredient.objects.create(recipe=recipe, sequence=sequence, text=f'{sequence} xícaras de farinha')
+            PreparationStep.objects.create(recipe=recipe, sequence=sequence, text=f'Passo {sequence}')
+            Note.objects.create(recipe=recipe, content=f'Dica {sequence}')
+        recipes.append(recipe)
+    return recipes
+
+
+def create_users(places, icons, count, start=0):
+    """Create users living in a place, each with social media profiles."""
+    users = []
+    for i in range(start, start + count):
+        user = User.objects.create_user(
+            email=f'user{i}@example.com', username=f'user{i}', password='x',
+            avatar='', city=places[i % len(places)],
+        )
+        for icon in icons:
+            SocialMedia.objects.create(user=user, icon=icon, social_name=icon.name, link=f'https://example.com/{i}')
+        users.append(user)
+    return users
+
+
+# ============ ADMIN ============
+
+class AdminQueryTests(TestCase):
+    """Every admin page stays within its query budget, and the busiest
+    pages run the same number of queries whatever the number of rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', password='x', avatar='',
+        )
+        cls.categories = [Category.objects.create(name=f'Categoria {i}') for i in range(ROWS)]
+        cls.places = [Place.objects.create(city=f'Cidade {i}', location=f'-23.5{i},-46.6{i}') for i in range(ROWS)]
+        cls.icons = [Icons.objects.create(name=f'Rede {i}', html_class='fab fa-instagram') for i in range(ROWS)]
+        for i in range(ROWS):
+            Ingredient.objects.create(name=f'ingrediente {i}', key=f'ingrediente {i}', kcal=100)
+        users = create_users(cls.places, cls.icons, ROWS)
+        create_recipes(users[0], cls.categories, 2 * ROWS)
+        for i in range(ROWS):
+            DeletionJob.objects.create(
+                kind=DeletionJob.RECIPE, object_id=1000 + i, label=f'Receita {i}',
+                status=DeletionJob.DONE, requested_by=users[i],
+            )
+            OutgoingEmail.objects.create(
+                subject=f'Assunto {i}', body='Olá', from_email='site@example.com',
+                to=[users[i].email], status=OutgoingEmail.SENT,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def render(self, url):
+        """GET an admin page and return the queries it ran."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return queries
+
+    def test_pages_within_budget(self):
+        for page, url in CheckAdminQueries().pages(self.admin):
+            with self.subTest(url=url):
+                queries = self.render(url)
+                self.assertLessEqual(
+                    len(queries), BUDGETS[page],
+                    '\n'.join([url] + [query['sql'] for query in queries.captured_queries]),
+                )
+
+    def test_recipe_pages_do_not_query_per_row(self):
+        recipe = Recipe.objects.order_by('pk').first()
+        urls = [
+            reverse('admin:recipewebsite_recipe_changelist'),
+            reverse('admin:recipewebsite_recipe_moderation'),
+            reverse('admin:recipewebsite_note_changelist'),
+            reverse('admin:recipewebsite_recipe_change', args=[recipe.pk]),
+        ]
+        counts = [len(self.render(url)) for url in urls]
+        create_recipes(self.admin, self.categories, 2 * ROWS, start=100)
+        for sequence in range(ROWS + 1, 2 * ROWS + 1):
+            RecipeIngredient.objects.create(recipe=recipe, sequence=sequence, text=f'{sequence} ovos')
+            PreparationStep.objects.create(recipe=recipe, sequence=sequence, text=f'Passo {sequence}')
+            Note.objects.create(recipe=recipe, content=f'Dica {sequence}')
+        for url, count in zip(urls, counts):
+            with self.subTest(url=url), self.assertNumQueries(count):
+                self.client.get(url)
+
+    def test_user_pages_do_not_query_per_row(self):
+        user = User.objects.exclude(pk=self.admin.pk).order_by('pk').first()
+        urls = [
+            reverse('admin:recipewebsite_user_changelist'),
+            reverse('admin:recipewebsite_user_change', args=[user.pk]),
+        ]
+        counts = [len(self.render(url)) for url in urls]
+        create_users(self.places, self.icons, 2 * ROWS, start=100)
+        for icon in self.icons:
+            SocialMedia.objects.create(user=user, icon=icon, social_name='Outra', link='https://example.com/x')
+        for url, count in zip(urls, counts):
+            with self.subTest(url=url), self.assertNumQueries(count):
+                self.client.get(url)
@@ -0,0 +1,65 @@
+"""text.py
+
+Text normalization helpers shared by search and recommendation features.
+"""
+
+import re
+import unicodedata
+
+# ============ CONFIGURATION ============
+WORD = re.compile(r'[a-z]+')
+
+# Words that say nothing about what a recipe is made of
+STOPWORDS = frozenset("""
+    a as o os e de da das do dos em na nas no nos com sem para por ou ao
+    um uma uns umas gosto bem cada meia meio
+    xicara xicaras colher colheres sopa cha cafe sobremesa copo copos lata latas
+    pitada pitadas unidade unidades pacote pacotes dente dentes fatia fatias
+    g kg mg ml l litro litros grama gramas quilo quilos
+""".split())
+
+
+def fold(text):
+    """Lowercase text and strip accents ("Açúcar" -> "acucar")."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize(text):
+    """Fold text and collapse whitespace ("  Bolo  de Maçã " -> "bolo de maca")."""
+    return ' '.join(fold(text).split())
+
+
+def tokenize(text):
+    """Split text into folded words, dropping stopwords and short words.
+
+    Args:
+        text (str): Free text, e.g. "2 xícaras de farinha de trigo"
+
+    Returns:
+        list: Content words, e.g. ['farinha', 'trigo']
+    """
+    return [w for w in WORD.findall(fold(text)) if len(w) > 2 and w not in STOPWORDS]
+
+
+def trigrams(word):
+    """Return the set of trigrams of a folded word, padded like pg_trgm.
+
+    Example: "sal" -> {'  s', ' sa', 'sal', 'al '}
+    """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def terms(text):
+    """Like tokenize(), but keep each word's original spelling for display.
+
+    Returns:
+        list: (folded, lowercase original) pairs, e.g. [('acucar', 'açúcar')]
+    """
+    pairs = []
+    for word in re.findall(r'[^\W\d_]+', text.lower()):
+        folded = fold(word)
+        if len(folded) > 2 and folded not in STOPWORDS and WORD.fullmatch(folded):
+            pairs.append((folded, word))
+    return pairs
@@ -0,0 +1,66 @@
+"""thumbnails.py
+
+Small JPEG derivatives of uploaded images.
+
+A derivative lives under MEDIA_ROOT/thumbnails with the same relative
+name as its source (recipes/bolo.png -> thumbnails/recipes/bolo.jpg), so
+it can be found, regenerated or removed from the source name alone.
+Thumbnails are created when a recipe is saved (and again when it is
+approved, for recipes saved before they existed); pages only look them
+up and show the original image while one is missing.
+"""
+
+import logging
+import os
+
+from .metrics import IMAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_SIZE = (320, 180)
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_name(name):
+    """Return the storage name of the thumbnail of a file name."""
+    return f'{THUMBNAIL_DIR}/{os.path.splitext(name)[0]}.jpg'
+
+
+def ensure_thumbnail(file):
+    """Create the thumbnail of an image field file if it does not exist yet.
+
+    Args:
+        file (FieldFile): Source image
+
+    Returns:
+        str: Thumbnail storage name, or None if the source cannot be read
+    """
+    if not file:
+        return None
+    name = thumbnail_name(file.name)
+    storage = file.storage
+    if storage.exists(name):
+        return name
+    from PIL import Image, ImageOps  # Loaded on first use, not at startup
+
+    try:
+        path = storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with IMAGE_SECONDS.time('thumbnail'), Image.open(storage.path(file.name)) as img:
+            thumb = ImageOps.fit(img.convert('RGB'), THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+            thumb.save(path, 'JPEG', quality=THUMBNAIL_QUALITY)
+    except Exception as e:
+        logger.error("Error creating thumbnail of %s: %s", file.name, e)
+        return None
+    return name
+
+
+def thumbnail_url(file):
+    """Return the URL of an image's thumbnail if it exists, else of the
+    image itself (never creates it)."""
+    if not file:
+        return None
+    name = thumbnail_name(file.name)
+    return file.storage.url(name) if file.storage.exists(name) else file.url
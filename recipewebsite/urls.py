@@ -4,20 +4,23 @@ URL configuration for Recipe Website project.
 
 Routes URLs to views organized by functionality:
 - Authentication: user_login, user_register, user_logout
-- Browse: index, category, recipe, search_recipes
-- User Account: user_account, user_update, user_detail
+- Browse: index, category, ingredient, nearby, recipe, search_recipes, search_suggest
+- User Account: user_account, user_update, user_detail, notification_list
 - Recipe Management: recipe_create, recipe_update, recipe_delete
+- Admin & monitoring: admin site, request profiles, metrics
 
 For more information:
     https://docs.djangoproject.com/en/5.0/topics/http/urls/
 """
 
+import re
 from django.contrib import admin
 from django.views.generic import RedirectView
-from django.urls import path
+from django.urls import path, re_path
 from django.conf.urls.static import static
 from django.conf import settings
-from recipewebsite import views
+from recipewebsite import serving, views
+from recipewebsite.admin import profile_urls
 from django.contrib.auth import views as auth_views
 
 # ============ AUTHENTICATION ============
@@ -32,14 +35,18 @@ browse_patterns = [
     path('', RedirectView.as_view(url='/index/', permanent=False), name='home'),
     path('index/', views.index, name='index'),
     path('category/<int:pk>/', views.category, name='category'),
+    path('ingredient/<int:pk>/', views.ingredient, name='ingredient'),
+    path('recipes/nearby/', views.nearby, name='nearby'),
     path('recipe/<int:pk>/', views.recipe, name='recipe'),
     path('search-recipes/', views.search_recipes, name='search-recipes'),
+    path('search-recipes/suggest/', views.search_suggest, name='search-suggest'),
 ]
 
 # ============ USER ACCOUNT ============
 account_patterns = [
     path('account/', views.user_account, name='account'),
     path('account/edit/', views.user_update, name='edit'),
+    path('account/notifications/', views.notification_list, name='notifications'),
     path('profile/<int:pk>/', views.user_detail, name='profile'),
     path('reset_password/', auth_views.PasswordResetView.as_view(template_name="reset_password.html"), name='reset_password'),
     path('password_reset_done/', auth_views.PasswordResetDoneView.as_view(template_name="reset_password.html"), name='password_reset_done'),
@@ -62,11 +69,15 @@ recipe_patterns = [
 
 review_patterns = [
     path('review_create/<int:pk>/', views.review_create, name="review_create"),
-    path('review_delete/<int:pk>/', views.review_delete, name='review_delete')
+    path('review_delete/<int:pk>/', views.review_delete, name='review_delete'),
+    path('recipe/<int:pk>/reviews/', views.review_page, name='review_page'),
 ]
 # ============ ADMIN ============
 admin_patterns = [
+    # Before admin.site.urls, which answers unknown admin/ paths with a 404
+    *profile_urls,
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
 
 # Combine all patterns
@@ -79,7 +90,16 @@ urlpatterns = (
     review_patterns
 )
 
-# Static and media files (development only)
-if settings.DEBUG:
+# Static and media files
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serving.serve_media),
+    ]
+elif settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serving.serve_static),
+    ]
+elif settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
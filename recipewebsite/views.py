@@ -6,14 +6,17 @@ Views are organized by functionality:
 - Search & Browse: search_recipes, index, category, recipe
 - Recipe Management: createRecipe, editRecipe, delete_recipe
 - Authentication: loginPage, registerUser, logoutUser
-- User Account: userAccount, editUser, userProfile
+- User Account: userAccount, editUser, userProfile, notifications
+- Metrics: metrics_view
 
 All views use select_related() for query optimization and pagination
 where appropriate. Create/Edit views use @transaction.atomic for 
 data consistency.
 """
 
+import hmac
 import logging
+from django.conf import settings
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
@@ -21,60 +24,142 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db import transaction
-from django_ratelimit.decorators import ratelimit
+from django.db.models import Count
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from . import deletion, geo, metrics, notifications, nutrition, search
+from .autocomplete import suggest
+from .categories import category_summary
 from .forms import CreateRecipeForm, CustomUserChangeForm, CustomUserCreationForm, IngredientsFormSet, PreparationStepFormSet, ReviewForm
-from .models import Category, Recipe, Note, PreparationStep, RecipeIngredient, Review, SocialMedia
-from .models import User
-from django.db.models import Q
+from .models import Ingredient, Place, Recipe, RecipeEvent, Note, PreparationStep, RecipeIngredient, Review, SocialMedia
+from .models import DeletionJob, OutgoingEmail, User
+from .profiles import user_stats
+from .ratelimit import ratelimit, throttled_totals
+from .scores import highlight_ids, record_event
+from .similar import similar_recipes, update_recipe_on_commit
+from .text import normalize
 
 logger = logging.getLogger(__name__)
 
 # ============ CONFIGURATION ============
 PAGE_SIZE = 12  # Recipes per page
+REVIEW_PAGE_SIZE = 10  # Reviews per page on the recipe page
+SECTION_SIZE = 4  # Recipes in the "Em alta" / "Mais bem avaliadas" sections
+
+# Listing orders, each backed by an index on Recipe
+SORT_ORDERS = {
+    'recent': ['-date_updated', '-date_created'],
+    'trending': ['-trending_score'],
+    'top': ['-rating_score'],
+}
+CALORIE_LIMITS = (300, 500, 800)  # "Até N kcal" filters, per serving
+NEARBY_PLACES = 25                # Places searched by "perto de mim" without ?km=
+NEARBY_MAX_KM = 500
+
+
+def sort_recipes(request, recipes_list):
+    """Order a recipe queryset by the ?sort= parameter.
+    
+    Returns:
+        tuple: (ordered queryset, sort key used)
+    """
+    sort = request.GET.get('sort', 'recent')
+    if sort not in SORT_ORDERS:
+        sort = 'recent'
+    return recipes_list.order_by(*SORT_ORDERS[sort]), sort
+
+
+def filter_calories(request, recipes_list):
+    """Keep recipes with at most ?max_kcal= calories per serving.
+    
+    Reads the stored, indexed kcal_per_serving column; recipes without
+    nutrition facts are left out while the filter is active.
+    
+    Returns:
+        tuple: (filtered queryset, limit used or None)
+    """
+    try:
+        limit = int(request.GET.get('max_kcal', ''))
+    except ValueError:
+        return recipes_list, None
+    return recipes_list.filter(kcal_per_serving__lte=limit), limit
 
 
 # ============ SEARCH & BROWSE ============
 
+@ratelimit('search', rate='60/m', key='ip')
 def search_recipes(request):
-    """Search recipes by name with pagination.
+    """Search recipes by name and ingredients with pagination.
     
-    POST: Search for recipes containing query string
+    Rate limited to 60 searches per minute per IP.
+    
+    GET: Search for recipes containing every word of the query, falling
+    back to corrected spellings when there are few hits; the ordered
+    result ids are cached per normalized query (see search.py)
+    POST: Redirect old form submissions to the GET URL
     
     Args:
         request: HTTP request
-        search-recipes: Query string from form
+        q: Query string
+        page: Result page number
     
     Returns:
         Rendered search-recipe.html with paginated results
     """
-    context = {}
     if request.method == 'POST':
-        searched = request.POST.get('search-recipes', '')
-        recipes_list = Recipe.objects.filter(Q(name__icontains=searched) | Q(recipeingredient__text__icontains=searched), is_approved=True).select_related('category', 'creator').distinct()
-        paginator = Paginator(recipes_list, PAGE_SIZE)
-        page = request.GET.get('page', 1)
-        try:
-            recipes = paginator.page(page)
-        except (EmptyPage, PageNotAnInteger):
-            recipes = paginator.page(1)
-        context = {
-            'searched': searched,
-            'recipes': recipes,
-            'paginator': paginator
-        }
-    return render(request, 'search-recipe.html', context)
+        return redirect(f"{reverse('search-recipes')}?{urlencode({'q': request.POST.get('search-recipes', '')})}")
+    searched = request.GET.get('q', '')
+    query = normalize(searched)
+    context = {'searched': searched, 'q': query}
+    if query:
+        context['recipes'], context['corrected'] = search.search_page(query, request.GET.get('page', 1), PAGE_SIZE)
+    response = render(request, 'search-recipe.html', context)
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+
+def search_suggest(request):
+    """Return typeahead suggestions for the search box as JSON.
+    
+    Served from the in-memory index in autocomplete.py, without touching
+    the database. Responses may be cached briefly by browsers and proxies.
+    
+    Args:
+        request: HTTP request
+        q: Text typed so far
+    
+    Returns:
+        JsonResponse: {"suggestions": [{"label", "url"}]}; url is null for ingredient terms
+    """
+    suggestions = [
+        {'label': label, 'url': reverse('recipe', args=[recipe_id]) if recipe_id else None}
+        for label, _, recipe_id in suggest(request.GET.get('q', ''))
+    ]
+    response = JsonResponse({'suggestions': suggestions})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
 
 
 def index(request):
     """Display all approved recipes with pagination.
     
+    The first page also shows the trending and top rated sections: their
+    ids come from the cache (see scores.highlight_ids), the recipes from
+    one primary key lookup.
+    
     Args:
         request: HTTP request
+        sort: Optional ordering ('recent', 'trending' or 'top')
+        max_kcal: Optional calories per serving limit
     
     Returns:
         Rendered index.html with paginated approved recipes
     """
-    recipes_list = Recipe.objects.filter(is_approved=True).select_related('category', 'creator')
+    approved = Recipe.objects.filter(is_approved=True).select_related('category', 'creator')
+    recipes_list, max_kcal = filter_calories(request, approved)
+    recipes_list, sort = sort_recipes(request, recipes_list)
     paginator = Paginator(recipes_list, PAGE_SIZE)
     page = request.GET.get('page', 1)
     try:
@@ -83,11 +168,16 @@ def index(request):
         recipes = paginator.page(1)
     context = {
         "recipes": recipes,
-        "paginator": paginator
+        "paginator": paginator,
+        "sort": sort,
+        "max_kcal": max_kcal,
+        "calorie_limits": CALORIE_LIMITS
     }
-    for r in recipes:
-        r.average_rating = round(r.get_review_average_rating())
-        print(r.average_rating)
+    if recipes.number == 1 and max_kcal is None:
+        trending_ids, top_rated_ids = highlight_ids(SECTION_SIZE)
+        highlights = approved.in_bulk(trending_ids + top_rated_ids)
+        context["trending"] = [highlights[pk] for pk in trending_ids if pk in highlights]
+        context["top_rated"] = [highlights[pk] for pk in top_rated_ids if pk in highlights]
     return render(request, "index.html", context)
 
 
@@ -97,6 +187,8 @@ def category(request, pk):
     Args:
         request: HTTP request
         pk (int): Category ID
+        sort: Optional ordering ('recent', 'trending' or 'top')
+        max_kcal: Optional calories per serving limit
     
     Returns:
         Rendered category.html with recipes in category
@@ -104,9 +196,13 @@ def category(request, pk):
     Raises:
         Http404: If category does not exist
     """
-    category = get_object_or_404(Category, id=pk)
-    category_list = Category.objects.all()
+    category_list = category_summary()
+    category = next((c for c in category_list if c['id'] == pk), None)
+    if category is None:
+        raise Http404("Category does not exist")
     recipes_list = Recipe.objects.filter(category_id=pk, is_approved=True).select_related('category', 'creator')
+    recipes_list, max_kcal = filter_calories(request, recipes_list)
+    recipes_list, sort = sort_recipes(request, recipes_list)
     paginator = Paginator(recipes_list, PAGE_SIZE)
     page = request.GET.get('page', 1)
     try:
@@ -117,11 +213,99 @@ def category(request, pk):
         "category": category,
         "recipes": recipes,
         "categories": category_list,
-        "paginator": paginator
+        "paginator": paginator,
+        "sort": sort,
+        "max_kcal": max_kcal,
+        "calorie_limits": CALORIE_LIMITS
     }
     return render(request, "category.html", context)
 
 
+def ingredient(request, pk):
+    """Display approved recipes that use an ingredient, with pagination.
+    
+    Recipes are found through the (ingredient, recipe) index on parsed
+    ingredient lines instead of a text scan.
+    
+    Args:
+        request: HTTP request
+        pk (int): Ingredient ID
+        sort: Optional ordering ('recent', 'trending' or 'top')
+    
+    Returns:
+        Rendered search-recipe.html with recipes using the ingredient
+    
+    Raises:
+        Http404: If ingredient does not exist
+    """
+    ingredient = get_object_or_404(Ingredient, pk=pk)
+    recipe_ids = RecipeIngredient.objects.filter(ingredient_id=pk).values('recipe_id')
+    recipes_list = Recipe.objects.filter(pk__in=recipe_ids, is_approved=True).select_related('category', 'creator')
+    recipes_list, sort = sort_recipes(request, recipes_list)
+    paginator = Paginator(recipes_list, PAGE_SIZE)
+    page = request.GET.get('page', 1)
+    try:
+        recipes = paginator.page(page)
+    except (EmptyPage, PageNotAnInteger):
+        recipes = paginator.page(1)
+    context = {
+        "searched": ingredient.name,
+        "recipes": recipes,
+        "paginator": paginator,
+        "sort": sort
+    }
+    return render(request, "search-recipe.html", context)
+
+
+@login_required(login_url='/login')
+def nearby(request):
+    """Display approved recipes by creators living near the user's city.
+    
+    Nearby places come from the geohash index (see geo.py): those within
+    ?km= of the user's city, or the NEARBY_PLACES nearest ones.
+    
+    Args:
+        request: HTTP request
+        km: Optional radius in km (1 to NEARBY_MAX_KM)
+        sort: Optional ordering ('recent', 'trending' or 'top')
+    
+    Returns:
+        Rendered search-recipe.html with recipes by nearby creators, or a
+        redirect to the account page if the user's city has no coordinates
+    """
+    city = request.user.city
+    if city is None or city.latitude is None:
+        messages.error(request, "Informe sua cidade no perfil para ver receitas de perto.")
+        return redirect('account')
+    try:
+        km = min(max(int(request.GET['km']), 1), NEARBY_MAX_KM)
+    except (KeyError, ValueError):
+        km = None
+    if km:
+        places = geo.places_within(Place.objects, city.latitude, city.longitude, km)
+    else:
+        places = geo.nearest_places(Place.objects, city.latitude, city.longitude, NEARBY_PLACES)
+    recipes_list = (
+        Recipe.objects.filter(creator__city_id__in=[pk for _, pk in places], is_approved=True)
+        .select_related('category', 'creator')
+    )
+    recipes_list, sort = sort_recipes(request, recipes_list)
+    paginator = Paginator(recipes_list, PAGE_SIZE)
+    page = request.GET.get('page', 1)
+    try:
+        recipes = paginator.page(page)
+    except (EmptyPage, PageNotAnInteger):
+        recipes = paginator.page(1)
+    context = {
+        "searched": f"perto de {city.city}",
+        "recipes": recipes,
+        "paginator": paginator,
+        "sort": sort,
+        "km": km
+    }
+    return render(request, "search-recipe.html", context)
+
+
 def recipe(request, pk):
     """Display single recipe with ingredients, steps, and notes.
     
@@ -136,18 +320,22 @@ def recipe(request, pk):
         Http404: If recipe does not exist
     """
     recipe = get_object_or_404(Recipe, pk=pk)
+    if recipe.is_approved:
+        record_event(recipe.pk, RecipeEvent.VIEW)
     notes = Note.objects.filter(recipe_id=pk).select_related('recipe')
     steps = PreparationStep.objects.filter(recipe_id=pk).order_by('sequence')
-    ingredients = RecipeIngredient.objects.filter(recipe=pk)
+    ingredients = list(RecipeIngredient.objects.filter(recipe=pk))
     review_form = ReviewForm()
-    reviews = review_list(request=request, recipe=recipe)
+    reviews = review_list(request=request, recipe=recipe, page=request.GET.get('reviews', 1))
     context = {
         "reviews": reviews,
         "recipe": recipe,
         "notes": notes,
         "steps": steps,
         "ingredients": ingredients,
-        "review_form": review_form
+        "review_form": review_form,
+        "similar_recipes": similar_recipes(recipe),
+        "scaling": nutrition.scaling_payload(recipe, ingredients)
     }
     return render(request, "recipe.html", context)
 
@@ -155,7 +343,7 @@ def recipe(request, pk):
 # ============ RECIPE MANAGEMENT ============
 
 @login_required(login_url='/login')
-@ratelimit(key='user', rate='20/h', method='POST')
+@ratelimit('recipe_create', rate='20/h', key='user', method='POST')
 @transaction.atomic
 def recipe_create(request):
     """Create new recipe with ingredients and preparation steps.
@@ -185,13 +373,18 @@ def recipe_create(request):
             ingredients_formset.save()
             steps_formset.instance = recipe
             steps_formset.save()
-            logger.info(f"Recipe created: {recipe.name} by {request.user.username}")
+            update_recipe_on_commit(recipe.pk)
+            search.update_recipe_on_commit(recipe.pk)
+            nutrition.update_recipe_on_commit(recipe.pk)
+            logger.info("Recipe created: %s by %s", recipe.pk, request.user.pk)
             messages.success(request, "Recipe created successfully!")
             return redirect('recipe', pk=recipe.pk)
         else:
-            logger.error(f"Form errors: {form.errors}")
-            logger.error(f"Ingredients errors: {ingredients_formset.errors}")
-            logger.error(f"Steps errors: {steps_formset.errors}")
+            logger.warning("Invalid recipe form", extra={
+                'form_errors': form.errors,
+                'ingredient_errors': ingredients_formset.errors,
+                'step_errors': steps_formset.errors,
+            })
             messages.error(request, "There are some errors in the form")
     else:
         form = CreateRecipeForm()
@@ -241,13 +434,18 @@ def recipe_update(request, pk):
             ingredients_formset.save()
             steps_formset.instance = recipe
             steps_formset.save()
-            logger.info(f"Recipe updated: {recipe.name} by {request.user.username}")
+            update_recipe_on_commit(recipe.pk)
+            search.update_recipe_on_commit(recipe.pk)
+            nutrition.update_recipe_on_commit(recipe.pk)
+            logger.info("Recipe updated: %s by %s", recipe.pk, request.user.pk)
             messages.success(request, "Recipe updated successfully!")
             return redirect('recipe', pk=recipe.pk)
         else:
-            logger.error(f"Form errors: {form.errors}")
-            logger.error(f"Ingredients errors: {ingredients_formset.errors}")
-            logger.error(f"Steps errors: {steps_formset.errors}")
+            logger.warning("Invalid recipe form", extra={
+                'form_errors': form.errors,
+                'ingredient_errors': ingredients_formset.errors,
+                'step_errors': steps_formset.errors,
+            })
             for key, value in form.errors.items():
                 messages.error(request, value)
             for key, value in ingredients_formset.errors.items():
@@ -279,7 +477,7 @@ def delete_recipe(request, pk):
     
     Returns:
         GET: Rendered delete_recipe.html for confirmation
-        POST: Redirect to index on success
+        POST: Redirect to index once the deletion is queued (see deletion.py)
     
     Raises:
         Http404: If recipe not found
@@ -292,9 +490,8 @@ def delete_recipe(request, pk):
         return redirect('recipe', pk=pk)
     
     if request.method == 'POST':
-        recipe_name = recipe.name
-        recipe.delete()
-        messages.success(request, f"Receita '{recipe_name}' deletada com sucesso!")
+        deletion.schedule(recipe, requested_by=request.user)
+        messages.success(request, f"Receita '{recipe.name}' será excluída em instantes.")
         return redirect('index')
     
     # Render confirmation for GET request
@@ -312,10 +509,12 @@ def favorite_toggle(request, pk):
 
 # ============ AUTHENTICATION ============
 
+@ratelimit('user_login', rate='10/m', key='ip', method='POST')
 def user_login(request):
     """User login view.
     
     Redirects authenticated users to index.
+    Rate limited to 10 attempts per minute per IP.
     
     GET: Display login form
     POST: Authenticate user with email/username and password
@@ -355,10 +554,12 @@ def user_login(request):
     return render(request, 'login_register.html', context)
 
 
+@ratelimit('user_register', rate='5/h', key='ip', method='POST')
 def user_register(request):
     """User registration view.
     
     Redirects authenticated users to index.
+    Rate limited to 5 accounts per hour per IP.
     
     GET: Display registration form
     POST: Create new user if form valid
@@ -413,8 +614,10 @@ def user_delete(request, pk):
     user = get_object_or_404(User, pk=pk)
     if request.method == 'POST':
         if request.user == user or request.user.is_staff:
-            user.delete()
-            messages.success(request, "Usuário deletado com sucesso!")
+            deletion.schedule(user, requested_by=request.user)
+            if request.user == user:
+                logout(request)
+            messages.success(request, "Usuário será excluído em instantes.")
             return redirect('index')
         if request.user != user and not request.user.is_staff:
             messages.error(request, "Você não pode deletar esse usuário!")
@@ -427,17 +630,50 @@ def user_delete(request, pk):
 
 # ============ USER ACCOUNT ============
 
+def profile_context(request, user, recipes_list):
+    """Build the context shared by the public and own profile pages.
+    
+    Recipes are paginated newest first, which the (creator, is_approved)
+    index serves directly; header stats come from the cache (see profiles.py).
+    
+    Args:
+        request: HTTP request
+        user (User): Profile owner
+        recipes_list (QuerySet): The user's recipes to list
+    
+    Returns:
+        dict: Context for profile.html
+    """
+    paginator = Paginator(recipes_list.select_related('category', 'creator').order_by('-pk'), PAGE_SIZE)
+    page = request.GET.get('page', 1)
+    try:
+        recipes = paginator.page(page)
+    except (EmptyPage, PageNotAnInteger):
+        recipes = paginator.page(1)
+    return {
+        'user': user,
+        'recipes': recipes,
+        'paginator': paginator,
+        'stats': user_stats(user.pk),
+        'socials': SocialMedia.objects.filter(user=user).select_related('icon'),
+    }
+
+
 @login_required(login_url='/login')
 def user_account(request):
+    """Display the current user's profile, including unapproved recipes.
+    
+    Requires authentication.
+    
+    Args:
+        request: HTTP request
+    
+    Returns:
+        Rendered profile.html with paginated recipes and cached stats
+    """
     user = request.user
-    socials = SocialMedia.objects.filter(user=user)
-    recipes = Recipe.objects.filter(creator=user)
-    context = {
-        'recipes': recipes,
-        'user': user,
-        'socials': socials
-    }
-    return render(request, 'profile.html', context)
+    recipes_list = Recipe.objects.filter(creator=user)
+    return render(request, 'profile.html', profile_context(request, user, recipes_list))
 
 
 @login_required(login_url='/login')
@@ -464,7 +700,7 @@ def user_update(request):
         profile_form = CustomUserChangeForm(request.POST, instance=user)
         if profile_form.is_valid():
             profile_form.save()
-            logger.info(f"User profile updated: {user.username}")
+            logger.info("User profile updated: %s", user.pk)
             messages.success(request, "Profile updated successfully!")
             return redirect('account')
         else:
@@ -489,24 +725,15 @@ def user_detail(request, pk):
         pk (int): User ID
     
     Returns:
-        Rendered profile.html with user information
+        Rendered profile.html with paginated recipes and cached stats
     
     Raises:
         Http404: If user not found
     """
 
     user = get_object_or_404(User, pk=pk)
-    print(user.last_name)
-    context = {}
-    recipes = Recipe.objects.filter(creator=user, is_approved=True)
-    print(recipes.count)
-    socials = SocialMedia.objects.filter(user=user)
-    context = {
-        'user': user,
-        'recipes': recipes,
-        'socials': socials
-    }
-    return render(request, 'profile.html', context)
+    recipes_list = Recipe.objects.filter(creator=user, is_approved=True)
+    return render(request, 'profile.html', profile_context(request, user, recipes_list))
 
 @login_required(login_url='/login')
 def password_change(request):
@@ -524,11 +751,32 @@ def password_change(request):
     else:
         form = PasswordChangeForm(request.user)
     return render(request, 'change_password.html', {form: 'form'})
+
+
+@login_required(login_url='/login')
+def notification_list(request):
+    """Display the current user's newest notifications and clear the badge.
+    
+    Requires authentication.
+    
+    Args:
+        request: HTTP request
+    
+    Returns:
+        Rendered notifications.html
+    """
+    context = {
+        'notifications': notifications.recent(request.user),
+        'unread': request.user.unread_notifications,
+    }
+    notifications.mark_read(request.user)
+    return render(request, 'notifications.html', context)
     
 
 # ============ REVIEWS ============
 
 @login_required(login_url='/login')
+@ratelimit('review_create', rate='30/h', key='user', method='POST')
 def review_create(request, pk):
     recipe = Recipe.objects.get(pk=pk)
     if request.method == 'POST':
@@ -561,14 +809,99 @@ def review_update(request, pk):
     else:
         return redirect('recipe', pk=instance)
 
-def review_list(request, recipe):
-    reviews = Review.objects.filter(recipe=recipe)
+def review_list(request, recipe, page=1):
+    """Return one page of a recipe's reviews, newest first.
+    
+    Authors are joined in the same query, loading only the fields the
+    template shows; the (recipe, -created_at) index serves the ordering.
+    
+    Args:
+        request: HTTP request
+        recipe (Recipe): Reviewed recipe
+        page: Requested page number
+    
+    Returns:
+        Page of Review objects
+    """
+    reviews = (
+        Review.objects.filter(recipe=recipe)
+        .select_related('user')
+        .only('rating', 'comment', 'created_at', 'recipe_id',
+              'user__id', 'user__username', 'user__first_name', 'user__last_name')
+        .order_by('-created_at', '-id')
+    )
+    paginator = Paginator(reviews, REVIEW_PAGE_SIZE)
+    try:
+        return paginator.page(page)
+    except (EmptyPage, PageNotAnInteger):
+        return paginator.page(1)
+
+
+def review_page(request, pk):
+    """Render one page of reviews as an HTML fragment.
+    
+    Used by the recipe page to lazy-load older reviews.
+    
+    Args:
+        request: HTTP request
+        pk (int): Recipe ID
+        page: Page number to render
     
-    return reviews
+    Returns:
+        Rendered review-list.html fragment
+    
+    Raises:
+        Http404: If recipe does not exist
+    """
+    recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+    reviews = review_list(request=request, recipe=recipe, page=request.GET.get('page', 1))
+    return render(request, 'review-list.html', {'recipe': recipe, 'reviews': reviews})
 
 @login_required(login_url='/login')
 def review_delete(request, pk):
     review = get_object_or_404(Review, pk=pk)
     recipe = review.recipe
     review.delete()
-    return redirect('recipe', pk=recipe.id)
\ No newline at end of file
+    return redirect('recipe', pk=recipe.id)
+
+# ============ METRICS ============
+
+def metrics_view(request):
+    """Serve metrics in the Prometheus text format.
+    
+    Requires `Authorization: Bearer <METRICS_TOKEN>`; without
+    METRICS_TOKEN the endpoint is off (behind a proxy on the same host
+    every request would look local). Queue depths and rate limit totals
+    are read now; everything else comes from metrics.py.
+    
+    Args:
+        request: HTTP request
+    
+    Returns:
+        HttpResponse: Exposition text, or 403
+    
+    Raises:
+        Http404: If METRICS_TOKEN is not set
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404("Metrics are disabled")
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponse(status=403)
+
+    deletions = DeletionJob.objects.filter(
+        status__in=[DeletionJob.PENDING, DeletionJob.RUNNING]
+    ).values_list('status').annotate(count=Count('id')).order_by()
+    emails = OutgoingEmail.objects.filter(
+        status__in=[OutgoingEmail.PENDING, OutgoingEmail.SENDING, OutgoingEmail.FAILED]
+    ).values_list('status').annotate(count=Count('id')).order_by()
+    extra = [
+        ('queue_depth', 'gauge', "Items waiting in background queues", [
+            ({'queue': 'moderation'}, Recipe.objects.filter(is_approved=False, is_rejected=False).count()),
+            *(({'queue': 'deletion', 'status': status}, count) for status, count in deletions),
+            *(({'queue': 'email', 'status': status}, count) for status, count in emails),
+        ]),
+        ('ratelimit_throttled_total', 'counter', "Requests rejected by rate limits", [
+            ({'scope': scope}, count) for scope, count in sorted(throttled_totals().items())
+        ]),
+    ]
+    return HttpResponse(metrics.render(extra), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,128 @@
+"""warmup.py
+
+Work a fresh process does before its first request instead of during it.
+
+A new worker compiles templates on first use (then keeps them in the
+cached loader) and starts with cold per-process caches (LocMem, or an
+empty Redis after a flush). warm_up() does that work up front:
+
+    templates: compile every template the project and its apps ship,
+        for both template engines
+    categories: build the cached category summary (header of every page)
+    highlights: fill the index page's trending and top rated ids
+    pages: render the first page of the index and of every category,
+        which also loads the code paths, query compilers and template
+        tags those pages use
+
+wsgi.py runs it when a worker loads the application (WARMUP_ON_BOOT);
+`manage.py warmup` runs it on demand and reports the timings.
+"""
+
+import logging
+import os
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import RequestFactory
+
+from . import views
+from .categories import category_summary
+from .scores import highlight_ids
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+# ============ STEPS ============
+
+def template_names(engine):
+    """Yield every template name the engine's loaders can find."""
+    seen = set()
+    for loader in engine.template_loaders:
+        loaders = loader.loaders if isinstance(loader, CachedLoader) else [loader]
+        for source in loaders:
+            for directory in source.get_dirs():
+                for root, _, files in os.walk(directory):
+                    for filename in files:
+                        if not filename.endswith(TEMPLATE_EXTENSIONS):
+                            continue
+                        name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                        if name not in seen:
+                            seen.add(name)
+                            yield name
+
+
+def compile_templates():
+    """Compile every template into the cached loaders (Jinja2: its template cache).
+
+    Returns:
+        int: Number of templates compiled
+    """
+    count = 0
+    for backend in engines.all():
+        if hasattr(backend, 'env'):
+            names, get_template = backend.env.list_templates(), backend.env.get_template
+        else:
+            names, get_template = template_names(backend.engine), backend.engine.get_template
+        for name in names:
+            try:
+                get_template(name)
+            except Exception:
+                # Fragments meant for other engines or needing missing libraries
+                logger.debug("Template %s not compiled", name, exc_info=True)
+                continue
+            count += 1
+    return count
+
+
+def render_first_pages():
+    """Render page 1 of the index and of every category as an anonymous user.
+
+    Returns:
+        int: Number of pages rendered
+    """
+    factory = RequestFactory()
+    pages = [('/index/', views.index, [])]
+    pages += [(f'/category/{c["id"]}/', views.category, [c['id']]) for c in category_summary()]
+    for path, view, args in pages:
+        request = factory.get(path)
+        request.user = AnonymousUser()
+        view(request, *args)
+    return len(pages)
+
+
+# ============ WARM-UP ============
+
+def warm_up():
+    """Run every warm-up step and return its timings.
+
+    A failing step is logged and skipped, so warming up never keeps a
+    worker from starting. Database connections are closed at the end,
+    as the process may fork workers afterwards.
+
+    Returns:
+        list: (step, seconds, result) per step; result is None if it failed
+    """
+    steps = [
+        ('templates', compile_templates),
+        ('categories', lambda: len(category_summary())),
+        ('highlights', lambda: sum(map(len, highlight_ids(views.SECTION_SIZE)))),
+        ('pages', render_first_pages),
+    ]
+    timings = []
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            result = step()
+        except Exception:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            result = None
+        timings.append((name, time.perf_counter() - start, result))
+    connections.close_all()
+    logger.info("Warmed up in %.0f ms", sum(seconds for _, seconds, _ in timings) * 1000)
+    return timings
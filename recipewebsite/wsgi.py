@@ -1,7 +1,8 @@
 """
 WSGI config for recipewebsite project.
 
-It exposes the WSGI callable as a module-level variable named ``application``.
+It exposes the WSGI callable as a module-level variable named ``application``,
+warmed up (see recipewebsite/warmup.py) unless WARMUP_ON_BOOT is off.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
@@ -14,3 +15,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipewebsite.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402 (needs the settings module set above)
+
+if settings.WARMUP_ON_BOOT:
+    from recipewebsite.warmup import warm_up
+    warm_up()